@@ -3,7 +3,7 @@ import 'package:drift/drift.dart';
 class TapRecords extends Table {
   TextColumn get id => text()();
   TextColumn get cardNo => text()();
-  TextColumn get eventType => text()(); // absen_masuk, absen_keluar, izin
+  TextColumn get eventType => text()(); // absen_masuk, absen_keluar, izin, izin_kembali
   IntColumn get deviceTime => integer()();
   TextColumn get reason => text().nullable()();
   IntColumn get hikSerialNo => integer().nullable()();
@@ -51,9 +51,17 @@ class AttendanceService {
     student ??= await db.getStudentByCard(event.cardNo);
     if (student == null) return; // unknown card, ignore
 
-    // Determine suggestion based on today's tap count
+    // Determine suggestion based on today's taps: a student whose last tap
+    // was an izin is out of school, so the next tap is their return
     final todayTaps = await db.getTodayRecordsForCard(event.cardNo);
-    final suggestedType = todayTaps.isEmpty ? 'absen_masuk' : 'absen_keluar';
+    final String suggestedType;
+    if (todayTaps.isEmpty) {
+      suggestedType = 'absen_masuk';
+    } else if (todayTaps.last.eventType == 'izin') {
+      suggestedType = 'izin_kembali';
+    } else {
+      suggestedType = 'absen_keluar';
+    }
 
     onTapDetected?.call(event, student, suggestedType);
   }
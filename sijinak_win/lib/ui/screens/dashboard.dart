@@ -376,6 +376,8 @@ class _DashboardScreenState extends ConsumerState<DashboardScreen> {
         return Icons.logout;
       case 'izin':
         return Icons.description;
+      case 'izin_kembali':
+        return Icons.keyboard_return;
       default:
         return Icons.contactless;
     }
@@ -389,6 +391,8 @@ class _DashboardScreenState extends ConsumerState<DashboardScreen> {
         return Colors.blue;
       case 'izin':
         return Colors.orange;
+      case 'izin_kembali':
+        return Colors.teal;
       default:
         return Colors.grey;
     }
@@ -402,6 +406,8 @@ class _DashboardScreenState extends ConsumerState<DashboardScreen> {
         return 'Keluar';
       case 'izin':
         return 'Izin';
+      case 'izin_kembali':
+        return 'Kembali';
       default:
         return eventType;
     }
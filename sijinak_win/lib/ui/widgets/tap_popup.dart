@@ -2,7 +2,7 @@ import 'package:flutter/material.dart';
 import '../../data/local/database.dart';
 
 class TapPopupResult {
-  final String eventType; // absen_masuk, absen_keluar, izin
+  final String eventType; // absen_masuk, absen_keluar, izin, izin_kembali
   final String? reason;
 
   const TapPopupResult({required this.eventType, this.reason});
@@ -118,6 +118,16 @@ class _TapPopupDialogState extends State<TapPopupDialog> {
                     ),
                     const SizedBox(width: 8),
                   ],
+                  if (widget.suggestedType == 'izin_kembali') ...[
+                    _ActionButton(
+                      label: 'Kembali',
+                      icon: Icons.keyboard_return,
+                      color: Colors.teal,
+                      selected: _selected == 'izin_kembali',
+                      onTap: () => setState(() => _selected = 'izin_kembali'),
+                    ),
+                    const SizedBox(width: 8),
+                  ],
                   if (widget.suggestedType == 'absen_keluar') ...[
                     _ActionButton(
                       label: 'Keluar',
@@ -62,6 +62,29 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+def pool_status() -> dict[str, int]:
+    """
+    Snapshot of this worker's connection pool occupancy.
+
+    Each uvicorn worker has its own pool of DB_POOL_SIZE + DB_MAX_OVERFLOW
+    connections, so server-wide capacity is that times the worker count.
+    """
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
+def _create_missing_indexes(sync_conn) -> None:
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
 async def init_db(drop_existing: bool = False):
     """
     Initialize database tables (run on startup)
@@ -74,6 +97,7 @@ async def init_db(drop_existing: bool = False):
     from app.models.siswa_profile import SiswaProfile  # noqa: F401
     from app.models.guru_profile import GuruProfile  # noqa: F401
     from app.models.absensi import Absensi  # noqa: F401
+    from app.models.absensi_rekap import AbsensiRekapKelas, AbsensiRekapSiswa  # noqa: F401
     from app.models.izin_keluar import IzinKeluar  # noqa: F401
     from app.models.tahun_ajaran import TahunAjaran  # noqa: F401
     from app.models.semester import Semester  # noqa: F401
@@ -89,6 +113,9 @@ async def init_db(drop_existing: bool = False):
     from app.models.bobot_penilaian import BobotPenilaian  # noqa: F401
     from app.models.rapor import Rapor, RaporNilai  # noqa: F401
     from app.models.desktop_settings import DesktopSettings  # noqa: F401
+    from app.models.desktop_ingest_ledger import DesktopIngestLedger  # noqa: F401
+    from app.models.roster_change import RosterChange  # noqa: F401
+    from app.models.desktop_device import DesktopDevice, DesktopDeviceSerial  # noqa: F401
 
     async with engine.begin() as conn:
         if drop_existing:
@@ -97,6 +124,8 @@ async def init_db(drop_existing: bool = False):
 
         print("Creating/updating database tables...")
         await conn.run_sync(Base.metadata.create_all)
+        # create_all skips existing tables, so indexes added later are created here
+        await conn.run_sync(_create_missing_indexes)
         print("Database initialized successfully")
 
 
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
+from datetime import time
 import os
 from pathlib import Path
 
@@ -27,6 +28,9 @@ class Settings(BaseSettings):
     APP_WORKERS: int = 4
     APP_RELOAD: bool = True
 
+    # School-day boundaries for timestamp filters (IANA zone name)
+    SCHOOL_TIMEZONE: str = "Asia/Jakarta"
+
     # Database Configuration
     DB_USER: str = "simandaya"
     DB_PASSWORD: str = "simandaya_dev_password"
@@ -52,6 +56,50 @@ class Settings(BaseSettings):
 
     # Desktop App Configuration
     DESKTOP_API_KEY: str = "change-this-desktop-api-key"
+    ROSTER_REFRESH_SECONDS: int = 300
+    ROSTER_NEGATIVE_TTL_SECONDS: float = 60.0
+    IZIN_BOARD_REFRESH_SECONDS: int = 300
+
+    # Desktop ingest group commit (0 disables: each socket commits its own frames)
+    INGEST_GROUP_COMMIT_MS: float = 5.0
+    INGEST_GROUP_MAX_EVENTS: int = 500
+    # Advisory-lock partitions serializing ingest per student across workers
+    INGEST_LOCK_PARTITIONS: int = 4096
+
+    # Desktop socket protocol v2: max frames a gate may have in flight
+    DESKTOP_MAX_WINDOW: int = 64
+
+    # POST /api/desktop/events:batch
+    DESKTOP_BULK_CHUNK_SIZE: int = 500
+    DESKTOP_BULK_MAX_EVENTS: int = 50000
+    DESKTOP_BULK_MAX_LINE_BYTES: int = 64 * 1024
+
+    # Gate reader serialNo gap tracking
+    DEVICE_FLUSH_SECONDS: int = 30
+    DEVICE_SERIAL_MAX_PENDING: int = 10000
+    DEVICE_MAX_GAPS: int = 100
+
+    # Response cache for the public attendance/izin listings (0 disables it)
+    PUBLIC_CACHE_TTL_SECONDS: float = 5.0
+    PUBLIC_CACHE_MAX_ENTRIES: int = 1000
+
+    # Admin attendance listing: rows per keyset page in NDJSON mode
+    ABSENSI_EXPORT_PAGE_SIZE: int = 1000
+
+    # Spreadsheet export: rows per server-side cursor fetch
+    EXPORT_FETCH_SIZE: int = 2000
+
+    # End-of-day Alfa closer (school-local time it runs at)
+    ALFA_CLOSER_ENABLED: bool = True
+    ALFA_CLOSER_TIME: time = time(16, 0)
+
+    # Public attendance SSE stream (GET /api/v1/absensi/public/stream)
+    SSE_QUEUE_SIZE: int = 256
+    SSE_HEARTBEAT_SECONDS: int = 15
+
+    # Desktop record_id idempotency ledger
+    INGEST_LEDGER_RETENTION_DAYS: int = 7
+    INGEST_LEDGER_MEMORY_SIZE: int = 50000
 
     @property
     def database_url(self) -> str:
@@ -1,6 +1,6 @@
 from typing import Optional
 from datetime import date, datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
 from app.enums import StatusAbsensi
 
@@ -15,6 +15,12 @@ class AbsensiResponseDTO(BaseModel):
     marked_by: Optional[UUID]
 
 
+class PaginatedAbsensiResponse(BaseModel):
+    items: list[AbsensiResponseDTO]
+    next_cursor: Optional[str]
+    limit: int
+
+
 class IzinKeluarResponseDTO(BaseModel):
     izin_id: UUID
     user_id: UUID
@@ -23,5 +29,59 @@ class IzinKeluarResponseDTO(BaseModel):
     waktu_kembali: Optional[datetime]
 
 
+class ActiveIzinKeluarDTO(BaseModel):
+    izin_id: UUID
+    user_id: UUID
+    nama_siswa: str
+    kelas: Optional[str]
+    created_at: datetime
+    keterangan: str
+
+
+class CloseDayKelasDTO(BaseModel):
+    kelas_id: UUID
+    nama_kelas: str
+    inserted: int
+    duration_ms: float
+
+
+class CloseDayReportDTO(BaseModel):
+    tanggal: date
+    school_day: bool
+    reason: Optional[str] = Field(None, description="Why the date was skipped")
+    kelas: list[CloseDayKelasDTO] = Field(default_factory=list)
+    inserted: int = Field(0, description="Alfa rows written by this run")
+    duration_ms: float
+
+
+class RekapKelasDTO(BaseModel):
+    kelas_id: UUID
+    nama_kelas: str
+    tanggal: date
+    hadir: int = 0
+    terlambat: int = 0
+    alfa: int = 0
+    sakit: int = 0
+    izin: int = 0
+    total: int = 0
+
+
+class AbsensiMatrixRowDTO(BaseModel):
+    user_id: UUID
+    nis: Optional[str]
+    nama_lengkap: str
+    status: str = Field(..., description="One kode letter per entry of hari")
+
+
+class AbsensiMatrixDTO(BaseModel):
+    kelas_id: UUID
+    nama_kelas: str
+    tahun: int
+    bulan: int
+    hari: list[int] = Field(..., description="School days of the month (day numbers)")
+    kode: dict[str, str] = Field(..., description="Meaning of each status letter")
+    siswa: list[AbsensiMatrixRowDTO]
+
+
 class MessageResponseDTO(BaseModel):
     message: str
@@ -6,15 +6,37 @@ from pydantic import BaseModel, Field
 
 class AttendanceEventDTO(BaseModel):
     """Incoming attendance event from desktop app via WebSocket."""
-    record_id: str = Field(..., description="Desktop's local tap_record UUID (for ack)")
+    record_id: str = Field(
+        ..., max_length=100, description="Desktop's local tap_record UUID (for ack); fits the ingest ledger key"
+    )
     user_id: UUID = Field(..., description="Student user_id")
-    event_type: Literal["absen_masuk", "absen_keluar", "izin"] = Field(
-        ..., description="Type of attendance event"
+    event_type: Literal["absen_masuk", "absen_keluar", "izin", "izin_kembali"] = Field(
+        ..., description="Type of attendance event; izin_kembali closes the student's open izin keluar"
     )
     device_time: datetime = Field(..., description="Timestamp from Hikvision device")
     reason: Optional[str] = Field(
         None, description="Required when event_type is 'izin'"
     )
+    device_id: Optional[str] = Field(
+        None, max_length=64, description="Reader the tap came from, e.g. its Hikvision serial number"
+    )
+    hik_serial_no: Optional[int] = Field(
+        None, ge=1, description="Hikvision event serialNo, for gap tracking per device"
+    )
+
+
+class AttendanceBatchDTO(BaseModel):
+    """Batch of attendance events sent in a single WebSocket frame (backlog replay)."""
+    events: list[dict] = Field(
+        ..., min_length=1, description="AttendanceEventDTO payloads, validated per event"
+    )
+
+
+class DesktopHelloDTO(BaseModel):
+    """First frame of a protocol v2 connection."""
+    type: Literal["hello"] = Field(..., description="Frame type")
+    protocol: Literal[2] = Field(..., description="Protocol version requested")
+    window: int = Field(..., ge=1, description="Frames the gate wants to keep in flight")
 
 
 class UpdateDesktopSettingsDTO(BaseModel):
@@ -1,6 +1,6 @@
 from datetime import time, datetime
 from uuid import UUID
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -14,12 +14,77 @@ class StudentSyncDTO(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class StudentDeltaDTO(BaseModel):
+    """Roster changes since a version, for `GET /api/desktop/students?since=<version>`."""
+    version: int = Field(..., description="Roster version this delta brings the client to")
+    reset: bool = Field(
+        False, description="True if `since` is unknown to the server; upserts is then the full roster"
+    )
+    upserts: list[StudentSyncDTO] = Field(..., description="Added or changed active students")
+    removed: list[UUID] = Field(..., description="Students deactivated or deleted")
+
+
 class AttendanceAckDTO(BaseModel):
     """Acknowledgement response for an attendance event."""
     record_id: str = Field(..., description="Echo back desktop's local record ID")
     status: str = Field(..., description="'ok' or 'error'")
     published_at: datetime = Field(..., description="Server timestamp")
     detail: Optional[str] = Field(None, description="Error message if status is 'error'")
+    retryable: bool = Field(False, description="Error was on the server side; resend the event later")
+
+
+class AttendanceBatchAckDTO(BaseModel):
+    """Batched acknowledgement for an AttendanceBatchDTO frame, one ack per event."""
+    acks: list[AttendanceAckDTO] = Field(..., description="Acks in the same order as the events")
+
+
+class DesktopWelcomeDTO(BaseModel):
+    """Reply to DesktopHelloDTO with the negotiated protocol v2 parameters."""
+    type: Literal["welcome"] = Field("welcome", description="Frame type")
+    protocol: int = Field(..., description="Protocol version in use")
+    window: int = Field(..., description="Frames the gate may have in flight (unacked)")
+
+
+class CumulativeAckDTO(BaseModel):
+    """Protocol v2 ack: every frame up to and including ack_seq is committed."""
+    type: Literal["ack"] = Field("ack", description="Frame type")
+    ack_seq: int = Field(..., description="Highest frame seq covered by this ack")
+    acks: list[AttendanceAckDTO] = Field(
+        ..., description="Per-event acks for the frames since the previous ack, in order"
+    )
+
+
+class PoolStatusDTO(BaseModel):
+    """Connection pool occupancy for the worker that served the request."""
+    pool_size: int = Field(..., description="Configured pool size (DB_POOL_SIZE)")
+    max_overflow: int = Field(..., description="Configured overflow (DB_MAX_OVERFLOW)")
+    checked_out: int = Field(..., description="Connections currently leased")
+    checked_in: int = Field(..., description="Idle connections in the pool")
+    overflow: int = Field(..., description="Current overflow (negative while the pool is not full)")
+    ingest_queue_depth: int = Field(..., description="Frames waiting for the ingest writer")
+
+
+class SerialRangeDTO(BaseModel):
+    """Inclusive range of Hikvision serialNos."""
+    begin: int = Field(..., description="First missing serialNo")
+    end: int = Field(..., description="Last missing serialNo")
+
+
+class DesktopDeviceDTO(BaseModel):
+    """Gate reader that has sent events, with its serial watermarks."""
+    device_id: str = Field(..., description="Reader identity sent on events")
+    contiguous_serial: int = Field(..., description="Every serialNo up to this one has been received")
+    highest_serial: int = Field(..., description="Highest serialNo received")
+    last_seen_at: Optional[datetime] = Field(None, description="Last event received")
+    gap_count: int = Field(..., description="Number of missing serial ranges")
+
+
+class DeviceGapsDTO(BaseModel):
+    """Missing serial ranges of one reader; re-poll AcsEvent from each `begin`."""
+    device_id: str = Field(..., description="Reader identity")
+    contiguous_serial: int = Field(..., description="Every serialNo up to this one has been received")
+    highest_serial: int = Field(..., description="Highest serialNo received")
+    gaps: list[SerialRangeDTO] = Field(..., description="Missing ranges, oldest first")
 
 
 class DesktopSettingsDTO(BaseModel):
@@ -1,7 +1,8 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.config.database import init_db, close_db
+from app.config.database import init_db, close_db, async_session_maker
 from app.routers import (
     auth, users, absensi,
     tahun_ajaran, semester, kalender, mapel, slot_waktu,
@@ -11,6 +12,16 @@ from app.routers import (
     desktop,
 )
 from app.config.settings import settings
+from app.services.roster_index import roster_index
+from app.services.ingest_writer import ingest_writer
+from app.services.ingest_ledger import ingest_ledger
+from app.services.event_bus import event_bus
+from app.services.device_registry import device_registry
+from app.services.attendance_stream import attendance_stream, AttendanceStream
+from app.services.public_listing_cache import public_listing_cache, PublicListingCache
+from app.services.izin_board import izin_board
+from app.services.attendance_closer import attendance_closer
+from app.services.desktop_registry import desktop_registry, DesktopConnectionRegistry
 
 
 @asynccontextmanager
@@ -20,13 +31,63 @@ async def lifespan(app: FastAPI):
 
     Startup:
         - Initialize database tables
+        - Load the in-memory roster index used for tap validation
+        - Load the "currently out" izin keluar board and reload it
+          periodically and whenever the event bus reconnects
+        - Start the desktop ingest group-commit writer
+        - Start the ingest ledger retention purge
+        - Flush observed gate reader serials periodically
+        - Schedule the end-of-day Alfa closer
+        - Listen on the cross-worker event bus and route desktop pushes
+          and dashboard attendance streams, and invalidate public listings
     Shutdown:
+        - Stop background tasks and the ingest writer
+        - Flush the remaining gate reader serials
         - Close database connections
     """
     # Startup
     await init_db(drop_existing=settings.DEV_MODE)
+    async with async_session_maker() as session:
+        await roster_index.load(session)
+        await izin_board.load(session)
+    roster_task = asyncio.create_task(
+        roster_index.run_refresh_loop(settings.ROSTER_REFRESH_SECONDS)
+    )
+    izin_board_task = asyncio.create_task(
+        izin_board.run_refresh_loop(settings.IZIN_BOARD_REFRESH_SECONDS)
+    )
+    ingest_writer.start()
+    ledger_task = asyncio.create_task(ingest_ledger.run_purge_loop())
+    device_task = asyncio.create_task(
+        device_registry.run_flush_loop(settings.DEVICE_FLUSH_SECONDS)
+    )
+    closer_task = (
+        asyncio.create_task(attendance_closer.run_schedule_loop(settings.ALFA_CLOSER_TIME))
+        if settings.ALFA_CLOSER_ENABLED else None
+    )
+    event_bus.subscribe(DesktopConnectionRegistry.TOPIC_ROSTER, desktop_registry.on_roster_changed)
+    event_bus.subscribe(DesktopConnectionRegistry.TOPIC_ROSTER, roster_index.on_roster_changed)
+    event_bus.subscribe(DesktopConnectionRegistry.TOPIC_SETTINGS, desktop_registry.on_settings_changed)
+    event_bus.subscribe(AttendanceStream.TOPIC, attendance_stream.on_delta)
+    event_bus.subscribe(AttendanceStream.TOPIC, public_listing_cache.on_changed)
+    event_bus.subscribe(AttendanceStream.TOPIC, izin_board.on_delta)
+    event_bus.subscribe(PublicListingCache.TOPIC, public_listing_cache.on_changed)
+    event_bus.on_reconnect(roster_index.on_bus_reconnected)
+    event_bus.on_reconnect(izin_board.on_bus_reconnected)
+    await event_bus.start()
     yield
     # Shutdown
+    await event_bus.stop()
+    roster_task.cancel()
+    izin_board_task.cancel()
+    ledger_task.cancel()
+    device_task.cancel()
+    if closer_task is not None:
+        closer_task.cancel()
+    await ingest_writer.stop()
+    async with async_session_maker() as session:
+        await device_registry.flush(session)
+        await session.commit()
     await close_db()
 
 
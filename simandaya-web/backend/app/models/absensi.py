@@ -4,7 +4,7 @@ from typing import Optional
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import (
     Date, DateTime, Enum as SQLAlchemyEnum,
-    UUID as SQLAlchemyUUID, ForeignKey, UniqueConstraint
+    UUID as SQLAlchemyUUID, ForeignKey, UniqueConstraint, Index
 )
 from app.config.database import Base
 from app.enums import StatusAbsensi
@@ -14,6 +14,8 @@ class Absensi(Base):
     __tablename__ = "absensi"
     __table_args__ = (
         UniqueConstraint("user_id", "tanggal", name="uq_absensi_user_tanggal"),
+        # Keyset pagination of the admin listing (newest tanggal first)
+        Index("ix_absensi_tanggal_absensi_id", "tanggal", "absensi_id"),
     )
 
     absensi_id: Mapped[UUID] = mapped_column(
@@ -0,0 +1,70 @@
+from uuid import UUID
+from datetime import date
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import (
+    Date, Integer, Enum as SQLAlchemyEnum,
+    UUID as SQLAlchemyUUID, ForeignKey
+)
+from app.config.database import Base
+from app.enums import StatusAbsensi
+
+
+class AbsensiRekapKelas(Base):
+    """
+    Number of absensi rows per (tanggal, kelas, status).
+
+    Maintained incrementally in the transaction of every absensi write (see
+    app.services.absensi_rekap); the kelas is the student's kelas in the
+    tahun ajaran containing tanggal.
+    """
+    __tablename__ = "absensi_rekap_kelas"
+
+    tanggal: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    kelas_id: Mapped[UUID] = mapped_column(
+        SQLAlchemyUUID(as_uuid=True),
+        ForeignKey("kelas.kelas_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    status: Mapped[StatusAbsensi] = mapped_column(
+        SQLAlchemyEnum(StatusAbsensi, values_callable=lambda x: [e.value for e in x]),
+        primary_key=True
+    )
+
+    jumlah: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"AbsensiRekapKelas(tanggal={self.tanggal}, kelas_id={self.kelas_id}, status={self.status}, jumlah={self.jumlah})"
+
+
+class AbsensiRekapSiswa(Base):
+    """
+    Number of absensi rows per (student, semester, status).
+
+    Maintained like AbsensiRekapKelas; the semester is the one whose date
+    range contains tanggal.
+    """
+    __tablename__ = "absensi_rekap_siswa"
+
+    user_id: Mapped[UUID] = mapped_column(
+        SQLAlchemyUUID(as_uuid=True),
+        ForeignKey("users.user_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    semester_id: Mapped[UUID] = mapped_column(
+        SQLAlchemyUUID(as_uuid=True),
+        ForeignKey("semester.semester_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    status: Mapped[StatusAbsensi] = mapped_column(
+        SQLAlchemyEnum(StatusAbsensi, values_callable=lambda x: [e.value for e in x]),
+        primary_key=True
+    )
+
+    jumlah: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"AbsensiRekapSiswa(user_id={self.user_id}, semester_id={self.semester_id}, status={self.status}, jumlah={self.jumlah})"
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, BigInteger, DateTime, ForeignKey, func
+from app.config.database import Base
+
+
+class DesktopDevice(Base):
+    """
+    Registry of gate readers that have sent attendance events.
+
+    Rows are created on first sight of a device_id. Every Hikvision serialNo
+    up to contiguous_serial has been received and committed, highest_serial
+    is the largest serialNo seen; serials received in between are kept in
+    desktop_device_serials (see app.services.device_registry).
+    """
+    __tablename__ = "desktop_devices"
+
+    device_id: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True
+    )
+
+    name: Mapped[Optional[str]] = mapped_column(
+        String(100),
+        nullable=True
+    )
+
+    contiguous_serial: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        default=0
+    )
+
+    highest_serial: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        default=0
+    )
+
+    first_seen_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now()
+    )
+
+    last_seen_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+
+    def __repr__(self) -> str:
+        return f"DesktopDevice(device_id={self.device_id}, contiguous_serial={self.contiguous_serial})"
+
+
+class DesktopDeviceSerial(Base):
+    """
+    Serials of a device received above its contiguous_serial.
+
+    The holes between them are the device's gaps. Rows at or below the
+    watermark are deleted as it advances.
+    """
+    __tablename__ = "desktop_device_serials"
+
+    device_id: Mapped[str] = mapped_column(
+        String(64),
+        ForeignKey("desktop_devices.device_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    serial: Mapped[int] = mapped_column(
+        BigInteger,
+        primary_key=True
+    )
+
+    def __repr__(self) -> str:
+        return f"DesktopDeviceSerial(device_id={self.device_id}, serial={self.serial})"
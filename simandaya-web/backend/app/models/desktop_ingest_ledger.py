@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, DateTime, func
+from app.config.database import Base
+
+
+class DesktopIngestLedger(Base):
+    """
+    Idempotency ledger for desktop attendance events.
+
+    One row per successfully processed desktop record_id (`${cardNo}_${serialNo}`),
+    holding the original ack so replays can be answered without reprocessing.
+    Rows older than INGEST_LEDGER_RETENTION_DAYS are purged.
+    """
+    __tablename__ = "desktop_ingest_ledger"
+
+    record_id: Mapped[str] = mapped_column(
+        String(100),
+        primary_key=True
+    )
+
+    published_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False
+    )
+
+    detail: Mapped[Optional[str]] = mapped_column(
+        String(500),
+        nullable=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        index=True
+    )
+
+    def __repr__(self) -> str:
+        return f"DesktopIngestLedger(record_id={self.record_id})"
@@ -3,14 +3,23 @@ from datetime import datetime
 from typing import Optional
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import (
-    String, DateTime,
-    UUID as SQLAlchemyUUID, ForeignKey, func
+    String, DateTime, Index,
+    UUID as SQLAlchemyUUID, ForeignKey, func, text
 )
 from app.config.database import Base
 
 
 class IzinKeluar(Base):
     __tablename__ = "izin_keluar"
+    __table_args__ = (
+        # Day listings filter created_at by half-open range (see school_day_range)
+        Index("ix_izin_keluar_created_at", "created_at"),
+        # Students still out: only rows without waktu_kembali are indexed
+        Index(
+            "ix_izin_keluar_still_out", "created_at",
+            postgresql_where=text("waktu_kembali IS NULL"),
+        ),
+    )
 
     izin_id: Mapped[UUID] = mapped_column(
         SQLAlchemyUUID(as_uuid=True),
@@ -0,0 +1,34 @@
+from uuid import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, Sequence, UUID as SQLAlchemyUUID
+from app.config.database import Base
+
+
+roster_version_seq = Sequence("roster_version_seq", metadata=Base.metadata)
+
+
+class RosterChange(Base):
+    """
+    Change log for the desktop student roster (one row per student).
+
+    Every write that affects StudentSyncDTO (profile fields, activation,
+    deletion) stamps the student with the next roster_version_seq value.
+    There is deliberately no FK to users so deleted students remain as
+    tombstones that delta syncs report as removed.
+    """
+    __tablename__ = "roster_changes"
+
+    user_id: Mapped[UUID] = mapped_column(
+        SQLAlchemyUUID(as_uuid=True),
+        primary_key=True
+    )
+
+    version: Mapped[int] = mapped_column(
+        BigInteger,
+        roster_version_seq,
+        nullable=False,
+        index=True
+    )
+
+    def __repr__(self) -> str:
+        return f"RosterChange(user_id={self.user_id}, version={self.version})"
@@ -1,16 +1,28 @@
-from typing import Optional
-from datetime import date
+from typing import Literal, Optional
+from datetime import date, datetime
 from uuid import UUID
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.config.database import get_db
 from app.dependencies import require_role
-from app.enums import UserType
+from app.enums import UserType, StatusAbsensi
 from app.models.user import User
 from app.services.absensi_service import AbsensiService
+from app.services.attendance_stream import attendance_stream
+from app.services.izin_board import izin_board
+from app.services.attendance_closer import attendance_closer
+from app.services.absensi_rekap import rekap_kelas
+from app.services.attendance_export import attendance_export
+from app.utils.school_time import school_tz
 from app.dto.absensi.absensi_response import (
     AbsensiResponseDTO,
+    PaginatedAbsensiResponse,
     IzinKeluarResponseDTO,
+    ActiveIzinKeluarDTO,
+    CloseDayReportDTO,
+    RekapKelasDTO,
+    AbsensiMatrixDTO,
 )
 from app.dto.absensi.public_response import (
     PublicAbsensiDTO,
@@ -32,16 +44,120 @@ router = APIRouter(
 
 @router.get(
     "/attendance",
-    response_model=list[AbsensiResponseDTO],
+    response_model=PaginatedAbsensiResponse,
     summary="List All Attendance",
-    description="List all attendance records (Admin only).",
-    dependencies=[Depends(require_role(UserType.admin))]
+    description=(
+        "List attendance records, newest tanggal first, one keyset page at a time: "
+        "pass next_cursor as cursor to continue. With format=ndjson every matching "
+        "record is streamed as newline-delimited JSON instead (Admin only)."
+    ),
+    dependencies=[Depends(require_role(UserType.admin))],
+    responses={200: {"content": {"application/x-ndjson": {}}}},
 )
 async def list_absensi(
+    date_from: Optional[date] = Query(None, description="First tanggal (inclusive)"),
+    date_to: Optional[date] = Query(None, description="Last tanggal (inclusive)"),
+    kelas_id: Optional[UUID] = Query(None, description="Only students of this kelas"),
+    status_absensi: Optional[StatusAbsensi] = Query(None, alias="status", description="Filter by status"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Max records per page"),
+    format: Literal["json", "ndjson"] = Query("json", description="ndjson streams all pages"),
     db: AsyncSession = Depends(get_db),
-) -> list[AbsensiResponseDTO]:
+):
+    service = AbsensiService(db)
+    filters = dict(
+        date_from=date_from, date_to=date_to, kelas_id=kelas_id,
+        status_absensi=status_absensi, cursor=cursor,
+    )
+    if format == "ndjson":
+        return StreamingResponse(
+            service.stream_absensi_ndjson(**filters),
+            media_type="application/x-ndjson",
+        )
+    return await service.list_absensi(**filters, limit=limit)
+
+
+@router.get(
+    "/attendance/export",
+    summary="Export Attendance",
+    description=(
+        "Download attendance or izin keluar records of a date range as CSV or XLSX, "
+        "optionally only for one kelas. Rows are streamed from the database, so any "
+        "range can be exported (Admin only)."
+    ),
+    dependencies=[Depends(require_role(UserType.admin))],
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in attendance_export.MEDIA_TYPES.values()}}},
+)
+async def export_absensi(
+    date_from: date = Query(..., description="First tanggal (inclusive)"),
+    date_to: date = Query(..., description="Last tanggal (inclusive)"),
+    jenis: Literal["absensi", "izin_keluar"] = Query("absensi", description="Records to export"),
+    kelas_id: Optional[UUID] = Query(None, description="Only students of this kelas"),
+    format: Literal["csv", "xlsx"] = Query("xlsx", description="File format"),
+):
+    body = attendance_export.stream(jenis, format, date_from, date_to, kelas_id)
+    filename = attendance_export.filename(jenis, format, date_from, date_to)
+    return StreamingResponse(
+        body,
+        media_type=attendance_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post(
+    "/attendance/close-day",
+    response_model=CloseDayReportDTO,
+    summary="Close a School Day",
+    description=(
+        "Write an Alfa record for every active student without attendance on the date "
+        "(defaults to today). Skips non-school days; safe to re-run. Normally runs "
+        "automatically after school hours (Admin only)."
+    ),
+    dependencies=[Depends(require_role(UserType.admin))]
+)
+async def close_day(
+    tanggal: Optional[date] = Query(None, description="Date to close (YYYY-MM-DD), default today"),
+) -> CloseDayReportDTO:
+    return await attendance_closer.close_day(tanggal or datetime.now(school_tz()).date())
+
+
+@router.get(
+    "/attendance/rekap/kelas",
+    response_model=list[RekapKelasDTO],
+    summary="Attendance Summary by Kelas",
+    description=(
+        "Per-kelas status counts for a date (defaults to today), read from the "
+        "incrementally maintained rollup (Admin/Guru)."
+    ),
+    dependencies=[Depends(require_role(UserType.admin, UserType.guru))]
+)
+async def get_rekap_kelas(
+    tanggal: Optional[date] = Query(None, description="Date (YYYY-MM-DD), default today"),
+    db: AsyncSession = Depends(get_db),
+) -> list[RekapKelasDTO]:
+    return await rekap_kelas(db, tanggal or datetime.now(school_tz()).date())
+
+
+@router.get(
+    "/attendance/matrix",
+    response_model=AbsensiMatrixDTO,
+    summary="Monthly Attendance Matrix",
+    description=(
+        "Students x school days attendance grid of a kelas for one month, one status "
+        "letter per day in a string per student (Guru/Admin: wali kelas or teachers "
+        "of the class)."
+    ),
+)
+async def get_absensi_matrix(
+    kelas_id: UUID = Query(..., description="Kelas"),
+    tahun: int = Query(..., ge=2000, le=2100, description="Year"),
+    bulan: int = Query(..., ge=1, le=12, description="Month (1-12)"),
+    current_user: User = Depends(require_role(UserType.guru, UserType.admin)),
+    db: AsyncSession = Depends(get_db),
+) -> AbsensiMatrixDTO:
     service = AbsensiService(db)
-    return await service.list_absensi()
+    return await service.get_absensi_matrix(kelas_id, tahun, bulan, current_user)
 
 
 @router.get(
@@ -106,6 +222,20 @@ async def list_izin_keluar(
     return await service.list_izin_keluar()
 
 
+@router.get(
+    "/izin-keluar/active",
+    response_model=list[ActiveIzinKeluarDTO],
+    summary="List Students Currently Out",
+    description=(
+        "Students with an izin keluar today who have not tapped back in yet, "
+        "longest out first. Served from memory (Admin, Guru)."
+    ),
+    dependencies=[Depends(require_role(UserType.admin, UserType.guru))]
+)
+async def list_izin_keluar_active() -> list[ActiveIzinKeluarDTO]:
+    return izin_board.list_active()
+
+
 @router.get(
     "/izin-keluar/student/{user_id}",
     response_model=list[IzinKeluarResponseDTO],
@@ -175,3 +305,25 @@ async def list_izin_keluar_public(
     return await service.list_izin_keluar_public(
         tanggal=tanggal, search=search, skip=skip, limit=limit
     )
+
+
+@router.get(
+    "/public/stream",
+    summary="Public Attendance Stream",
+    description=(
+        "Server-sent events with attendance and izin keluar changes for a date as "
+        "they are committed. Events: `absensi` (PublicAbsensiDTO), `izin_keluar` "
+        "(PublicIzinKeluarDTO), and `resync` when the client fell behind and should "
+        "refetch the lists. No auth required."
+    ),
+    response_class=StreamingResponse,
+)
+async def stream_attendance_public(
+    request: Request,
+    tanggal: date = Query(description="Filter date (YYYY-MM-DD)"),
+) -> StreamingResponse:
+    return StreamingResponse(
+        attendance_stream.stream(tanggal, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
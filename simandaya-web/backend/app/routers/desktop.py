@@ -1,35 +1,86 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Query
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Literal, Optional, Union
+from fastapi import (
+    APIRouter, Depends, WebSocket, WebSocketDisconnect, Query, Header, Request, Response,
+    HTTPException, status,
+)
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.config.database import get_db
+from app.config.database import get_db, async_session_maker, pool_status
 from app.config.settings import settings
 from app.dependencies import verify_desktop_api_key, require_role
 from app.enums import UserType
 from app.models.user import User
 from app.services.desktop_service import DesktopService
-from app.dto.desktop.desktop_request import AttendanceEventDTO, UpdateDesktopSettingsDTO
-from app.dto.desktop.desktop_response import StudentSyncDTO, AttendanceAckDTO, DesktopSettingsDTO
-from datetime import datetime, timezone
+from app.services.ingest_writer import ingest_writer
+from app.services.device_registry import device_registry
+from app.services.desktop_registry import desktop_registry
+from app.utils.ndjson import iter_ndjson
+from app.utils.hikvision import iter_event_documents, parse_access_event
+from app.dto.desktop.desktop_request import (
+    AttendanceEventDTO, AttendanceBatchDTO, DesktopHelloDTO, UpdateDesktopSettingsDTO,
+)
+from app.dto.desktop.desktop_response import (
+    StudentSyncDTO, StudentDeltaDTO, AttendanceAckDTO, AttendanceBatchAckDTO, DesktopSettingsDTO,
+    PoolStatusDTO, DesktopWelcomeDTO, CumulativeAckDTO, DesktopDeviceDTO, DeviceGapsDTO,
+)
 
 router = APIRouter(
     prefix="/api/desktop",
     tags=["Desktop"],
 )
 
+NOT_AN_OBJECT = "Frame is not a JSON object"
+
 
 @router.get(
     "/students",
-    response_model=list[StudentSyncDTO],
+    response_model=Union[list[StudentSyncDTO], StudentDeltaDTO],
     summary="Sync Student List",
-    description="Get all active students for desktop app RFID mapping.",
+    description=(
+        "Get all active students for desktop app RFID mapping. "
+        "The response carries the roster version as ETag and X-Roster-Version; "
+        "send If-None-Match to get 304 when nothing changed, or ?since=<version> "
+        "to get only added, changed and removed students."
+    ),
     dependencies=[Depends(verify_desktop_api_key)],
 )
 async def list_students(
+    response: Response,
+    since: Optional[int] = Query(None, ge=0, description="Roster version from a previous sync"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
-) -> list[StudentSyncDTO]:
+) -> Union[list[StudentSyncDTO], StudentDeltaDTO, Response]:
     service = DesktopService(db)
+    version = await service.get_roster_version()
+    etag = f'"roster-{version}"'
+    headers = {"ETag": etag, "X-Roster-Version": str(version)}
+
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    if since is not None:
+        return await service.list_students_delta(since, version)
     return await service.list_students()
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match evaluation (RFC 9110 13.1.2): "*" or any listed tag equal
+    to etag under weak comparison, so W/ prefixes added by proxies match too.
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag
+        for tag in if_none_match.split(",")
+    )
+
+
 @router.get(
     "/settings",
     response_model=DesktopSettingsDTO,
@@ -59,11 +110,124 @@ async def update_settings(
     return await service.update_settings(request.late_cutoff_time, current_user.user_id)
 
 
+@router.post(
+    "/events:batch",
+    response_model=AttendanceBatchAckDTO,
+    summary="Bulk Ingest Attendance Events",
+    description=(
+        "Catch-up ingest for gates that were offline. Body is NDJSON, one "
+        "AttendanceEventDTO per line, optionally sent with Content-Encoding: gzip. "
+        "The body is parsed as it streams in and applied in committed chunks; "
+        "the response has one ack per line, in order."
+    ),
+    dependencies=[Depends(verify_desktop_api_key)],
+)
+async def ingest_events_batch(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+) -> AttendanceBatchAckDTO:
+    gzipped = "gzip" in request.headers.get("content-encoding", "").lower()
+    service = DesktopService(db)
+    acks = await service.ingest_event_stream(
+        iter_ndjson(
+            request.stream(), max_line_bytes=settings.DESKTOP_BULK_MAX_LINE_BYTES, gzipped=gzipped
+        ),
+        chunk_size=settings.DESKTOP_BULK_CHUNK_SIZE,
+        max_events=settings.DESKTOP_BULK_MAX_EVENTS,
+    )
+    return AttendanceBatchAckDTO(acks=acks)
+
+
+@router.post(
+    "/hikvision/events",
+    response_model=AttendanceBatchAckDTO,
+    summary="Hikvision HTTP Listener",
+    description=(
+        "Target for the reader's HTTP listening host (httpHosts). Accepts the "
+        "multipart, XML or JSON event pushes; attached pictures are skipped "
+        "while streaming. employeeNoString is the student's user_id without "
+        "hyphens. Events go through the same ingest path as the desktop socket. "
+        "The device cannot send headers, so the API key is a query parameter, "
+        "and event_type tells which gate (entry or exit) this reader is. "
+        "device_id defaults to the reader's ipAddress. If an event could not be "
+        "stored for a server-side reason the response is 503, so the reader "
+        "resends the push; events that did commit are deduplicated on resend."
+    ),
+)
+async def hikvision_listener(
+    request: Request,
+    api_key: str = Query(...),
+    event_type: Literal["absen_masuk", "absen_keluar"] = Query("absen_masuk"),
+    device_id: Optional[str] = Query(None, max_length=64),
+) -> AttendanceBatchAckDTO:
+    if api_key != settings.DESKTOP_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid desktop API key"
+        )
+
+    events = []
+    async for document in iter_event_documents(
+        request.headers.get("content-type", ""), request.stream()
+    ):
+        event = parse_access_event(document)
+        if event is not None:
+            events.append(event.to_event_payload(event_type, device_id))
+
+    # Heartbeats and unknown cards are answered 200 too; the device must not retry them
+    acks = await ingest_writer.ingest(events) if events else []
+    failed = [ack for ack in acks if ack.retryable]
+    if failed:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{len(failed)} event(s) not stored: {failed[0].detail}"
+        )
+    return AttendanceBatchAckDTO(acks=acks)
+
+
+@router.get(
+    "/pool",
+    response_model=PoolStatusDTO,
+    summary="Connection Pool Status",
+    description="DB pool occupancy of the serving worker, for sizing gates against the pool.",
+    dependencies=[Depends(verify_desktop_api_key)],
+)
+async def get_pool_status() -> PoolStatusDTO:
+    return PoolStatusDTO(**pool_status(), ingest_queue_depth=ingest_writer.queue_depth)
+
+
+@router.get(
+    "/devices",
+    response_model=list[DesktopDeviceDTO],
+    summary="List Gate Readers",
+    description=(
+        "Readers that sent events with device_id + hik_serial_no, with their "
+        "serial watermarks (updated every DEVICE_FLUSH_SECONDS)."
+    ),
+    dependencies=[Depends(verify_desktop_api_key)],
+)
+async def list_devices(db: AsyncSession = Depends(get_db)) -> list[DesktopDeviceDTO]:
+    return await device_registry.list_devices(db, settings.DEVICE_MAX_GAPS)
+
+
+@router.get(
+    "/devices/{device_id}/gaps",
+    response_model=DeviceGapsDTO,
+    summary="Reader Serial Gaps",
+    description=(
+        "Hikvision serialNo ranges never received from this reader. Re-poll "
+        "AcsEvent with beginSerialNo=<begin> for each range instead of a full re-poll."
+    ),
+    dependencies=[Depends(verify_desktop_api_key)],
+)
+async def get_device_gaps(device_id: str, db: AsyncSession = Depends(get_db)) -> DeviceGapsDTO:
+    return await device_registry.get_gaps(db, device_id, settings.DEVICE_MAX_GAPS)
+
+
 @router.websocket("/ws")
 async def desktop_websocket(
     websocket: WebSocket,
     api_key: str = Query(...),
-    db: AsyncSession = Depends(get_db),
 ):
     """
     WebSocket endpoint for desktop attendance events.
@@ -71,6 +235,31 @@ async def desktop_websocket(
     Connect: ws://host/api/desktop/ws?api_key=<key>
     Send: AttendanceEventDTO JSON
     Receive: AttendanceAckDTO JSON
+
+    Backlog replay: send AttendanceBatchDTO JSON ({"events": [...]}) instead.
+    The whole batch is committed in one transaction and answered with a single
+    AttendanceBatchAckDTO whose acks are in the same order as the events.
+
+    Protocol v2 (windowed): open with DesktopHelloDTO
+    ({"type": "hello", "protocol": 2, "window": N}); the server answers with
+    DesktopWelcomeDTO carrying the granted window. Every frame then carries
+    "seq" (1, 2, 3, ... per connection) and the gate may keep up to `window`
+    frames unacked. The server coalesces finished frames into CumulativeAckDTO
+    ({"type": "ack", "ack_seq": K, "acks": [...]}): all frames up to K are
+    committed. Past the window the server stops reading the socket. After a
+    reconnect, resend every frame after the last ack_seq; the record_id ledger
+    returns the original published_at for events that were already applied.
+
+    With group commit enabled (INGEST_GROUP_COMMIT_MS > 0) frames are handed
+    to the per-worker ingest writer and the socket keeps reading; acks are
+    sent in frame order once the group containing the frame has committed.
+    Otherwise each frame leases a session for its own transaction only.
+    Either way an idle socket holds no pooled connection.
+
+    Server push: control messages carry a "type" field (v1 acks never do):
+        {"type": "roster_changed", "version": N}
+            -> re-sync with GET /api/desktop/students?since=<your version>
+        {"type": "settings_changed", "late_cutoff_time": ..., "updated_at": ...}
     """
     # Validate API key before accepting
     if api_key != settings.DESKTOP_API_KEY:
@@ -79,26 +268,236 @@ async def desktop_websocket(
 
     await websocket.accept()
 
+    send_lock = asyncio.Lock()
+    control = desktop_registry.register()
+    pusher = asyncio.create_task(_push_control(websocket, control, send_lock))
     try:
-        while True:
-            data = await websocket.receive_json()
+        first = await websocket.receive_json()
+        if isinstance(first, dict) and first.get("type") == "hello":
+            await _serve_windowed(websocket, send_lock, first)
+        elif ingest_writer.enabled:
+            await _serve_group_commit(websocket, send_lock, first)
+        else:
+            await _serve_inline(websocket, send_lock, first)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        pusher.cancel()
+        desktop_registry.unregister(control)
+
 
+async def _send(websocket: WebSocket, send_lock: asyncio.Lock, payload: dict) -> None:
+    """Send one JSON frame; the lock keeps acks and pushes from interleaving."""
+    async with send_lock:
+        await websocket.send_json(payload)
+
+
+async def _push_control(
+    websocket: WebSocket, control: asyncio.Queue, send_lock: asyncio.Lock
+) -> None:
+    """Forward roster/settings change messages from the registry to this gate."""
+    while True:
+        message = await control.get()
+        await _send(websocket, send_lock, message)
+
+
+async def _frames(websocket: WebSocket, first: dict) -> AsyncIterator[dict]:
+    """The already-read first frame, then every following frame."""
+    yield first
+    while True:
+        yield await websocket.receive_json()
+
+
+async def _serve_inline(websocket: WebSocket, send_lock: asyncio.Lock, first: dict) -> None:
+    """Receive loop that processes and commits each frame before reading the next."""
+    async for data in _frames(websocket, first):
+        if not isinstance(data, dict):
+            reply = DesktopService.error_ack("unknown", ValueError(NOT_AN_OBJECT))
+            await _send(websocket, send_lock, reply.model_dump(mode="json"))
+            continue
+
+        # Lease a session per frame; it goes back to the pool before the ack is sent
+        async with async_session_maker() as db:
+            service = DesktopService(db)
+
+            if "events" in data:
+                try:
+                    batch = AttendanceBatchDTO(**data)
+                    acks = await service.process_attendance_batch(batch.events)
+                    await db.commit()
+                    service.committed(acks)
+                except Exception as e:
+                    await db.rollback()
+                    acks = _error_acks(data, e)
+                reply = AttendanceBatchAckDTO(acks=acks)
+            else:
+                try:
+                    event = AttendanceEventDTO(**data)
+                    reply = await service.process_attendance_event(event)
+                    await db.commit()
+                    service.committed([reply])
+                except Exception as e:
+                    await db.rollback()
+                    reply = DesktopService.error_ack(data.get("record_id", "unknown"), e)
+
+        await _send(websocket, send_lock, reply.model_dump(mode="json"))
+
+
+async def _serve_group_commit(websocket: WebSocket, send_lock: asyncio.Lock, first: dict) -> None:
+    """
+    Receive loop that queues frames on the ingest writer; acks go out from a sender task.
+
+    At most DESKTOP_MAX_WINDOW frames per socket wait for their ack; past that
+    the loop stops reading, so one fast gate cannot queue without limit.
+    """
+    pending: asyncio.Queue[tuple[bool, asyncio.Future]] = asyncio.Queue()
+    slots = asyncio.Semaphore(settings.DESKTOP_MAX_WINDOW)
+
+    async def send_acks() -> None:
+        while True:
+            is_batch, future = await pending.get()
             try:
-                event = AttendanceEventDTO(**data)
-                service = DesktopService(db)
-                ack = await service.process_attendance_event(event)
-                await db.commit()
+                acks = await future
             except Exception as e:
-                await db.rollback()
-                record_id = data.get("record_id", "unknown")
-                ack = AttendanceAckDTO(
-                    record_id=record_id,
-                    status="error",
-                    published_at=datetime.now(timezone.utc),
-                    detail=str(e.detail) if hasattr(e, "detail") else str(e),
+                acks = [DesktopService.error_ack("unknown", e)]
+            reply = AttendanceBatchAckDTO(acks=acks) if is_batch else acks[0]
+            await _send(websocket, send_lock, reply.model_dump(mode="json"))
+            slots.release()
+
+    def answered(acks: list[AttendanceAckDTO]) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(acks)
+        return future
+
+    sender = asyncio.create_task(send_acks())
+    try:
+        data = first
+        while True:
+            await _acquire_slot(slots, sender)
+            if not isinstance(data, dict):
+                # Never hand the writer a frame it cannot read
+                pending.put_nowait((False, answered(
+                    [DesktopService.error_ack("unknown", ValueError(NOT_AN_OBJECT))]
+                )))
+            elif "events" in data:
+                try:
+                    batch = AttendanceBatchDTO(**data)
+                    future = ingest_writer.submit(batch.events)
+                except Exception as e:
+                    future = answered(_error_acks(data, e))
+                pending.put_nowait((True, future))
+            else:
+                pending.put_nowait((False, ingest_writer.submit([data])))
+            data = await websocket.receive_json()
+    finally:
+        sender.cancel()
+
+
+async def _serve_windowed(websocket: WebSocket, send_lock: asyncio.Lock, first: dict) -> None:
+    """Protocol v2: seq-numbered frames, a bounded in-flight window and cumulative acks."""
+    try:
+        hello = DesktopHelloDTO(**first)
+    except ValidationError as e:
+        await websocket.close(code=4002, reason=f"Invalid hello: {e.errors()[0]['msg']}")
+        return
+
+    window = min(hello.window, settings.DESKTOP_MAX_WINDOW)
+    await _send(websocket, send_lock, DesktopWelcomeDTO(protocol=2, window=window).model_dump(mode="json"))
+
+    slots = asyncio.Semaphore(window)
+    inflight: deque[tuple[int, dict, asyncio.Future]] = deque()
+    arrived = asyncio.Event()
+
+    async def send_acks() -> None:
+        while True:
+            while not inflight:
+                arrived.clear()
+                await arrived.wait()
+            await asyncio.wait([inflight[0][2]])
+
+            # Coalesce every frame that has finished, in seq order
+            ack_seq, acks = 0, []
+            while inflight and inflight[0][2].done():
+                ack_seq, data, future = inflight.popleft()
+                acks.extend(
+                    _error_acks(data, future.exception()) if future.exception() else future.result()
                 )
+                slots.release()
+            reply = CumulativeAckDTO(ack_seq=ack_seq, acks=acks)
+            await _send(websocket, send_lock, reply.model_dump(mode="json"))
 
-            await websocket.send_json(ack.model_dump(mode="json"))
+    sender = asyncio.create_task(send_acks())
+    previous: Optional[asyncio.Future] = None
+    expected = 1
+    try:
+        while True:
+            # Backpressure: stop reading until a slot frees up
+            await _acquire_slot(slots, sender)
+            data = await websocket.receive_json()
 
-    except WebSocketDisconnect:
-        pass
+            if not isinstance(data, dict):
+                await websocket.close(code=4002, reason=NOT_AN_OBJECT)
+                return
+            if data.get("seq") != expected:
+                await websocket.close(
+                    code=4003, reason=f"Expected seq {expected}, got {data.get('seq')}"
+                )
+                return
+            expected += 1
+
+            if "events" not in data:
+                data = {"seq": data["seq"], "events": [data]}
+            try:
+                batch = AttendanceBatchDTO(**data)
+            except ValidationError as e:
+                future = asyncio.get_running_loop().create_future()
+                future.set_exception(e)
+            else:
+                if ingest_writer.enabled:
+                    future = ingest_writer.submit(batch.events)
+                else:
+                    # Pipelined, but applied one frame at a time in seq order
+                    future = asyncio.ensure_future(_ingest_after(previous, batch.events))
+                    previous = future
+
+            inflight.append((data["seq"], data, future))
+            arrived.set()
+    finally:
+        sender.cancel()
+
+
+async def _acquire_slot(slots: asyncio.Semaphore, sender: asyncio.Task) -> None:
+    """
+    Wait for a free window slot. Only the ack sender releases slots, so once
+    it has ended (the socket failed while sending) the receive loop stops
+    instead of waiting forever.
+    """
+    if sender.done():
+        raise WebSocketDisconnect(code=status.WS_1011_INTERNAL_ERROR)
+    if not slots.locked():
+        await slots.acquire()
+        return
+    acquire = asyncio.ensure_future(slots.acquire())
+    await asyncio.wait({acquire, sender}, return_when=asyncio.FIRST_COMPLETED)
+    if not acquire.done():
+        acquire.cancel()
+        raise WebSocketDisconnect(code=status.WS_1011_INTERNAL_ERROR)
+
+
+async def _ingest_after(
+    previous: Optional[asyncio.Future], events: list[dict]
+) -> list[AttendanceAckDTO]:
+    """Apply a frame inline once the connection's previous frame has finished."""
+    if previous is not None:
+        await asyncio.wait([previous])
+    return await ingest_writer.ingest(events)
+
+
+def _error_acks(data: dict, exc: Exception) -> list[AttendanceAckDTO]:
+    """Error ack for every event of a batch frame that failed as a whole."""
+    events = data.get("events")
+    return [
+        DesktopService.error_ack(item.get("record_id", "unknown"), exc)
+        for item in (events if isinstance(events, list) else [])
+        if isinstance(item, dict)
+    ]
@@ -0,0 +1,257 @@
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, NamedTuple, Optional
+from uuid import UUID
+from sqlalchemy import (
+    select, delete, func, cast, literal, literal_column, and_,
+    Date, Integer, Text, UUID as SQLAlchemyUUID,
+)
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert as pg_insert, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.absensi import Absensi
+from app.models.absensi_rekap import AbsensiRekapKelas, AbsensiRekapSiswa
+from app.models.siswa_kelas import SiswaKelas
+from app.models.kelas import Kelas
+from app.models.tahun_ajaran import TahunAjaran
+from app.models.semester import Semester
+from app.enums import StatusAbsensi
+from app.dto.absensi.absensi_response import RekapKelasDTO
+
+
+class RekapChange(NamedTuple):
+    """One absensi row entering (+1) or leaving (-1) a status."""
+    user_id: UUID
+    tanggal: date
+    status: StatusAbsensi
+    delta: int
+
+
+def status_change(
+    user_id: UUID, tanggal: date,
+    old: Optional[StatusAbsensi], new: Optional[StatusAbsensi],
+) -> list[RekapChange]:
+    """Changes for an absensi row whose status went from `old` to `new` (None: no row)."""
+    if old == new:
+        return []
+    changes = []
+    if old is not None:
+        changes.append(RekapChange(user_id, tanggal, old, -1))
+    if new is not None:
+        changes.append(RekapChange(user_id, tanggal, new, 1))
+    return changes
+
+
+def previous_status():
+    """
+    RETURNING column of an absensi upsert with the row's status before it:
+
+        (SELECT status FROM absensi previous
+         WHERE previous.absensi_id = absensi.absensi_id) AS previous_status
+
+    The subquery reads the statement's snapshot, so it sees the old row
+    version (NULL for inserted rows). The outer row is referenced by name
+    because SQLAlchemy does not correlate subqueries to an INSERT target.
+    """
+    previous = aliased(Absensi, name="previous")
+    return (
+        select(previous.status)
+        .where(previous.absensi_id == literal_column("absensi.absensi_id", SQLAlchemyUUID(as_uuid=True)))
+        .scalar_subquery()
+        .label("previous_status")
+    )
+
+
+def _kelas_rollup(source):
+    """
+    (tanggal, kelas_id, status, sum(delta)) of a (user_id, tanggal, status,
+    delta) source; a student counts for the kelas they are in during the
+    tahun ajaran containing tanggal.
+    """
+    return (
+        select(
+            source.c.tanggal,
+            SiswaKelas.kelas_id,
+            source.c.status,
+            func.sum(source.c.delta).label("jumlah"),
+        )
+        .join(SiswaKelas, SiswaKelas.user_id == source.c.user_id)
+        .join(Kelas, Kelas.kelas_id == SiswaKelas.kelas_id)
+        .join(
+            TahunAjaran,
+            and_(
+                TahunAjaran.tahun_ajaran_id == Kelas.tahun_ajaran_id,
+                TahunAjaran.tanggal_mulai <= source.c.tanggal,
+                TahunAjaran.tanggal_selesai >= source.c.tanggal,
+            ),
+        )
+        .group_by(source.c.tanggal, SiswaKelas.kelas_id, source.c.status)
+    )
+
+
+def _siswa_rollup(source):
+    """(user_id, semester_id, status, sum(delta)) of the same kind of source."""
+    return (
+        select(
+            source.c.user_id,
+            Semester.semester_id,
+            source.c.status,
+            func.sum(source.c.delta).label("jumlah"),
+        )
+        .join(
+            Semester,
+            and_(
+                Semester.tanggal_mulai <= source.c.tanggal,
+                Semester.tanggal_selesai >= source.c.tanggal,
+            ),
+        )
+        .group_by(source.c.user_id, Semester.semester_id, source.c.status)
+    )
+
+
+def _absensi_source():
+    """Every absensi row as a +1 change: the rollups recomputed from scratch."""
+    return select(
+        Absensi.user_id,
+        Absensi.tanggal,
+        Absensi.status,
+        literal(1, Integer).label("delta"),
+    ).subquery("source")
+
+
+async def apply_rekap(db: AsyncSession, changes: Iterable[RekapChange]) -> None:
+    """
+    Add changes to both rollups inside the caller's transaction.
+
+    Call from every absensi write, before commit, with the status changes it
+    made (see status_change). Both tables are updated by one statement:
+
+        WITH changes AS (SELECT ... FROM unnest(:user_ids, :tanggals, :statuses, :deltas)),
+             kelas AS (INSERT INTO absensi_rekap_kelas SELECT ... GROUP BY ...
+                       ON CONFLICT DO UPDATE SET jumlah = jumlah + excluded.jumlah)
+        INSERT INTO absensi_rekap_siswa SELECT ... GROUP BY ...
+        ON CONFLICT DO UPDATE SET jumlah = jumlah + excluded.jumlah
+
+    Changes that cancel out (a row leaving and re-entering a status) are
+    netted first.
+    """
+    net: dict[tuple[UUID, date, StatusAbsensi], int] = defaultdict(int)
+    for change in changes:
+        net[change.user_id, change.tanggal, change.status] += change.delta
+    net = {key: delta for key, delta in net.items() if delta}
+    if not net:
+        return
+
+    entries = func.unnest(
+        literal([key[0] for key in net], ARRAY(SQLAlchemyUUID(as_uuid=True))),
+        literal([key[1] for key in net], ARRAY(Date)),
+        literal([key[2].value for key in net], ARRAY(Text)),
+        literal(list(net.values()), ARRAY(Integer)),
+    ).table_valued("user_id", "tanggal", "status", "delta").render_derived(name="entries")
+    source = select(
+        entries.c.user_id,
+        entries.c.tanggal,
+        cast(entries.c.status, Absensi.__table__.c.status.type).label("status"),
+        entries.c.delta,
+    ).cte("changes")
+
+    kelas_stmt = pg_insert(AbsensiRekapKelas).from_select(
+        ["tanggal", "kelas_id", "status", "jumlah"], _kelas_rollup(source)
+    )
+    kelas_stmt = kelas_stmt.on_conflict_do_update(
+        index_elements=["tanggal", "kelas_id", "status"],
+        set_={"jumlah": AbsensiRekapKelas.jumlah + kelas_stmt.excluded.jumlah},
+    )
+    siswa_stmt = pg_insert(AbsensiRekapSiswa).from_select(
+        ["user_id", "semester_id", "status", "jumlah"], _siswa_rollup(source)
+    )
+    siswa_stmt = siswa_stmt.on_conflict_do_update(
+        index_elements=["user_id", "semester_id", "status"],
+        set_={"jumlah": AbsensiRekapSiswa.jumlah + siswa_stmt.excluded.jumlah},
+    )
+    await db.execute(siswa_stmt.add_cte(kelas_stmt.cte("kelas_rekap")))
+
+
+async def rebuild_rekap(db: AsyncSession) -> None:
+    """
+    Recompute both rollups from the absensi table inside the caller's transaction.
+
+    Fixes counts the incremental updates cannot follow: a student moved to
+    another kelas, semester dates edited, or absensi removed by a cascade.
+    """
+    await db.execute(delete(AbsensiRekapKelas))
+    await db.execute(delete(AbsensiRekapSiswa))
+    source = _absensi_source()
+    await db.execute(
+        pg_insert(AbsensiRekapKelas).from_select(
+            ["tanggal", "kelas_id", "status", "jumlah"], _kelas_rollup(source)
+        )
+    )
+    await db.execute(
+        pg_insert(AbsensiRekapSiswa).from_select(
+            ["user_id", "semester_id", "status", "jumlah"], _siswa_rollup(source)
+        )
+    )
+
+
+async def verify_rekap(db: AsyncSession) -> dict[str, list[tuple]]:
+    """
+    Compare both rollups with a from-scratch recount.
+
+    Returns:
+        Per table, the (key..., stored, expected) tuples that differ; empty
+        lists when the rollups are exact.
+    """
+    source = _absensi_source()
+    checks = {
+        AbsensiRekapKelas.__tablename__: (
+            _kelas_rollup(source),
+            select(AbsensiRekapKelas.tanggal, AbsensiRekapKelas.kelas_id,
+                   AbsensiRekapKelas.status, AbsensiRekapKelas.jumlah),
+        ),
+        AbsensiRekapSiswa.__tablename__: (
+            _siswa_rollup(source),
+            select(AbsensiRekapSiswa.user_id, AbsensiRekapSiswa.semester_id,
+                   AbsensiRekapSiswa.status, AbsensiRekapSiswa.jumlah),
+        ),
+    }
+    mismatches: dict[str, list[tuple]] = {}
+    for table, (expected_stmt, stored_stmt) in checks.items():
+        expected = {tuple(row[:3]): row[3] for row in (await db.execute(expected_stmt)).all()}
+        stored = {tuple(row[:3]): row[3] for row in (await db.execute(stored_stmt)).all()}
+        mismatches[table] = [
+            (*key, stored.get(key, 0), expected.get(key, 0))
+            for key in sorted(expected.keys() | stored.keys(), key=str)
+            if stored.get(key, 0) != expected.get(key, 0)
+        ]
+    return mismatches
+
+
+async def rekap_kelas(db: AsyncSession, tanggal: date) -> list[RekapKelasDTO]:
+    """
+    Per-kelas status counts for one date, read from the rollup.
+
+    One index range scan over absensi_rekap_kelas (at most a handful of rows
+    per kelas), so the cost follows the number of kelas, not of students.
+    """
+    result = await db.execute(
+        select(
+            AbsensiRekapKelas.kelas_id,
+            Kelas.nama_kelas,
+            AbsensiRekapKelas.status,
+            AbsensiRekapKelas.jumlah,
+        )
+        .join(Kelas, Kelas.kelas_id == AbsensiRekapKelas.kelas_id)
+        .where(AbsensiRekapKelas.tanggal == tanggal, AbsensiRekapKelas.jumlah > 0)
+        .order_by(Kelas.nama_kelas)
+    )
+    rekap: dict[UUID, RekapKelasDTO] = {}
+    for row in result.all():
+        entry = rekap.get(row.kelas_id)
+        if entry is None:
+            entry = rekap[row.kelas_id] = RekapKelasDTO(
+                kelas_id=row.kelas_id, nama_kelas=row.nama_kelas, tanggal=tanggal
+            )
+        setattr(entry, row.status.name, row.jumlah)
+        entry.total += row.jumlah
+    return list(rekap.values())
@@ -1,8 +1,15 @@
-from typing import Optional
-from datetime import date
+import base64
+from calendar import monthrange
+from collections import defaultdict
+from typing import AsyncIterator, Optional
+from datetime import date, timedelta
 from uuid import UUID
 from fastapi import HTTPException, status
-from sqlalchemy import select, and_, func
+from sqlalchemy import (
+    select, and_, tuple_, func, cast, case, true, literal, literal_column,
+    Boolean, Date, Text, UUID as SQLAlchemyUUID,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert, aggregate_order_by, ARRAY
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.absensi import Absensi
@@ -12,10 +19,23 @@ from app.models.siswa_profile import SiswaProfile
 from app.models.kelas import Kelas
 from app.models.siswa_kelas import SiswaKelas
 from app.models.guru_mapel import GuruMapel
-from app.enums import UserType
+from app.models.tahun_ajaran import TahunAjaran
+from app.models.kalender_akademik import KalenderAkademik
+from app.config.database import async_session_maker
+from app.config.settings import settings
+from app.enums import UserType, StatusAbsensi, JenisKalender
+from app.services.public_listing_cache import public_listing_cache
+from app.services.event_bus import event_bus
+from app.services.attendance_stream import AttendanceStream
+from app.services.absensi_rekap import previous_status, status_change, apply_rekap
+from app.services.student_locks import lock_students
+from app.utils.school_time import school_day_range, no_school_reason
 from app.dto.absensi.absensi_response import (
     AbsensiResponseDTO,
+    PaginatedAbsensiResponse,
     IzinKeluarResponseDTO,
+    AbsensiMatrixDTO,
+    AbsensiMatrixRowDTO,
 )
 from app.dto.absensi.public_response import (
     PublicAbsensiDTO,
@@ -56,6 +76,45 @@ class AbsensiService:
             )
         return user
 
+    async def _get_kelas_for(self, kelas_id: UUID, current_user: User, denied: str) -> Kelas:
+        """
+        Load a kelas the user may work with: admin, its wali kelas, or any
+        guru who teaches it.
+
+        Raises:
+            HTTPException: 404 if kelas not found
+            HTTPException: 403 with `denied` if no permission
+        """
+        result = await self.db.execute(
+            select(Kelas).where(Kelas.kelas_id == kelas_id)
+        )
+        kelas = result.scalar_one_or_none()
+        if not kelas:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Kelas with ID {kelas_id} not found"
+            )
+
+        if current_user.user_type != UserType.admin:
+            is_wali = kelas.wali_kelas_id == current_user.user_id
+
+            teaches_result = await self.db.execute(
+                select(GuruMapel).where(
+                    and_(
+                        GuruMapel.user_id == current_user.user_id,
+                        GuruMapel.kelas_id == kelas_id,
+                    )
+                )
+            )
+            is_teacher = teaches_result.first() is not None
+
+            if not is_wali and not is_teacher:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=denied
+                )
+        return kelas
+
     # ── Absensi helpers ──────────────────────────────────────────────────────
 
     def _to_absensi_dto(self, record: Absensi) -> AbsensiResponseDTO:
@@ -80,16 +139,133 @@ class AbsensiService:
 
     # ── Absensi CRUD ─────────────────────────────────────────────────────────
 
-    async def list_absensi(self) -> list[AbsensiResponseDTO]:
+    async def list_absensi(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        kelas_id: Optional[UUID] = None,
+        status_absensi: Optional[StatusAbsensi] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> PaginatedAbsensiResponse:
         """
-        List all attendance records.
+        One keyset page of attendance records, newest tanggal first.
+
+        Pass the returned next_cursor back to get the following page; it is
+        None on the last page. Pages cost the same however deep they are,
+        since the query seeks on ix_absensi_tanggal_absensi_id instead of
+        skipping rows.
 
         Raises:
-            HTTPException: 500 if database error
+            HTTPException: 400 if cursor is invalid
         """
-        result = await self.db.execute(select(Absensi))
-        records = result.scalars().all()
-        return [self._to_absensi_dto(r) for r in records]
+        after = self.decode_cursor(cursor) if cursor else None
+        rows = await self._fetch_absensi_page(
+            self.db, date_from, date_to, kelas_id, status_absensi, after, limit
+        )
+        return PaginatedAbsensiResponse(
+            items=rows[:limit],
+            next_cursor=self.encode_cursor(rows[limit - 1]) if len(rows) > limit else None,
+            limit=limit,
+        )
+
+    def stream_absensi_ndjson(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        kelas_id: Optional[UUID] = None,
+        status_absensi: Optional[StatusAbsensi] = None,
+        cursor: Optional[str] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        All matching attendance records as NDJSON, one AbsensiResponseDTO per line.
+
+        Walks the same keyset pages as list_absensi, ABSENSI_EXPORT_PAGE_SIZE
+        rows at a time, so at most one page is in memory. The pages are read
+        on a session of their own because the body is produced after the
+        request handler (and its session) has returned.
+
+        Raises:
+            HTTPException: 400 if cursor is invalid (raised before streaming starts)
+        """
+        after = self.decode_cursor(cursor) if cursor else None
+        return self._iter_absensi_ndjson(date_from, date_to, kelas_id, status_absensi, after)
+
+    async def _iter_absensi_ndjson(
+        self,
+        date_from: Optional[date],
+        date_to: Optional[date],
+        kelas_id: Optional[UUID],
+        status_absensi: Optional[StatusAbsensi],
+        after: Optional[tuple[date, UUID]],
+    ) -> AsyncIterator[bytes]:
+        page_size = settings.ABSENSI_EXPORT_PAGE_SIZE
+        async with async_session_maker() as session:
+            while True:
+                rows = await self._fetch_absensi_page(
+                    session, date_from, date_to, kelas_id, status_absensi, after, page_size
+                )
+                page = rows[:page_size]
+                if page:
+                    yield "".join(f"{row.model_dump_json()}\n" for row in page).encode()
+                if len(rows) <= page_size:
+                    return
+                after = (page[-1].tanggal, page[-1].absensi_id)
+
+    @staticmethod
+    async def _fetch_absensi_page(
+        db: AsyncSession,
+        date_from: Optional[date],
+        date_to: Optional[date],
+        kelas_id: Optional[UUID],
+        status_absensi: Optional[StatusAbsensi],
+        after: Optional[tuple[date, UUID]],
+        limit: int,
+    ) -> list[AbsensiResponseDTO]:
+        """Up to limit + 1 rows after the keyset position; the extra row signals a next page."""
+        stmt = select(
+            Absensi.absensi_id, Absensi.user_id, Absensi.tanggal,
+            Absensi.time_in, Absensi.time_out, Absensi.status, Absensi.marked_by,
+        )
+        if date_from is not None:
+            stmt = stmt.where(Absensi.tanggal >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(Absensi.tanggal <= date_to)
+        if kelas_id is not None:
+            stmt = stmt.where(
+                Absensi.user_id.in_(
+                    select(SiswaKelas.user_id).where(SiswaKelas.kelas_id == kelas_id)
+                )
+            )
+        if status_absensi is not None:
+            stmt = stmt.where(Absensi.status == status_absensi)
+        if after is not None:
+            stmt = stmt.where(tuple_(Absensi.tanggal, Absensi.absensi_id) < tuple_(*after))
+        stmt = stmt.order_by(Absensi.tanggal.desc(), Absensi.absensi_id.desc()).limit(limit + 1)
+
+        result = await db.execute(stmt)
+        return [AbsensiResponseDTO(**row._mapping) for row in result.all()]
+
+    @staticmethod
+    def encode_cursor(row: AbsensiResponseDTO) -> str:
+        raw = f"{row.tanggal.isoformat()}_{row.absensi_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[date, UUID]:
+        """
+        Raises:
+            HTTPException: 400 if the cursor was not produced by encode_cursor
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            tanggal, absensi_id = raw.split("_", 1)
+            return date.fromisoformat(tanggal), UUID(absensi_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
 
     async def list_absensi_by_student(self, user_id: UUID) -> list[AbsensiResponseDTO]:
         """
@@ -205,9 +381,19 @@ class AbsensiService:
         """
         Public list of attendance records filtered by date, with student names.
 
+        Served from the public listing cache; concurrent misses share one query.
+
         Raises:
             HTTPException: 500 if database error
         """
+        return await public_listing_cache.get_or_load(
+            "absensi", tanggal, search, skip, limit,
+            lambda: self._query_absensi_public(tanggal, search, skip, limit),
+        )
+
+    async def _query_absensi_public(
+        self, tanggal: date, search: Optional[str], skip: int, limit: int
+    ) -> list[PublicAbsensiDTO]:
         stmt = (
             select(Absensi)
             .join(User, Absensi.user_id == User.user_id)
@@ -221,9 +407,30 @@ class AbsensiService:
             stmt = stmt.where(SiswaProfile.nama_lengkap.ilike(f"%{search}%"))
         stmt = stmt.order_by(SiswaProfile.nama_lengkap).offset(skip).limit(limit)
 
-        result = await self.db.execute(stmt)
-        records = result.scalars().all()
-        return [self._to_public_absensi_dto(r) for r in records]
+        # Own session: the load is shared with other callers and may outlive this request's
+        async with async_session_maker() as session:
+            result = await session.execute(stmt)
+            records = result.scalars().all()
+            return [self._to_public_absensi_dto(r) for r in records]
+
+    @staticmethod
+    def izin_keluar_public_stmt(tanggal: date, search: Optional[str] = None):
+        """
+        Izin keluar of one school day, newest first.
+
+        The day is a half-open created_at range in SCHOOL_TIMEZONE so the
+        filter can use ix_izin_keluar_created_at (scripts/explain_izin_keluar.py).
+        """
+        start, end = school_day_range(tanggal)
+        stmt = (
+            select(IzinKeluar)
+            .join(User, IzinKeluar.user_id == User.user_id)
+            .outerjoin(SiswaProfile, User.user_id == SiswaProfile.user_id)
+            .where(IzinKeluar.created_at >= start, IzinKeluar.created_at < end)
+        )
+        if search:
+            stmt = stmt.where(SiswaProfile.nama_lengkap.ilike(f"%{search}%"))
+        return stmt.order_by(IzinKeluar.created_at.desc())
 
     async def list_izin_keluar_public(
         self,
@@ -235,34 +442,226 @@ class AbsensiService:
         """
         Public list of izin keluar records filtered by date, with student names.
 
+        Served from the public listing cache; concurrent misses share one query.
+
         Raises:
             HTTPException: 500 if database error
         """
+        return await public_listing_cache.get_or_load(
+            "izin_keluar", tanggal, search, skip, limit,
+            lambda: self._query_izin_keluar_public(tanggal, search, skip, limit),
+        )
+
+    async def _query_izin_keluar_public(
+        self, tanggal: date, search: Optional[str], skip: int, limit: int
+    ) -> list[PublicIzinKeluarDTO]:
         stmt = (
-            select(IzinKeluar)
-            .join(User, IzinKeluar.user_id == User.user_id)
-            .outerjoin(SiswaProfile, User.user_id == SiswaProfile.user_id)
+            self.izin_keluar_public_stmt(tanggal, search)
             .options(
                 selectinload(IzinKeluar.user).selectinload(User.siswa_profile)
             )
-            .where(func.date(IzinKeluar.created_at) == tanggal)
+            .offset(skip)
+            .limit(limit)
         )
-        if search:
-            stmt = stmt.where(SiswaProfile.nama_lengkap.ilike(f"%{search}%"))
-        stmt = stmt.order_by(IzinKeluar.created_at.desc()).offset(skip).limit(limit)
 
-        result = await self.db.execute(stmt)
-        records = result.scalars().all()
-        return [self._to_public_izin_dto(r) for r in records]
+        # Own session, see _query_absensi_public
+        async with async_session_maker() as session:
+            result = await session.execute(stmt)
+            records = result.scalars().all()
+            return [self._to_public_izin_dto(r) for r in records]
+
+    # ── Rekap Bulanan ────────────────────────────────────────────────────────
+
+    # One letter per cell of the monthly matrix
+    STATUS_CODES = {
+        StatusAbsensi.hadir: "H",
+        StatusAbsensi.terlambat: "T",
+        StatusAbsensi.alfa: "A",
+        StatusAbsensi.sakit: "S",
+        StatusAbsensi.izin: "I",
+    }
+    # School day without an absensi record
+    NO_RECORD = "-"
+
+    async def get_absensi_matrix(
+        self, kelas_id: UUID, tahun: int, bulan: int, current_user: User
+    ) -> AbsensiMatrixDTO:
+        """
+        Students x school days attendance grid of a kelas for one month.
+
+        Each student's row is one string with a STATUS_CODES letter per
+        school day (see _school_days), in the order of `hari`, built by a
+        single pivoting query.
+
+        Permission: admin, wali kelas of the class, or any guru who teaches the class.
+
+        Raises:
+            HTTPException: 404 if kelas not found
+            HTTPException: 403 if no permission
+        """
+        kelas = await self._get_kelas_for(
+            kelas_id, current_user,
+            "You don't have permission to view attendance for this class",
+        )
+        days = await self._school_days(kelas.tahun_ajaran_id, tahun, bulan)
+
+        siswa: list[AbsensiMatrixRowDTO] = []
+        if days:
+            result = await self.db.execute(self._absensi_matrix_stmt(kelas_id, days))
+            siswa = [
+                AbsensiMatrixRowDTO(
+                    user_id=row.user_id,
+                    nis=row.nis,
+                    nama_lengkap=row.nama_lengkap,
+                    status=row.status,
+                )
+                for row in result.all()
+            ]
+
+        return AbsensiMatrixDTO(
+            kelas_id=kelas.kelas_id,
+            nama_kelas=kelas.nama_kelas,
+            tahun=tahun,
+            bulan=bulan,
+            hari=[day.day for day in days],
+            kode={
+                **{code: value.value for value, code in self.STATUS_CODES.items()},
+                self.NO_RECORD: "Tidak ada data",
+            },
+            siswa=siswa,
+        )
+
+    async def _school_days(self, tahun_ajaran_id: UUID, tahun: int, bulan: int) -> list[date]:
+        """
+        School days of a month: the days inside the tahun ajaran that
+        no_school_reason accepts, the same rule as the Alfa closer.
+        """
+        result = await self.db.execute(
+            select(TahunAjaran.tanggal_mulai, TahunAjaran.tanggal_selesai)
+            .where(TahunAjaran.tahun_ajaran_id == tahun_ajaran_id)
+        )
+        tahun_ajaran = result.one()
+        start = max(date(tahun, bulan, 1), tahun_ajaran.tanggal_mulai)
+        end = min(date(tahun, bulan, monthrange(tahun, bulan)[1]), tahun_ajaran.tanggal_selesai)
+        if start > end:
+            return []
+
+        result = await self.db.execute(
+            select(KalenderAkademik.tanggal, KalenderAkademik.jenis, KalenderAkademik.keterangan).where(
+                KalenderAkademik.tahun_ajaran_id == tahun_ajaran_id,
+                KalenderAkademik.tanggal >= start,
+                KalenderAkademik.tanggal <= end,
+            )
+        )
+        entries: dict[date, list[tuple[JenisKalender, Optional[str]]]] = defaultdict(list)
+        for entry in result.all():
+            entries[entry.tanggal].append((entry.jenis, entry.keterangan))
+
+        days = (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+        return [day for day in days if no_school_reason(day, entries.get(day, ())) is None]
+
+    def _absensi_matrix_stmt(self, kelas_id: UUID, days: list[date]):
+        """
+        The pivot, one row per student of the kelas:
+
+            SELECT sk.user_id, sp.nis, sp.nama_lengkap,
+                   string_agg(CASE a.status WHEN 'Hadir' THEN 'H' ... ELSE '-' END,
+                              '' ORDER BY days.tanggal) AS status
+            FROM siswa_kelas sk JOIN siswa_profiles sp ...
+            JOIN unnest(:days) AS days(tanggal) ON true
+            LEFT JOIN absensi a ON a.user_id = sk.user_id AND a.tanggal = days.tanggal
+            WHERE sk.kelas_id = :kelas_id
+            GROUP BY sk.user_id, sp.nis, sp.nama_lengkap
+
+        The absensi lookups are served by uq_absensi_user_tanggal.
+        """
+        day = func.unnest(literal(days, ARRAY(Date))).table_valued("tanggal").render_derived(name="days")
+        code = case(
+            *[(Absensi.status == value, literal(letter)) for value, letter in self.STATUS_CODES.items()],
+            else_=literal(self.NO_RECORD),
+        )
+        return (
+            select(
+                SiswaKelas.user_id,
+                SiswaProfile.nis,
+                SiswaProfile.nama_lengkap,
+                func.string_agg(code, aggregate_order_by(literal(""), day.c.tanggal)).label("status"),
+            )
+            .join(SiswaProfile, SiswaProfile.user_id == SiswaKelas.user_id)
+            .join(day, true())
+            .outerjoin(
+                Absensi,
+                and_(Absensi.user_id == SiswaKelas.user_id, Absensi.tanggal == day.c.tanggal),
+            )
+            .where(SiswaKelas.kelas_id == kelas_id)
+            .group_by(SiswaKelas.user_id, SiswaProfile.nis, SiswaProfile.nama_lengkap)
+            .order_by(SiswaProfile.nama_lengkap)
+        )
 
     # ── Bulk Attendance ─────────────────────────────────────────────────────────
 
+    async def _upsert_absensi(
+        self, tanggal: date, statuses: dict[UUID, StatusAbsensi], marked_by: UUID
+    ):
+        """
+        Upsert one tanggal's absensi for many students in a single statement:
+
+            INSERT INTO absensi (absensi_id, user_id, tanggal, status, marked_by)
+            SELECT gen_random_uuid(), e.user_id, :tanggal, e.status::statusabsensi, :marked_by
+            FROM unnest(:user_ids, :statuses) AS e(user_id, status)
+            ON CONFLICT ON CONSTRAINT uq_absensi_user_tanggal
+            DO UPDATE SET status = excluded.status, marked_by = excluded.marked_by
+            RETURNING ..., (xmax = 0) AS inserted,
+                      (SELECT status FROM absensi previous WHERE previous.absensi_id = absensi.absensi_id)
+
+        xmax is 0 only on rows this statement inserted, so `inserted`
+        separates created from updated rows without reading them first. The
+        subquery (see previous_status) gives the status before the upsert,
+        which is what the absensi rollups need.
+        """
+        status_type = Absensi.__table__.c.status.type
+        entries = func.unnest(
+            literal(list(statuses.keys()), ARRAY(SQLAlchemyUUID(as_uuid=True))),
+            literal([value.value for value in statuses.values()], ARRAY(Text)),
+        ).table_valued("user_id", "status").render_derived(name="entries")
+
+        insert_stmt = pg_insert(Absensi).from_select(
+            ["absensi_id", "user_id", "tanggal", "status", "marked_by"],
+            select(
+                func.gen_random_uuid(),
+                entries.c.user_id,
+                literal(tanggal, Date),
+                cast(entries.c.status, status_type),
+                literal(marked_by, SQLAlchemyUUID(as_uuid=True)),
+            ),
+        )
+        result = await self.db.execute(
+            insert_stmt.on_conflict_do_update(
+                constraint="uq_absensi_user_tanggal",
+                set_={
+                    "status": insert_stmt.excluded.status,
+                    "marked_by": insert_stmt.excluded.marked_by,
+                },
+            )
+            .returning(
+                Absensi.absensi_id, Absensi.user_id, Absensi.tanggal,
+                Absensi.time_in, Absensi.time_out, Absensi.status,
+                literal_column("(xmax = 0)", Boolean).label("inserted"),
+                previous_status(),
+            )
+        )
+        return result.all()
+
     async def bulk_create_absensi(
         self, request: BulkAbsensiCreateDTO, current_user: User
     ) -> BulkAbsensiResponseDTO:
         """
         Bulk create/update attendance for a class.
 
+        All entries are applied by one upsert (see _upsert_absensi), the
+        absensi rollups follow in the same transaction and the changed rows
+        are published to the attendance stream on commit.
+
         Permission: admin, wali kelas of the class, or any guru who teaches the class.
 
         Raises:
@@ -272,80 +671,43 @@ class AbsensiService:
             HTTPException: 500 on database error
         """
         try:
-            # Validate kelas exists
-            result = await self.db.execute(
-                select(Kelas).where(Kelas.kelas_id == request.kelas_id)
+            await self._get_kelas_for(
+                request.kelas_id, current_user,
+                "You don't have permission to mark attendance for this class",
             )
-            kelas = result.scalar_one_or_none()
-            if not kelas:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Kelas with ID {request.kelas_id} not found"
-                )
-
-            # Permission check
-            if current_user.user_type != UserType.admin:
-                is_wali = kelas.wali_kelas_id == current_user.user_id
-
-                teaches_result = await self.db.execute(
-                    select(GuruMapel).where(
-                        and_(
-                            GuruMapel.user_id == current_user.user_id,
-                            GuruMapel.kelas_id == request.kelas_id,
-                        )
-                    )
-                )
-                is_teacher = teaches_result.first() is not None
-
-                if not is_wali and not is_teacher:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="You don't have permission to mark attendance for this class"
-                    )
 
-            # Get students in this kelas for validation
+            # Class-membership validation: one query, one set difference
             result = await self.db.execute(
                 select(SiswaKelas.user_id).where(
                     SiswaKelas.kelas_id == request.kelas_id
                 )
             )
             valid_student_ids = {row[0] for row in result.all()}
-
-            created = 0
-            updated = 0
-
-            for entry in request.entries:
-                if entry.user_id not in valid_student_ids:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Student {entry.user_id} is not in this class"
-                    )
-
-                # Check existing record (upsert)
-                result = await self.db.execute(
-                    select(Absensi).where(
-                        and_(
-                            Absensi.user_id == entry.user_id,
-                            Absensi.tanggal == request.tanggal,
-                        )
-                    )
+            # Last entry wins if a student is listed twice (ON CONFLICT can touch a row once)
+            statuses = {entry.user_id: entry.status for entry in request.entries}
+            outsiders = statuses.keys() - valid_student_ids
+            if outsiders:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Students not in this class: {', '.join(sorted(map(str, outsiders)))}"
                 )
-                existing = result.scalar_one_or_none()
-
-                if existing:
-                    existing.status = entry.status
-                    existing.marked_by = current_user.user_id
-                    updated += 1
-                else:
-                    record = Absensi(
-                        user_id=entry.user_id,
-                        tanggal=request.tanggal,
-                        status=entry.status,
-                        marked_by=current_user.user_id,
-                    )
-                    self.db.add(record)
-                    created += 1
 
+            # Same per-student locks as desktop ingest, so a concurrent tap cannot
+            # slip between the upsert's snapshot and its write (see lock_students)
+            await lock_students(self.db, statuses.keys())
+            rows = await self._upsert_absensi(
+                request.tanggal, statuses, current_user.user_id
+            )
+            created = sum(1 for row in rows if row.inserted)
+            updated = len(rows) - created
+
+            await apply_rekap(self.db, [
+                change for row in rows
+                for change in status_change(row.user_id, row.tanggal, row.previous_status, row.status)
+            ])
+            await event_bus.publish_items(self.db, AttendanceStream.TOPIC, [
+                AttendanceStream.absensi_delta(row, row.user_id) for row in rows
+            ])
             await self.db.commit()
 
             return BulkAbsensiResponseDTO(
@@ -0,0 +1,212 @@
+import asyncio
+import time as clock
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from uuid import UUID
+from fastapi import HTTPException, status
+from sqlalchemy import select, func, literal, cast, and_, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.config.database import engine
+from app.models.absensi import Absensi
+from app.models.user import User
+from app.models.siswa_profile import SiswaProfile
+from app.models.siswa_kelas import SiswaKelas
+from app.models.kelas import Kelas
+from app.models.tahun_ajaran import TahunAjaran
+from app.models.kalender_akademik import KalenderAkademik
+from app.enums import StatusAbsensi, StatusSiswa
+from app.services.public_listing_cache import public_listing_cache
+from app.services.absensi_rekap import RekapChange, apply_rekap
+from app.services.student_locks import lock_students
+from app.utils.school_time import school_tz, no_school_reason
+from app.dto.absensi.absensi_response import CloseDayReportDTO, CloseDayKelasDTO
+
+
+class AttendanceCloser:
+    """
+    End-of-day closer: writes an Alfa row for every active student without one.
+
+    After it ran, every active student of every kelas has exactly one absensi
+    row for the date, so summaries are plain counts instead of left joins
+    against the roster.
+
+    A date is closed kelas by kelas, one INSERT ... SELECT and one commit
+    each, so a large school never holds one long transaction. Dates that are
+    not school days are skipped: outside the tahun ajaran, weekends (unless
+    the kalender marks them hari efektif) and kalender libur days.
+
+    Re-running is safe: students that already have a row (a tap, a bulk
+    marking or an earlier run) are left alone. Runs for the same date are
+    serialized across workers with a session advisory lock; a late tap after
+    closing still upgrades the Alfa row through the masuk upsert.
+    """
+
+    # First key of pg_try_advisory_lock(key1, key2); key2 is the date's ordinal
+    LOCK_NAMESPACE = 0xA1FA
+
+    async def close_day(self, tanggal: date) -> CloseDayReportDTO:
+        """
+        Insert Alfa rows for `tanggal` and report per-kelas counts and timings.
+
+        Raises:
+            HTTPException: 409 if another run for the same date is in progress
+        """
+        started = clock.perf_counter()
+        async with engine.connect() as conn:
+            locked = await conn.scalar(
+                select(func.pg_try_advisory_lock(self.LOCK_NAMESPACE, tanggal.toordinal()))
+            )
+            await conn.commit()
+            if not locked:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Closing {tanggal} is already in progress"
+                )
+            try:
+                report = await self._close_day(conn, tanggal)
+            finally:
+                await conn.rollback()
+                await conn.execute(
+                    select(func.pg_advisory_unlock(self.LOCK_NAMESPACE, tanggal.toordinal()))
+                )
+                await conn.commit()
+
+        report.duration_ms = (clock.perf_counter() - started) * 1000
+        return report
+
+    async def _close_day(self, conn: AsyncConnection, tanggal: date) -> CloseDayReportDTO:
+        tahun_ajaran_id, reason = await self._school_day(conn, tanggal)
+        if tahun_ajaran_id is None:
+            return CloseDayReportDTO(tanggal=tanggal, school_day=False, reason=reason, duration_ms=0)
+
+        result = await conn.execute(
+            select(Kelas.kelas_id, Kelas.nama_kelas)
+            .where(Kelas.tahun_ajaran_id == tahun_ajaran_id)
+            .order_by(Kelas.nama_kelas)
+        )
+        report = CloseDayReportDTO(tanggal=tanggal, school_day=True, duration_ms=0)
+        for kelas in result.all():
+            started = clock.perf_counter()
+            inserted = await self._close_kelas(conn, tanggal, kelas.kelas_id)
+            await conn.commit()
+            report.kelas.append(CloseDayKelasDTO(
+                kelas_id=kelas.kelas_id,
+                nama_kelas=kelas.nama_kelas,
+                inserted=inserted,
+                duration_ms=(clock.perf_counter() - started) * 1000,
+            ))
+            report.inserted += inserted
+
+        if report.inserted:
+            await public_listing_cache.publish_changed(conn, "absensi", {tanggal})
+            await conn.commit()
+        return report
+
+    async def _school_day(
+        self, conn: AsyncConnection, tanggal: date
+    ) -> tuple[Optional[UUID], Optional[str]]:
+        """(tahun_ajaran_id, None) for a school day, else (None, reason)."""
+        result = await conn.execute(
+            select(TahunAjaran.tahun_ajaran_id)
+            .where(TahunAjaran.tanggal_mulai <= tanggal, TahunAjaran.tanggal_selesai >= tanggal)
+            .order_by(TahunAjaran.is_active.desc())
+            .limit(1)
+        )
+        tahun_ajaran_id = result.scalar()
+        if tahun_ajaran_id is None:
+            return None, "Outside every tahun ajaran"
+
+        result = await conn.execute(
+            select(KalenderAkademik.jenis, KalenderAkademik.keterangan).where(
+                KalenderAkademik.tahun_ajaran_id == tahun_ajaran_id,
+                KalenderAkademik.tanggal == tanggal,
+            )
+        )
+        reason = no_school_reason(tanggal, result.all())
+        if reason is not None:
+            return None, reason
+        return tahun_ajaran_id, None
+
+    async def _close_kelas(self, conn: AsyncConnection, tanggal: date, kelas_id: UUID) -> int:
+        """
+        One kelas in one statement:
+
+            INSERT INTO absensi (absensi_id, user_id, tanggal, status)
+            SELECT gen_random_uuid(), sk.user_id, :tanggal, 'Alfa'
+            FROM siswa_kelas sk JOIN users ... JOIN siswa_profiles ...
+            WHERE sk.kelas_id = :kelas_id AND <active student>
+              AND NOT EXISTS (absensi of that student on :tanggal)
+            ON CONFLICT ON CONSTRAINT uq_absensi_user_tanggal DO NOTHING
+            RETURNING user_id
+
+        The kelas' students are locked first (lock_students, like every absensi
+        writer) and the returned students are added to the absensi rollups as
+        Alfa in the same transaction.
+        """
+        # A tap upserting the same student mid-statement would miss the Alfa row
+        # in its previous_status() snapshot and skew the rollups
+        members = await conn.execute(
+            select(SiswaKelas.user_id).where(SiswaKelas.kelas_id == kelas_id)
+        )
+        await lock_students(conn, members.scalars().all())
+
+        already_marked = exists().where(
+            Absensi.user_id == SiswaKelas.user_id,
+            Absensi.tanggal == tanggal,
+        )
+        status_type = Absensi.__table__.c.status.type
+        missing = (
+            select(
+                func.gen_random_uuid(),
+                SiswaKelas.user_id,
+                literal(tanggal, Absensi.__table__.c.tanggal.type),
+                cast(literal(StatusAbsensi.alfa.value), status_type),
+            )
+            .join(User, SiswaKelas.user_id == User.user_id)
+            .join(SiswaProfile, SiswaKelas.user_id == SiswaProfile.user_id)
+            .where(
+                and_(
+                    SiswaKelas.kelas_id == kelas_id,
+                    User.is_active == True,
+                    SiswaProfile.status_siswa == StatusSiswa.aktif,
+                    ~already_marked,
+                )
+            )
+        )
+        result = await conn.execute(
+            pg_insert(Absensi)
+            .from_select(["absensi_id", "user_id", "tanggal", "status"], missing)
+            .on_conflict_do_nothing(constraint="uq_absensi_user_tanggal")
+            .returning(Absensi.user_id)
+        )
+        user_ids = result.scalars().all()
+        await apply_rekap(conn, [
+            RekapChange(user_id, tanggal, StatusAbsensi.alfa, 1) for user_id in user_ids
+        ])
+        return len(user_ids)
+
+    async def run_schedule_loop(self, at: time) -> None:
+        """Background task: close each school day at `at` school-local time."""
+        while True:
+            now = datetime.now(school_tz())
+            run_at = datetime.combine(now.date(), at, tzinfo=school_tz())
+            if run_at <= now:
+                run_at += timedelta(days=1)
+            await asyncio.sleep((run_at - now).total_seconds())
+            try:
+                report = await self.close_day(run_at.date())
+                print(
+                    f"Alfa closer {report.tanggal}: "
+                    + (f"{report.inserted} rows over {len(report.kelas)} kelas"
+                       if report.school_day else f"skipped ({report.reason})")
+                    + f" in {report.duration_ms:.0f} ms"
+                )
+            except HTTPException:
+                pass  # another worker is closing the same day
+            except Exception as e:
+                print(f"Alfa closer failed: {e}")
+
+
+# Singleton instance (one scheduler per worker process; the advisory lock picks one)
+attendance_closer = AttendanceCloser()
@@ -0,0 +1,198 @@
+import asyncio
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
+from fastapi import HTTPException, status
+from openpyxl import Workbook
+from sqlalchemy import select, Select
+from app.config.database import async_session_maker
+from app.config.settings import settings
+from app.models.absensi import Absensi
+from app.models.izin_keluar import IzinKeluar
+from app.models.siswa_profile import SiswaProfile
+from app.models.siswa_kelas import SiswaKelas
+from app.utils.school_time import school_day_range, school_date, school_local
+
+
+class AttendanceExport:
+    """
+    Attendance and izin keluar exports as CSV or XLSX, for the monthly
+    report to the dinas.
+
+    Rows come off a server-side cursor (AsyncSession.stream with
+    yield_per), EXPORT_FETCH_SIZE at a time, on a session of its own
+    because the body is produced after the request handler has returned.
+    Memory stays flat whatever the date range:
+
+      - CSV is encoded and sent per fetch, so the download starts at once
+      - XLSX rows go into an openpyxl write-only workbook, which spools
+        the sheet to a temporary file; the finished file is then streamed
+        in chunks (a zip cannot be sent before it is complete)
+    """
+
+    MEDIA_TYPES = {
+        "csv": "text/csv; charset=utf-8",
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    }
+
+    HEADERS = {
+        "absensi": ["Tanggal", "NIS", "Nama", "Kelas", "Status", "Jam Masuk", "Jam Keluar"],
+        "izin_keluar": ["Tanggal", "NIS", "Nama", "Kelas", "Keterangan", "Waktu Keluar", "Waktu Kembali"],
+    }
+
+    # Bytes per chunk when streaming the finished XLSX file
+    FILE_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fetch_size: int):
+        self.fetch_size = fetch_size
+
+    def filename(self, jenis: str, format: str, date_from: date, date_to: date) -> str:
+        return f"{jenis}_{date_from.isoformat()}_{date_to.isoformat()}.{format}"
+
+    def stream(
+        self,
+        jenis: str,
+        format: str,
+        date_from: date,
+        date_to: date,
+        kelas_id: Optional[UUID] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        The export file of `jenis` ("absensi" or "izin_keluar") in `format`
+        ("csv" or "xlsx"), oldest first.
+
+        Raises:
+            HTTPException: 400 if date_to is before date_from (raised before streaming starts)
+        """
+        if date_to < date_from:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="date_to must not be before date_from"
+            )
+        if jenis == "absensi":
+            stmt = self._absensi_stmt(date_from, date_to, kelas_id)
+        else:
+            stmt = self._izin_keluar_stmt(date_from, date_to, kelas_id)
+        if format == "csv":
+            return self._write_csv(jenis, stmt)
+        return self._write_xlsx(jenis, stmt)
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _absensi_stmt(date_from: date, date_to: date, kelas_id: Optional[UUID]) -> Select:
+        stmt = (
+            select(
+                Absensi.tanggal,
+                SiswaProfile.nis,
+                SiswaProfile.nama_lengkap,
+                SiswaProfile.kelas_jurusan,
+                Absensi.status,
+                Absensi.time_in,
+                Absensi.time_out,
+            )
+            .join(SiswaProfile, SiswaProfile.user_id == Absensi.user_id)
+            .where(Absensi.tanggal >= date_from, Absensi.tanggal <= date_to)
+            .order_by(Absensi.tanggal, SiswaProfile.kelas_jurusan, SiswaProfile.nama_lengkap)
+        )
+        if kelas_id is not None:
+            stmt = stmt.where(
+                Absensi.user_id.in_(
+                    select(SiswaKelas.user_id).where(SiswaKelas.kelas_id == kelas_id)
+                )
+            )
+        return stmt
+
+    @staticmethod
+    def _izin_keluar_stmt(date_from: date, date_to: date, kelas_id: Optional[UUID]) -> Select:
+        # Indexed range on created_at (ix_izin_keluar_created_at), see school_day_range
+        start, _ = school_day_range(date_from)
+        _, end = school_day_range(date_to)
+        stmt = (
+            select(
+                IzinKeluar.created_at.label("tanggal"),
+                SiswaProfile.nis,
+                SiswaProfile.nama_lengkap,
+                SiswaProfile.kelas_jurusan,
+                IzinKeluar.keterangan,
+                IzinKeluar.created_at.label("waktu_keluar"),
+                IzinKeluar.waktu_kembali,
+            )
+            .join(SiswaProfile, SiswaProfile.user_id == IzinKeluar.user_id)
+            .where(IzinKeluar.created_at >= start, IzinKeluar.created_at < end)
+            .order_by(IzinKeluar.created_at)
+        )
+        if kelas_id is not None:
+            stmt = stmt.where(
+                IzinKeluar.user_id.in_(
+                    select(SiswaKelas.user_id).where(SiswaKelas.kelas_id == kelas_id)
+                )
+            )
+        return stmt
+
+    async def _fetch(self, stmt: Select) -> AsyncIterator[list[list[Any]]]:
+        """Rows of stmt as spreadsheet cells, one server-side cursor fetch at a time."""
+        async with async_session_maker() as session:
+            result = await session.stream(stmt.execution_options(yield_per=self.fetch_size))
+            async for partition in result.partitions():
+                yield [self._cells(row) for row in partition]
+
+    @staticmethod
+    def _cells(row) -> list[Any]:
+        """
+        Enum values as text and timestamps as naive school-local time; the
+        leading izin keluar created_at becomes its school date.
+        """
+        cells = [
+            cell.value if isinstance(cell, Enum)
+            else school_local(cell) if isinstance(cell, datetime)
+            else cell
+            for cell in row
+        ]
+        if isinstance(row[0], datetime):
+            cells[0] = school_date(row[0])
+        return cells
+
+    # ── Writers ──────────────────────────────────────────────────────────────
+
+    async def _write_csv(self, jenis: str, stmt: Select) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM so Excel opens the UTF-8 file with the right encoding
+        buffer.write("\ufeff")
+        writer.writerow(self.HEADERS[jenis])
+        yield buffer.getvalue().encode()
+        async for rows in self._fetch(stmt):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                [
+                    cell.isoformat(sep=" ", timespec="seconds") if isinstance(cell, datetime) else cell
+                    for cell in row
+                ]
+                for row in rows
+            )
+            yield buffer.getvalue().encode()
+
+    async def _write_xlsx(self, jenis: str, stmt: Select) -> AsyncIterator[bytes]:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=jenis)
+        sheet.append(self.HEADERS[jenis])
+        async for rows in self._fetch(stmt):
+            for row in rows:
+                sheet.append(row)
+
+        with tempfile.TemporaryFile() as file:
+            # Zipping the spooled sheet is CPU and disk work, keep it off the event loop
+            await asyncio.to_thread(workbook.save, file)
+            file.seek(0)
+            while chunk := await asyncio.to_thread(file.read, self.FILE_CHUNK_SIZE):
+                yield chunk
+
+
+# Singleton instance (stateless; each export opens its own session)
+attendance_export = AttendanceExport(fetch_size=settings.EXPORT_FETCH_SIZE)
@@ -0,0 +1,162 @@
+import asyncio
+import json
+from datetime import date
+from typing import Any, AsyncIterator, Callable, Awaitable, Optional
+from uuid import UUID
+from app.config.settings import settings
+from app.services.roster_index import roster_index
+from app.utils.school_time import school_date
+from app.dto.absensi.public_response import PublicAbsensiDTO, PublicIzinKeluarDTO
+
+
+class _Subscriber:
+    """One open SSE connection: its date filter and bounded frame queue."""
+
+    def __init__(self, tanggal: date, queue_size: int):
+        self.tanggal = tanggal
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, frame: str) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class AttendanceStream:
+    """
+    Per-worker server-sent-events fan-out of committed attendance deltas.
+
+    Desktop ingest and bulk class marking publish compact deltas on TOPIC
+    in their transaction (see EventBus.publish_items), so every worker
+    receives them only after the commit, whichever worker wrote them. Each delta is
+    enriched from the roster index into the public DTO shape and rendered
+    once, then offered to every subscriber watching that tanggal.
+
+    Queues are bounded: a dashboard that cannot keep up gets a single
+    `resync` event instead of an ever-growing backlog, and should refetch
+    the public lists.
+    """
+
+    TOPIC = "absensi.delta"
+
+    def __init__(self, queue_size: int, heartbeat_seconds: int):
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self._subscribers: set[_Subscriber] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # ── Publishing side ──────────────────────────────────────────────────────
+
+    @staticmethod
+    def absensi_delta(row: Any, user_id: UUID) -> dict[str, Any]:
+        """Delta for an absensi row returned by the ingest upsert/update."""
+        return {
+            "kind": "absensi",
+            "absensi_id": str(row.absensi_id),
+            "user_id": str(user_id),
+            "tanggal": row.tanggal.isoformat(),
+            "time_in": row.time_in.isoformat() if row.time_in else None,
+            "time_out": row.time_out.isoformat() if row.time_out else None,
+            "status": row.status.value,
+        }
+
+    @staticmethod
+    def izin_delta(izin: Any) -> dict[str, Any]:
+        """Delta for an izin keluar record, dated by its school day."""
+        return {
+            "kind": "izin_keluar",
+            "izin_id": str(izin.izin_id),
+            "user_id": str(izin.user_id),
+            "tanggal": school_date(izin.created_at).isoformat(),
+            "created_at": izin.created_at.isoformat(),
+            "keterangan": izin.keterangan,
+            "waktu_kembali": izin.waktu_kembali.isoformat() if izin.waktu_kembali else None,
+        }
+
+    def on_delta(self, payload: dict[str, Any]) -> None:
+        """Event bus callback: render each delta and offer it to matching subscribers."""
+        if not self._subscribers:
+            return
+        for item in payload.get("items", ()):
+            tanggal = date.fromisoformat(item["tanggal"])
+            frame = self._render(item)
+            for subscriber in self._subscribers:
+                if subscriber.tanggal == tanggal:
+                    subscriber.offer(frame)
+
+    @staticmethod
+    def _render(item: dict[str, Any]) -> str:
+        entry = roster_index.get(UUID(item["user_id"]))
+        nama_siswa = entry.nama_lengkap if entry and entry.nama_lengkap else "Unknown"
+        kelas = entry.kelas_jurusan if entry else None
+        if item["kind"] == "absensi":
+            dto = PublicAbsensiDTO(
+                absensi_id=item["absensi_id"],
+                nama_siswa=nama_siswa,
+                kelas=kelas,
+                tanggal=item["tanggal"],
+                time_in=item["time_in"],
+                time_out=item["time_out"],
+                status=item["status"],
+            )
+        else:
+            dto = PublicIzinKeluarDTO(
+                izin_id=item["izin_id"],
+                nama_siswa=nama_siswa,
+                kelas=kelas,
+                created_at=item["created_at"],
+                keterangan=item["keterangan"],
+                waktu_kembali=item["waktu_kembali"],
+            )
+        return f"event: {item['kind']}\ndata: {dto.model_dump_json()}\n\n"
+
+    # ── Subscribing side ─────────────────────────────────────────────────────
+
+    async def stream(
+        self,
+        tanggal: date,
+        is_disconnected: Callable[[], Awaitable[bool]],
+    ) -> AsyncIterator[str]:
+        """
+        SSE body for one dashboard: deltas for `tanggal` as they commit.
+
+        Emits `absensi` and `izin_keluar` events carrying PublicAbsensiDTO /
+        PublicIzinKeluarDTO JSON, a `resync` event after an overflow, and a
+        comment line every heartbeat_seconds so proxies keep the connection
+        open and disconnects are noticed.
+        """
+        subscriber = _Subscriber(tanggal, self.queue_size)
+        self._subscribers.add(subscriber)
+        try:
+            yield f"retry: 3000\nevent: ready\ndata: {json.dumps({'tanggal': tanggal.isoformat()})}\n\n"
+            while True:
+                if subscriber.overflowed:
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.overflowed = False
+                    yield "event: resync\ndata: {}\n\n"
+                    continue
+                frame: Optional[str]
+                try:
+                    frame = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=self.heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    frame = None
+                if await is_disconnected():
+                    return
+                yield frame if frame is not None else ": ping\n\n"
+        finally:
+            self._subscribers.discard(subscriber)
+
+
+# Singleton instance (one subscriber set per worker process)
+attendance_stream = AttendanceStream(
+    queue_size=settings.SSE_QUEUE_SIZE,
+    heartbeat_seconds=settings.SSE_HEARTBEAT_SECONDS,
+)
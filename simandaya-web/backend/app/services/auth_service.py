@@ -4,6 +4,8 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 from app.utils.jwt_utils import JWTManager
+from app.services.roster_index import roster_index
+from app.services.roster_version import bump_roster_version
 from app.dto.auth.auth_request import SignupRequestDTO, LoginRequestDTO
 from app.dto.auth.auth_response import (
     UserResponseDTO,
@@ -11,7 +13,7 @@ from app.dto.auth.auth_response import (
     SignupResponseDTO,
     MessageResponseDTO
 )
-from app.enums import RegistrationStatus
+from app.enums import RegistrationStatus, UserType
 
 
 class AuthService:
@@ -67,8 +69,12 @@ class AuthService:
 
             # Save to database
             self.db.add(user)
+            if user.user_type == UserType.siswa:
+                await self.db.flush()
+                await bump_roster_version(self.db, user.user_id)
             await self.db.commit()
             await self.db.refresh(user)
+            await roster_index.refresh_user(self.db, user.user_id)
 
             # Convert to DTO
             user_dto = UserResponseDTO(
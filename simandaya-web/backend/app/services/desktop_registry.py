@@ -0,0 +1,45 @@
+import asyncio
+from typing import Any
+
+
+class DesktopConnectionRegistry:
+    """
+    Registry of desktop WebSocket connections in this worker.
+
+    Each connection registers an outbound queue of control messages; the
+    socket's push task drains it. broadcast() is subscribed to the event bus
+    topics below, so a change committed in any worker reaches every gate.
+    """
+
+    TOPIC_ROSTER = "desktop.roster"
+    TOPIC_SETTINGS = "desktop.settings"
+
+    def __init__(self):
+        self._queues: set[asyncio.Queue] = set()
+
+    def __len__(self) -> int:
+        return len(self._queues)
+
+    def register(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues.add(queue)
+        return queue
+
+    def unregister(self, queue: asyncio.Queue) -> None:
+        self._queues.discard(queue)
+
+    def broadcast(self, message: dict[str, Any]) -> None:
+        for queue in self._queues:
+            queue.put_nowait(message)
+
+    def on_roster_changed(self, payload: dict[str, Any]) -> None:
+        if payload.get("version") is None:
+            return  # roster index only (see publish_roster_users)
+        self.broadcast({"type": "roster_changed", "version": payload["version"]})
+
+    def on_settings_changed(self, payload: dict[str, Any]) -> None:
+        self.broadcast({"type": "settings_changed", **payload})
+
+
+# Singleton instance (one registry per worker process)
+desktop_registry = DesktopConnectionRegistry()
@@ -1,17 +1,33 @@
 from datetime import datetime, time, timezone
-from uuid import UUID
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID, uuid4
 from fastapi import HTTPException, status
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, and_, case, func, literal, Time
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 from app.models.siswa_profile import SiswaProfile
 from app.models.absensi import Absensi
 from app.models.izin_keluar import IzinKeluar
 from app.models.desktop_settings import DesktopSettings
+from app.models.roster_change import RosterChange
+from app.config.settings import settings
 from app.enums import UserType, StatusAbsensi
+from app.services.roster_index import roster_index, RosterEntry
+from app.services.ingest_ledger import ingest_ledger
+from app.services.device_registry import device_registry
+from app.services.roster_version import get_roster_version
+from app.services.student_locks import lock_students
+from app.services.event_bus import event_bus
+from app.services.attendance_stream import AttendanceStream
+from app.services.absensi_rekap import RekapChange, previous_status, status_change, apply_rekap
+from app.services.desktop_registry import DesktopConnectionRegistry
+from app.utils.school_time import school_date, school_day_range
+from app.utils.ndjson import LineTooLongError
 from app.dto.desktop.desktop_request import AttendanceEventDTO
 from app.dto.desktop.desktop_response import (
     StudentSyncDTO,
+    StudentDeltaDTO,
     AttendanceAckDTO,
     DesktopSettingsDTO,
 )
@@ -25,47 +41,31 @@ class DesktopService:
         HTTPException: 400, 404, 500
     """
 
+    # Absensi columns returned by the ingest writes for attendance stream deltas
+    _DELTA_COLUMNS = (
+        Absensi.absensi_id, Absensi.tanggal, Absensi.time_in, Absensi.time_out, Absensi.status,
+    )
+
     def __init__(self, db: AsyncSession):
         self.db = db
-
-    async def _validate_active_siswa(self, user_id: UUID) -> User:
+        # (device_id, hik_serial_no) of ok events, reported by committed()
+        self._observed: list[tuple[str, int]] = []
+        # Compact deltas of applied events, published to dashboards on commit
+        self._deltas: list[dict[str, Any]] = []
+        # Status changes of applied events, added to the absensi rollups
+        self._rekap: list[RekapChange] = []
+
+    async def _validate_active_siswa(self, user_id: UUID) -> RosterEntry:
         """
-        Validate that user_id belongs to an active siswa.
+        Validate that user_id belongs to an active siswa using the in-memory
+        roster index (no database round trip unless the index rejects it,
+        then the user is re-read once).
 
         Raises:
             HTTPException: 404 if user not found
             HTTPException: 400 if user is not an active student
         """
-        result = await self.db.execute(
-            select(User).where(User.user_id == user_id)
-        )
-        user = result.scalar_one_or_none()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"User {user_id} not found"
-            )
-        if user.user_type != UserType.siswa:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"User {user_id} is not a student"
-            )
-        if not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"User {user_id} is not active"
-            )
-        return user
-
-    async def _get_late_cutoff_time(self) -> time:
-        """Get the late cutoff time from settings, defaults to 07:15."""
-        result = await self.db.execute(
-            select(DesktopSettings).where(DesktopSettings.id == 1)
-        )
-        settings_row = result.scalar_one_or_none()
-        if settings_row:
-            return settings_row.late_cutoff_time
-        return time(7, 15)
+        return await roster_index.ensure_active_siswa(self.db, user_id)
 
     # ── Student Sync ─────────────────────────────────────────────────────────
 
@@ -103,25 +103,90 @@ class DesktopService:
             for row in rows
         ]
 
+    async def get_roster_version(self) -> int:
+        """Current roster version, used as the ETag of the student list."""
+        return await get_roster_version(self.db)
+
+    async def list_students_delta(self, since: int, version: int) -> StudentDeltaDTO:
+        """
+        Students added, changed or deactivated after roster version `since`.
+
+        If `since` is ahead of the server (e.g. the database was reset) the
+        full roster is returned with reset=True.
+
+        Raises:
+            HTTPException: 500 on database error
+        """
+        if since > version:
+            return StudentDeltaDTO(
+                version=version,
+                reset=True,
+                upserts=await self.list_students(),
+                removed=[],
+            )
+
+        result = await self.db.execute(
+            select(
+                RosterChange.user_id,
+                User.user_type,
+                User.is_active,
+                SiswaProfile.nama_lengkap,
+                SiswaProfile.nis,
+                SiswaProfile.kelas_jurusan,
+            )
+            .outerjoin(User, RosterChange.user_id == User.user_id)
+            .outerjoin(SiswaProfile, RosterChange.user_id == SiswaProfile.user_id)
+            .where(
+                and_(
+                    RosterChange.version > since,
+                    RosterChange.version <= version,
+                )
+            )
+            .order_by(RosterChange.version)
+        )
+
+        upserts: list[StudentSyncDTO] = []
+        removed: list[UUID] = []
+        for row in result.all():
+            if row.user_type == UserType.siswa and row.is_active and row.nama_lengkap is not None:
+                upserts.append(
+                    StudentSyncDTO(
+                        user_id=row.user_id,
+                        nama_lengkap=row.nama_lengkap,
+                        nis=row.nis,
+                        kelas_jurusan=row.kelas_jurusan,
+                    )
+                )
+            else:
+                removed.append(row.user_id)
+
+        return StudentDeltaDTO(version=version, upserts=upserts, removed=removed)
+
     # ── Attendance Processing ────────────────────────────────────────────────
 
     async def process_attendance_event(self, event: AttendanceEventDTO) -> AttendanceAckDTO:
         """
         Process an attendance event from the desktop app.
 
-        Dispatches to the appropriate handler based on event_type.
+        Dispatches to the appropriate handler based on event_type. A record_id
+        already in the ingest ledger is answered with its original ack.
 
         Raises:
             HTTPException: 400, 404 on validation errors
             HTTPException: 500 on database error
         """
         try:
-            if event.event_type == "absen_masuk":
-                return await self._handle_absen_masuk(event)
-            elif event.event_type == "absen_keluar":
-                return await self._handle_absen_keluar(event)
-            elif event.event_type == "izin":
-                return await self._handle_izin(event)
+            await lock_students(self.db, [event.user_id])
+            replayed = await ingest_ledger.lookup(self.db, [event.record_id])
+            ack = replayed.get(event.record_id)
+            if ack is None:
+                ack = await self._dispatch_event(event)
+                await ingest_ledger.record(self.db, [ack])
+                await self._apply_rekap()
+                await self._publish_deltas()
+            if ack.status == "ok":
+                self._observe_serial(event.device_id, event.hik_serial_no)
+            return ack
         except HTTPException:
             raise
         except Exception as e:
@@ -131,59 +196,283 @@ class DesktopService:
                 detail=f"Failed to process attendance event: {str(e)}"
             )
 
+    async def process_attendance_batch(self, events: list[dict]) -> list[AttendanceAckDTO]:
+        """
+        Process a batch of attendance events in the caller's transaction.
+
+        The students in the batch are locked first (see lock_students), so
+        the ledger lookup and the absensi writes never race another worker
+        handling the same student. Each event runs inside its own SAVEPOINT,
+        so a failing event only rolls back its own writes and yields an error
+        ack; the rest of the batch is kept. The caller commits once for the
+        whole batch and then calls committed().
+
+        record_ids already in the ingest ledger (replays) are answered with
+        their original ack without touching absensi; ok acks for new records
+        are written to the ledger in the same transaction, status changes are
+        added to the absensi rollups, and the resulting absensi/izin changes
+        are published to the attendance stream, which delivers them only once
+        the transaction commits.
+
+        Returns:
+            One AttendanceAckDTO per event, in input order.
+        """
+        await lock_students(self.db, self._event_user_ids(events))
+        record_ids = [
+            data["record_id"] for data in events
+            if isinstance(data.get("record_id"), str)
+        ]
+        replayed = await ingest_ledger.lookup(self.db, record_ids)
+
+        acks: list[AttendanceAckDTO] = []
+        processed: dict[str, AttendanceAckDTO] = {}
+        for data in events:
+            record_id = data.get("record_id")
+            if isinstance(record_id, str):
+                previous = replayed.get(record_id) or processed.get(record_id)
+                if previous is not None:
+                    self._observe_serial(data.get("device_id"), data.get("hik_serial_no"))
+                    acks.append(previous)
+                    continue
+
+            deltas, rekap = len(self._deltas), len(self._rekap)
+            try:
+                event = AttendanceEventDTO(**data)
+                async with self.db.begin_nested():
+                    ack = await self._dispatch_event(event)
+            except Exception as e:
+                del self._deltas[deltas:]
+                del self._rekap[rekap:]
+                ack = self.error_ack(data.get("record_id", "unknown"), e)
+                if isinstance(e, HTTPException) and e.status_code < 500:
+                    # Rejected for good (unknown or inactive student): re-polling won't help
+                    self._observe_serial(event.device_id, event.hik_serial_no)
+
+            if ack.status == "ok":
+                processed[ack.record_id] = ack
+                self._observe_serial(event.device_id, event.hik_serial_no)
+            acks.append(ack)
+
+        await ingest_ledger.record(self.db, list(processed.values()))
+        await self._apply_rekap()
+        await self._publish_deltas()
+        return acks
+
+    async def ingest_event_stream(
+        self,
+        lines: AsyncIterator[tuple[int, Any]],
+        chunk_size: int,
+        max_events: int,
+    ) -> list[AttendanceAckDTO]:
+        """
+        Apply a stream of parsed NDJSON lines (see app.utils.ndjson) in chunks.
+
+        Each chunk goes through process_attendance_batch and is committed on
+        its own, so a day-long catch-up makes progress even if a later chunk
+        fails. Lines that are not JSON objects get an error ack with
+        record_id "line <n>".
+
+        Returns:
+            One AttendanceAckDTO per non-blank line, in input order.
+
+        Raises:
+            HTTPException: 400 if the body cannot be decoded
+            HTTPException: 413 if the body has more than max_events lines,
+                or a line longer than the parser's max_line_bytes
+        """
+        acks: list[Optional[AttendanceAckDTO]] = []
+        chunk: list[tuple[int, dict]] = []
+
+        async def flush() -> None:
+            results = await self._ingest_chunk([data for _, data in chunk])
+            for (index, _), ack in zip(chunk, results):
+                acks[index] = ack
+            chunk.clear()
+
+        try:
+            async for line_number, value in lines:
+                if len(acks) >= max_events:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Too many events, send at most {max_events} per request"
+                    )
+                if isinstance(value, dict):
+                    chunk.append((len(acks), value))
+                    acks.append(None)
+                    if len(chunk) >= chunk_size:
+                        await flush()
+                else:
+                    reason = value if isinstance(value, Exception) else ValueError("Not a JSON object")
+                    acks.append(self.error_ack(f"line {line_number}", reason))
+        except LineTooLongError as e:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=str(e)
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+        if chunk:
+            await flush()
+        return acks
+
+    async def _ingest_chunk(self, events: list[dict]) -> list[AttendanceAckDTO]:
+        """Process and commit one chunk; on failure every event gets an error ack."""
+        try:
+            acks = await self.process_attendance_batch(events)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            self._observed.clear()
+            self._deltas.clear()
+            self._rekap.clear()
+            return [self.error_ack(data.get("record_id", "unknown"), e) for data in events]
+        self.committed(acks)
+        return acks
+
+    def committed(self, acks: list[AttendanceAckDTO]) -> None:
+        """
+        Post-commit bookkeeping for processed events.
+
+        Fills the ledger's memory front and reports the serials of ok events
+        to the device registry. Call only after the transaction committed.
+        """
+        ingest_ledger.remember(acks)
+        for device_id, serial in self._observed:
+            device_registry.observe(device_id, serial)
+        self._observed.clear()
+
+    async def _publish_deltas(self) -> None:
+        """Queue collected deltas on the event bus (one round trip), delivered on commit."""
+        if self._deltas:
+            await event_bus.publish_items(self.db, AttendanceStream.TOPIC, self._deltas)
+            self._deltas = []
+
+    async def _apply_rekap(self) -> None:
+        """Add collected status changes to the absensi rollups (one statement)."""
+        if self._rekap:
+            await apply_rekap(self.db, self._rekap)
+            self._rekap = []
+
+    def _observe_serial(self, device_id: Any, serial: Any) -> None:
+        if isinstance(device_id, str) and isinstance(serial, int) and serial > 0:
+            self._observed.append((device_id, serial))
+
+    @staticmethod
+    def _event_user_ids(events: list[dict]) -> list[UUID]:
+        """user_ids of the raw event payloads that carry a valid one."""
+        user_ids = []
+        for data in events:
+            try:
+                user_ids.append(UUID(str(data.get("user_id"))))
+            except ValueError:
+                continue
+        return user_ids
+
+    @staticmethod
+    def error_ack(record_id: str, exc: Exception) -> AttendanceAckDTO:
+        """
+        Build an error ack from an exception raised while processing an event.
+
+        Invalid events (ValueError, which includes pydantic's ValidationError)
+        and 4xx rejections are final; anything else, such as a lost database
+        connection, is marked retryable.
+        """
+        rejected = isinstance(exc, ValueError) or (
+            isinstance(exc, HTTPException) and exc.status_code < 500
+        )
+        return AttendanceAckDTO(
+            record_id=record_id,
+            status="error",
+            published_at=datetime.now(timezone.utc),
+            detail=str(exc.detail) if hasattr(exc, "detail") else str(exc),
+            retryable=not rejected,
+        )
+
+    async def _dispatch_event(self, event: AttendanceEventDTO) -> AttendanceAckDTO:
+        """Route an event to its handler based on event_type."""
+        if event.event_type == "absen_masuk":
+            return await self._handle_absen_masuk(event)
+        elif event.event_type == "absen_keluar":
+            return await self._handle_absen_keluar(event)
+        elif event.event_type == "izin":
+            return await self._handle_izin(event)
+        elif event.event_type == "izin_kembali":
+            return await self._handle_izin_kembali(event)
+
     async def _handle_absen_masuk(self, event: AttendanceEventDTO) -> AttendanceAckDTO:
         """
         Handle check-in event.
 
-        1. Validate user is active siswa
-        2. Get late cutoff time
-        3. Check if already checked in today — skip if so
-        4. Create/update Absensi with time_in, status = Hadir or Terlambat
+        1. Validate user is active siswa (roster index; re-reads the user only if rejected)
+        2. Upsert today's Absensi in a single statement on uq_absensi_user_tanggal:
+
+            INSERT INTO absensi ... VALUES (..., CASE WHEN <device time> > <cutoff>
+                                                 THEN 'Terlambat' ELSE 'Hadir' END)
+            ON CONFLICT DO UPDATE ... WHERE absensi.time_in IS NULL
+            RETURNING absensi_id, tanggal, time_in, time_out, status,
+                      (SELECT status FROM absensi previous WHERE previous.absensi_id = absensi.absensi_id)
+
+           No returned row means the student already checked in today;
+           otherwise the row is kept as a delta for the attendance stream.
+           The subquery (see previous_status) yields the status before the
+           upsert (NULL for a new row, 'Alfa' for a late tap after closing),
+           so the rollups move the row across.
         """
         await self._validate_active_siswa(event.user_id)
-        cutoff = await self._get_late_cutoff_time()
         today = event.device_time.date()
+        status_type = Absensi.__table__.c.status.type
+
+        # Determine status based on device_time vs cutoff (defaults to 07:15)
+        cutoff = func.coalesce(
+            select(DesktopSettings.late_cutoff_time)
+            .where(DesktopSettings.id == 1)
+            .scalar_subquery(),
+            literal(time(7, 15), Time),
+        )
+        attendance_status = case(
+            (
+                literal(event.device_time.time(), Time) > cutoff,
+                literal(StatusAbsensi.terlambat, status_type),
+            ),
+            else_=literal(StatusAbsensi.hadir, status_type),
+        )
 
-        # Check existing absensi for today
+        insert_stmt = pg_insert(Absensi).values(
+            absensi_id=uuid4(),
+            user_id=event.user_id,
+            tanggal=today,
+            time_in=event.device_time,
+            status=attendance_status,
+        )
         result = await self.db.execute(
-            select(Absensi).where(
-                and_(
-                    Absensi.user_id == event.user_id,
-                    Absensi.tanggal == today,
-                )
+            insert_stmt.on_conflict_do_update(
+                constraint="uq_absensi_user_tanggal",
+                set_={
+                    "time_in": insert_stmt.excluded.time_in,
+                    "status": insert_stmt.excluded.status,
+                },
+                where=Absensi.time_in.is_(None),
             )
+            .returning(*self._DELTA_COLUMNS, previous_status())
         )
-        existing = result.scalar_one_or_none()
 
-        if existing and existing.time_in is not None:
+        row = result.first()
+        if row is None:
             return AttendanceAckDTO(
                 record_id=event.record_id,
                 status="ok",
                 published_at=datetime.now(timezone.utc),
                 detail="Already checked in today, skipped"
             )
-
-        # Determine status based on device_time vs cutoff
-        device_local_time = event.device_time.time()
-        attendance_status = (
-            StatusAbsensi.terlambat if device_local_time > cutoff
-            else StatusAbsensi.hadir
+        self._deltas.append(AttendanceStream.absensi_delta(row, event.user_id))
+        self._rekap.extend(
+            status_change(event.user_id, row.tanggal, row.previous_status, row.status)
         )
 
-        if existing:
-            existing.time_in = event.device_time
-            existing.status = attendance_status
-        else:
-            record = Absensi(
-                user_id=event.user_id,
-                tanggal=today,
-                time_in=event.device_time,
-                status=attendance_status,
-            )
-            self.db.add(record)
-
-        await self.db.flush()
-
         return AttendanceAckDTO(
             record_id=event.record_id,
             status="ok",
@@ -192,34 +481,35 @@ class DesktopService:
 
     async def _handle_absen_keluar(self, event: AttendanceEventDTO) -> AttendanceAckDTO:
         """
-        Handle check-out event.
+        Handle check-out event in a single round trip.
 
-        1. Find today's Absensi for user
-        2. Update time_out
-        3. If no record exists, return error ack
+        UPDATE today's Absensi time_out ... RETURNING the row; if nothing
+        was updated there is no check-in record and an error ack is returned.
         """
         today = event.device_time.date()
 
         result = await self.db.execute(
-            select(Absensi).where(
+            update(Absensi)
+            .where(
                 and_(
                     Absensi.user_id == event.user_id,
                     Absensi.tanggal == today,
                 )
             )
+            .values(time_out=event.device_time)
+            .returning(*self._DELTA_COLUMNS)
+            .execution_options(synchronize_session=False)
         )
-        existing = result.scalar_one_or_none()
 
-        if not existing:
+        row = result.first()
+        if row is None:
             return AttendanceAckDTO(
                 record_id=event.record_id,
                 status="error",
                 published_at=datetime.now(timezone.utc),
                 detail="No check-in record found for today"
             )
-
-        existing.time_out = event.device_time
-        await self.db.flush()
+        self._deltas.append(AttendanceStream.absensi_delta(row, event.user_id))
 
         return AttendanceAckDTO(
             record_id=event.record_id,
@@ -251,6 +541,52 @@ class DesktopService:
         )
         self.db.add(izin)
         await self.db.flush()
+        self._deltas.append(AttendanceStream.izin_delta(izin))
+
+        return AttendanceAckDTO(
+            record_id=event.record_id,
+            status="ok",
+            published_at=datetime.now(timezone.utc),
+        )
+
+    async def _handle_izin_kembali(self, event: AttendanceEventDTO) -> AttendanceAckDTO:
+        """
+        Handle return from izin keluar in a single round trip.
+
+        UPDATE the student's izin_keluar rows of that school day that have no
+        waktu_kembali yet (served by ix_izin_keluar_still_out) ... RETURNING
+        them; the deltas evict them from every worker's izin board. If
+        nothing was updated the student was not out and an error ack is
+        returned.
+        """
+        start, _ = school_day_range(school_date(event.device_time))
+        result = await self.db.execute(
+            update(IzinKeluar)
+            .where(
+                and_(
+                    IzinKeluar.user_id == event.user_id,
+                    IzinKeluar.waktu_kembali.is_(None),
+                    IzinKeluar.created_at >= start,
+                    IzinKeluar.created_at <= event.device_time,
+                )
+            )
+            .values(waktu_kembali=event.device_time)
+            .returning(
+                IzinKeluar.izin_id, IzinKeluar.user_id, IzinKeluar.created_at,
+                IzinKeluar.keterangan, IzinKeluar.waktu_kembali,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        rows = result.all()
+        if not rows:
+            return AttendanceAckDTO(
+                record_id=event.record_id,
+                status="error",
+                published_at=datetime.now(timezone.utc),
+                detail="No open izin keluar found for today"
+            )
+        self._deltas.extend(AttendanceStream.izin_delta(row) for row in rows)
 
         return AttendanceAckDTO(
             record_id=event.record_id,
@@ -286,7 +622,7 @@ class DesktopService:
         self, late_cutoff_time: time, admin_user_id: UUID
     ) -> DesktopSettingsDTO:
         """
-        Update desktop settings (admin only).
+        Update desktop settings (admin only) and notify connected gates.
 
         Raises:
             HTTPException: 500 on database error
@@ -309,7 +645,14 @@ class DesktopService:
 
         await self.db.flush()
 
-        return DesktopSettingsDTO(
+        settings_dto = DesktopSettingsDTO(
             late_cutoff_time=settings_row.late_cutoff_time,
             updated_at=settings_row.updated_at,
         )
+        # Pushed to every connected gate once the transaction commits
+        await event_bus.publish(
+            self.db,
+            DesktopConnectionRegistry.TOPIC_SETTINGS,
+            settings_dto.model_dump(mode="json"),
+        )
+        return settings_dto
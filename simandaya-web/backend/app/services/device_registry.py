@@ -0,0 +1,260 @@
+import asyncio
+from datetime import datetime, timezone
+from fastapi import HTTPException, status
+from sqlalchemy import select, update, delete, func, literal, BigInteger, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import async_session_maker
+from app.config.settings import settings
+from app.models.desktop_device import DesktopDevice, DesktopDeviceSerial
+from app.dto.desktop.desktop_response import DesktopDeviceDTO, DeviceGapsDTO, SerialRangeDTO
+
+
+class DeviceRegistry:
+    """
+    Serial gap tracking for gate readers, shared by all workers through the
+    database.
+
+    Ingest reports (device_id, hik_serial_no) of committed events through
+    observe(). Each worker buffers them and flush() writes them on an
+    interval to desktop_device_serials, advances the device's
+    contiguous_serial over the run of serials right above it, and deletes
+    the serials it passed. What is left above the watermark arrived out of
+    order, and the holes between those rows are the gaps. Events of one
+    reader may reach any worker (HTTP posts are load balanced, catch-up
+    lands wherever), so the endpoints read the database, never a worker's
+    buffer; they lag ingest by at most DEVICE_FLUSH_SECONDS.
+
+    A device's watermark starts right below the first serial flushed for
+    it: older history is not a gap. If more than `max_pending` serials pile
+    up above the watermark, the oldest hole is given up on. Re-polling a
+    gap is safe because replays are deduplicated by record_id.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._observed: dict[str, set[int]] = {}
+        self._last_seen: dict[str, datetime] = {}
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _pending_runs(*criteria):
+        """
+        Serials above each device's watermark with the serial received
+        before them (the watermark for the first one):
+
+            SELECT device_id, serial,
+                   coalesce(lag(serial) OVER (PARTITION BY device_id ORDER BY serial),
+                            contiguous_serial) AS previous
+            FROM desktop_device_serials JOIN desktop_devices USING (device_id)
+            WHERE serial > contiguous_serial
+
+        A row whose previous is below serial - 1 ends a gap.
+        """
+        previous = func.lag(DesktopDeviceSerial.serial).over(
+            partition_by=DesktopDeviceSerial.device_id, order_by=DesktopDeviceSerial.serial
+        )
+        return (
+            select(
+                DesktopDeviceSerial.device_id,
+                DesktopDeviceSerial.serial,
+                func.coalesce(previous, DesktopDevice.contiguous_serial).label("previous"),
+            )
+            .join(DesktopDevice, DesktopDevice.device_id == DesktopDeviceSerial.device_id)
+            .where(DesktopDeviceSerial.serial > DesktopDevice.contiguous_serial, *criteria)
+            .subquery("runs")
+        )
+
+    async def list_devices(self, db: AsyncSession, max_gaps: int) -> list[DesktopDeviceDTO]:
+        runs = self._pending_runs()
+        gap_counts = (
+            select(runs.c.device_id, func.count().label("gap_count"))
+            .where(runs.c.previous < runs.c.serial - 1)
+            .group_by(runs.c.device_id)
+            .subquery("gap_counts")
+        )
+        result = await db.execute(
+            select(
+                DesktopDevice.device_id,
+                DesktopDevice.contiguous_serial,
+                DesktopDevice.highest_serial,
+                DesktopDevice.last_seen_at,
+                func.coalesce(gap_counts.c.gap_count, 0).label("gap_count"),
+            )
+            .outerjoin(gap_counts, gap_counts.c.device_id == DesktopDevice.device_id)
+            .order_by(DesktopDevice.device_id)
+        )
+        return [
+            DesktopDeviceDTO(
+                device_id=row.device_id,
+                contiguous_serial=row.contiguous_serial,
+                highest_serial=row.highest_serial,
+                last_seen_at=row.last_seen_at,
+                gap_count=min(row.gap_count, max_gaps),
+            )
+            for row in result.all()
+        ]
+
+    async def get_gaps(self, db: AsyncSession, device_id: str, max_gaps: int) -> DeviceGapsDTO:
+        """
+        Missing serial ranges of one device, oldest first, at most `max_gaps` of them.
+
+        Raises:
+            HTTPException: 404 if the device has never been seen
+        """
+        device = await db.get(DesktopDevice, device_id)
+        if device is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Device {device_id} not found"
+            )
+        runs = self._pending_runs(DesktopDeviceSerial.device_id == device_id)
+        result = await db.execute(
+            select(runs.c.previous + 1, runs.c.serial - 1)
+            .where(runs.c.previous < runs.c.serial - 1)
+            .order_by(runs.c.serial)
+            .limit(max_gaps)
+        )
+        return DeviceGapsDTO(
+            device_id=device_id,
+            contiguous_serial=device.contiguous_serial,
+            highest_serial=device.highest_serial,
+            gaps=[SerialRangeDTO(begin=begin, end=end) for begin, end in result.all()],
+        )
+
+    # ── Writes ───────────────────────────────────────────────────────────────
+
+    def observe(self, device_id: str, serial: int) -> None:
+        self._observed.setdefault(device_id, set()).add(serial)
+        self._last_seen[device_id] = datetime.now(timezone.utc)
+
+    async def flush(self, db: AsyncSession) -> dict[str, set[int]]:
+        """
+        Write serials observed since the last flush and advance the watermarks.
+
+        The device rows are upserted first, in device_id order, so flushes
+        of the same devices from different workers run one after the other
+        and never deadlock.
+
+        Returns:
+            The serials written; pass them to mark_flushed() after commit.
+        """
+        observed = {device_id: set(serials) for device_id, serials in self._observed.items() if serials}
+        if not observed:
+            return observed
+        device_ids = sorted(observed)
+
+        devices = pg_insert(DesktopDevice).values([
+            {
+                "device_id": device_id,
+                "contiguous_serial": min(observed[device_id]) - 1,
+                "highest_serial": max(observed[device_id]),
+                "last_seen_at": self._last_seen.get(device_id),
+            }
+            for device_id in device_ids
+        ])
+        await db.execute(
+            devices.on_conflict_do_update(
+                index_elements=[DesktopDevice.device_id],
+                set_={
+                    "highest_serial": func.greatest(
+                        DesktopDevice.highest_serial, devices.excluded.highest_serial
+                    ),
+                    "last_seen_at": func.greatest(
+                        DesktopDevice.last_seen_at, devices.excluded.last_seen_at
+                    ),
+                },
+            )
+        )
+
+        pairs = [(device_id, serial) for device_id in device_ids for serial in observed[device_id]]
+        entries = func.unnest(
+            literal([device_id for device_id, _ in pairs], ARRAY(String)),
+            literal([serial for _, serial in pairs], ARRAY(BigInteger)),
+        ).table_valued("device_id", "serial").render_derived(name="entries")
+        await db.execute(
+            pg_insert(DesktopDeviceSerial)
+            .from_select(
+                ["device_id", "serial"],
+                select(entries.c.device_id, entries.c.serial)
+                .join(DesktopDevice, DesktopDevice.device_id == entries.c.device_id)
+                .where(entries.c.serial > DesktopDevice.contiguous_serial),
+            )
+            .on_conflict_do_nothing()
+        )
+
+        in_flush = DesktopDeviceSerial.device_id.in_(device_ids)
+        above = (DesktopDevice.device_id == DesktopDeviceSerial.device_id) & (
+            DesktopDeviceSerial.serial > DesktopDevice.contiguous_serial
+        )
+        # Give up the oldest hole of devices with too many serials pending
+        overflow = (
+            select(DesktopDeviceSerial.device_id, func.min(DesktopDeviceSerial.serial).label("lowest"))
+            .join(DesktopDevice, above)
+            .where(in_flush)
+            .group_by(DesktopDeviceSerial.device_id)
+            .having(func.count() > self.max_pending)
+            .subquery("overflow")
+        )
+        await db.execute(
+            update(DesktopDevice)
+            .where(DesktopDevice.device_id == overflow.c.device_id)
+            .values(contiguous_serial=func.greatest(DesktopDevice.contiguous_serial, overflow.c.lowest - 1))
+        )
+        # The run right above the watermark is the one whose serial - row_number()
+        # equals the watermark; advance to its top
+        runs = (
+            select(
+                DesktopDeviceSerial.device_id,
+                DesktopDeviceSerial.serial,
+                (
+                    DesktopDeviceSerial.serial - func.row_number().over(
+                        partition_by=DesktopDeviceSerial.device_id, order_by=DesktopDeviceSerial.serial
+                    )
+                ).label("run"),
+                DesktopDevice.contiguous_serial,
+            )
+            .join(DesktopDevice, above)
+            .where(in_flush)
+            .subquery("runs")
+        )
+        first_run = (
+            select(runs.c.device_id, func.max(runs.c.serial).label("top"))
+            .where(runs.c.run == runs.c.contiguous_serial)
+            .group_by(runs.c.device_id)
+            .subquery("first_run")
+        )
+        await db.execute(
+            update(DesktopDevice)
+            .where(DesktopDevice.device_id == first_run.c.device_id)
+            .values(contiguous_serial=func.greatest(DesktopDevice.contiguous_serial, first_run.c.top))
+        )
+        await db.execute(
+            delete(DesktopDeviceSerial).where(
+                in_flush,
+                DesktopDevice.device_id == DesktopDeviceSerial.device_id,
+                DesktopDeviceSerial.serial <= DesktopDevice.contiguous_serial,
+            )
+        )
+        return observed
+
+    def mark_flushed(self, observed: dict[str, set[int]]) -> None:
+        for device_id, serials in observed.items():
+            self._observed.get(device_id, set()).difference_update(serials)
+
+    async def run_flush_loop(self, interval_seconds: int) -> None:
+        """Background task: periodically persist observed serials."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                async with async_session_maker() as session:
+                    flushed = await self.flush(session)
+                    await session.commit()
+                self.mark_flushed(flushed)
+            except Exception as e:
+                print(f"Device registry flush failed: {e}")
+
+
+# Singleton instance (one buffer of unflushed serials per worker process)
+device_registry = DeviceRegistry(max_pending=settings.DEVICE_SERIAL_MAX_PENDING)
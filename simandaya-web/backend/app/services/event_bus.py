@@ -0,0 +1,133 @@
+import asyncio
+import json
+from collections import defaultdict
+from typing import Any, Callable, Optional
+import asyncpg
+from sqlalchemy import select, func, literal, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.settings import settings
+
+Subscriber = Callable[[dict[str, Any]], None]
+ReconnectHook = Callable[[], None]
+
+
+class EventBus:
+    """
+    Cross-worker pub/sub over Postgres LISTEN/NOTIFY.
+
+    publish() issues pg_notify inside the caller's transaction, so a message
+    is delivered only if, and when, that transaction commits. Every uvicorn
+    worker (including the publisher) holds one dedicated LISTEN connection
+    and dispatches messages to its local subscribers by topic.
+
+    Payloads must stay small (NOTIFY is limited to 8000 bytes): send ids,
+    versions and compact deltas, not full rows. publish_items() packs many
+    small items into as few messages as fit.
+
+    Messages sent while the LISTEN connection is down are lost. Workers
+    that keep state from messages register on_reconnect() hooks and reload
+    it from the database once the connection is back.
+    """
+
+    CHANNEL = "simandaya_events"
+    MAX_MESSAGE_BYTES = 7500
+
+    def __init__(self):
+        self._subscribers: dict[str, set[Subscriber]] = defaultdict(set)
+        self._reconnect_hooks: list[ReconnectHook] = []
+        self._conn: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _dsn() -> str:
+        return settings.database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    async def start(self) -> None:
+        await self._connect()
+        self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    async def _connect(self) -> None:
+        self._conn = await asyncpg.connect(self._dsn())
+        await self._conn.add_listener(self.CHANNEL, self._on_notify)
+
+    async def _supervise(self, interval_seconds: int = 5) -> None:
+        """Reconnect the LISTEN connection if it drops."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if self._conn is None or self._conn.is_closed():
+                try:
+                    await self._connect()
+                except Exception as e:
+                    print(f"Event bus reconnect failed: {e}")
+                    continue
+                for hook in list(self._reconnect_hooks):
+                    try:
+                        hook()
+                    except Exception as e:
+                        print(f"Event bus reconnect hook failed: {e}")
+
+    def subscribe(self, topic: str, callback: Subscriber) -> None:
+        self._subscribers[topic].add(callback)
+
+    def unsubscribe(self, topic: str, callback: Subscriber) -> None:
+        self._subscribers[topic].discard(callback)
+
+    def on_reconnect(self, hook: ReconnectHook) -> None:
+        """Call `hook` each time the LISTEN connection is re-established."""
+        self._reconnect_hooks.append(hook)
+
+    async def publish(self, db: AsyncSession, topic: str, payload: dict[str, Any]) -> None:
+        """Queue a message for delivery to every worker when `db` commits."""
+        message = json.dumps({"topic": topic, "payload": payload}, default=str)
+        await db.execute(select(func.pg_notify(self.CHANNEL, message)))
+
+    async def publish_items(self, db: AsyncSession, topic: str, items: list[dict[str, Any]]) -> None:
+        """
+        Queue a list of items for delivery when `db` commits, in one round trip.
+
+        Items are packed into messages under MAX_MESSAGE_BYTES; subscribers
+        receive payloads of the form {"items": [...]}, in order.
+        """
+        messages: list[str] = []
+        packed: list[str] = []
+        size = 0
+        for item in items:
+            encoded = json.dumps(item, default=str)
+            if packed and size + len(encoded) > self.MAX_MESSAGE_BYTES:
+                messages.append(self._pack(topic, packed))
+                packed, size = [], 0
+            packed.append(encoded)
+            size += len(encoded) + 1
+        if packed:
+            messages.append(self._pack(topic, packed))
+        if not messages:
+            return
+
+        channel = literal(self.CHANNEL)
+        batch = func.unnest(literal(messages, ARRAY(Text))).table_valued("message").render_derived()
+        await db.execute(select(func.pg_notify(channel, batch.c.message)))
+
+    @staticmethod
+    def _pack(topic: str, encoded_items: list[str]) -> str:
+        return f'{{"topic": {json.dumps(topic)}, "payload": {{"items": [{", ".join(encoded_items)}]}}}}'
+
+    def _on_notify(self, conn, pid, channel, raw: str) -> None:
+        message = json.loads(raw)
+        for callback in list(self._subscribers.get(message["topic"], ())):
+            try:
+                callback(message["payload"])
+            except Exception as e:
+                print(f"Event bus subscriber failed on {message['topic']}: {e}")
+
+
+# Singleton instance (one LISTEN connection per worker process)
+event_bus = EventBus()
@@ -0,0 +1,135 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import async_session_maker
+from app.config.settings import settings
+from app.models.desktop_ingest_ledger import DesktopIngestLedger
+from app.dto.desktop.desktop_response import AttendanceAckDTO
+
+
+class IngestLedger:
+    """
+    Idempotency store for desktop record_ids.
+
+    A bounded in-memory LRU sits in front of the desktop_ingest_ledger table.
+    Only "ok" acks are recorded, so events that failed can be retried. Writes
+    go into the caller's transaction (record), and the memory front is only
+    filled after that transaction commits (remember).
+    """
+
+    def __init__(self, retention: timedelta, memory_size: int):
+        self.retention = retention
+        self.memory_size = memory_size
+        self._acks: OrderedDict[str, AttendanceAckDTO] = OrderedDict()
+
+    def _expired(self, ack: AttendanceAckDTO) -> bool:
+        return ack.published_at < datetime.now(timezone.utc) - self.retention
+
+    def _get_cached(self, record_id: str) -> Optional[AttendanceAckDTO]:
+        ack = self._acks.get(record_id)
+        if ack is None:
+            return None
+        if self._expired(ack):
+            del self._acks[record_id]
+            return None
+        self._acks.move_to_end(record_id)
+        return ack
+
+    async def lookup(
+        self, db: AsyncSession, record_ids: list[str]
+    ) -> dict[str, AttendanceAckDTO]:
+        """
+        Return the original ack for every record_id already processed.
+
+        Memory hits cost nothing; all misses are resolved with one SELECT.
+        """
+        found: dict[str, AttendanceAckDTO] = {}
+        misses: list[str] = []
+        for record_id in record_ids:
+            ack = self._get_cached(record_id)
+            if ack is not None:
+                found[record_id] = ack
+            else:
+                misses.append(record_id)
+
+        if misses:
+            result = await db.execute(
+                select(
+                    DesktopIngestLedger.record_id,
+                    DesktopIngestLedger.published_at,
+                    DesktopIngestLedger.detail,
+                ).where(DesktopIngestLedger.record_id.in_(misses))
+            )
+            for row in result.all():
+                ack = AttendanceAckDTO(
+                    record_id=row.record_id,
+                    status="ok",
+                    published_at=row.published_at,
+                    detail=row.detail,
+                )
+                if not self._expired(ack):
+                    found[row.record_id] = ack
+                    self._put(ack)
+
+        return found
+
+    async def record(self, db: AsyncSession, acks: list[AttendanceAckDTO]) -> None:
+        """Insert ok acks into the ledger inside the caller's transaction."""
+        rows = [
+            {
+                "record_id": ack.record_id,
+                "published_at": ack.published_at,
+                "detail": ack.detail,
+            }
+            for ack in acks
+            if ack.status == "ok"
+        ]
+        if not rows:
+            return
+        await db.execute(
+            pg_insert(DesktopIngestLedger)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["record_id"])
+        )
+
+    def remember(self, acks: list[AttendanceAckDTO]) -> None:
+        """Cache ok acks after the transaction that recorded them has committed."""
+        for ack in acks:
+            if ack.status == "ok":
+                self._put(ack)
+
+    def _put(self, ack: AttendanceAckDTO) -> None:
+        self._acks[ack.record_id] = ack
+        self._acks.move_to_end(ack.record_id)
+        while len(self._acks) > self.memory_size:
+            self._acks.popitem(last=False)
+
+    async def purge(self, db: AsyncSession) -> int:
+        """Delete ledger rows older than the retention window."""
+        cutoff = datetime.now(timezone.utc) - self.retention
+        result = await db.execute(
+            delete(DesktopIngestLedger).where(DesktopIngestLedger.created_at < cutoff)
+        )
+        return result.rowcount
+
+    async def run_purge_loop(self, interval_seconds: int = 3600) -> None:
+        """Background task: periodically purge expired ledger rows."""
+        while True:
+            try:
+                async with async_session_maker() as session:
+                    await self.purge(session)
+                    await session.commit()
+            except Exception as e:
+                print(f"Ingest ledger purge failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+
+# Singleton instance (one memory front per worker process)
+ingest_ledger = IngestLedger(
+    retention=timedelta(days=settings.INGEST_LEDGER_RETENTION_DAYS),
+    memory_size=settings.INGEST_LEDGER_MEMORY_SIZE,
+)
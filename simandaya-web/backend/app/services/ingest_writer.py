@@ -0,0 +1,134 @@
+import asyncio
+from typing import Optional
+from app.config.database import async_session_maker
+from app.config.settings import settings
+from app.services.desktop_service import DesktopService
+from app.dto.desktop.desktop_response import AttendanceAckDTO
+
+
+class IngestWriter:
+    """
+    Per-worker group-commit writer for desktop attendance events.
+
+    WebSocket receive loops submit frames and keep reading; a single writer
+    task takes the first queued frame, waits `window_ms` for more to arrive,
+    then applies everything it has (up to `max_events`) with
+    DesktopService.process_attendance_batch in one transaction and one
+    commit. Each frame's future resolves with its acks only after that
+    commit, so acks are never released for uncommitted work. A group that
+    fails resolves its futures with error acks and the writer carries on.
+    """
+
+    def __init__(self, window_ms: float, max_events: int):
+        self.window_ms = window_ms
+        self.max_events = max_events
+        self._queue: asyncio.Queue[tuple[list[dict], asyncio.Future]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Ingest writer stopped"))
+
+    def submit(self, events: list[dict]) -> asyncio.Future:
+        """
+        Queue one frame's events for the next group commit.
+
+        Returns:
+            Future resolving to list[AttendanceAckDTO], in event order.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((events, future))
+        return future
+
+    async def ingest(self, events: list[dict]) -> list[AttendanceAckDTO]:
+        """
+        Apply events and return their acks once committed.
+
+        Joins the next group commit when enabled, otherwise commits the events
+        in a transaction of their own on a leased session.
+        """
+        if self.enabled:
+            return await self.submit(events)
+        future = asyncio.get_running_loop().create_future()
+        await self._commit_group([(events, future)])
+        return future.result()
+
+    async def _run(self) -> None:
+        while True:
+            group = [await self._queue.get()]
+            await asyncio.sleep(self.window_ms / 1000)
+
+            size = len(group[0][0])
+            while size < self.max_events and not self._queue.empty():
+                item = self._queue.get_nowait()
+                group.append(item)
+                size += len(item[0])
+
+            try:
+                await self._commit_group(group)
+            except Exception as e:
+                # Fail this group only; the writer must outlive any one bad frame
+                print(f"Ingest writer group failed: {e}")
+                self._fail_group(group, e)
+
+    @staticmethod
+    def _error_acks(events: list, exc: Exception) -> list[AttendanceAckDTO]:
+        return [
+            DesktopService.error_ack(
+                event.get("record_id", "unknown") if isinstance(event, dict) else "unknown", exc
+            )
+            for event in events
+        ]
+
+    def _fail_group(self, group: list[tuple[list[dict], asyncio.Future]], exc: Exception) -> None:
+        for frame, future in group:
+            if not future.done():
+                future.set_result(self._error_acks(frame, exc))
+
+    async def _commit_group(self, group: list[tuple[list[dict], asyncio.Future]]) -> None:
+        events = [event for frame, _ in group for event in frame]
+        try:
+            async with async_session_maker() as session:
+                service = DesktopService(session)
+                acks = await service.process_attendance_batch(events)
+                await session.commit()
+            service.committed(acks)
+        except Exception as e:
+            acks = self._error_acks(events, e)
+
+        offset = 0
+        for frame, future in group:
+            frame_acks: list[AttendanceAckDTO] = acks[offset:offset + len(frame)]
+            offset += len(frame)
+            if not future.done():
+                future.set_result(frame_acks)
+
+
+# Singleton instance (one writer per worker process)
+ingest_writer = IngestWriter(
+    window_ms=settings.INGEST_GROUP_COMMIT_MS,
+    max_events=settings.INGEST_GROUP_MAX_EVENTS,
+)
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime
+from typing import Any, NamedTuple, Optional
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import async_session_maker
+from app.models.izin_keluar import IzinKeluar
+from app.services.roster_index import roster_index
+from app.utils.school_time import school_tz, school_day_range
+from app.dto.absensi.absensi_response import ActiveIzinKeluarDTO
+
+
+class OutEntry(NamedTuple):
+    """An izin keluar whose student has not tapped back in yet."""
+    user_id: UUID
+    created_at: datetime
+    keterangan: str
+
+
+class IzinBoard:
+    """
+    Per-worker "currently out of school" board.
+
+    Holds today's izin keluar records with no waktu_kembali, keyed by
+    izin_id. It is loaded on startup (served by the partial index
+    ix_izin_keluar_still_out) and kept current from the attendance stream
+    deltas: an `izin` tap adds its record, an `izin_kembali` tap (which
+    sets waktu_kembali) evicts it. Deltas reach every worker after commit,
+    so all boards agree without re-querying. Deltas sent while the event
+    bus was disconnected are lost, so the board is reloaded when the bus
+    reconnects and on an interval.
+
+    Records from earlier school days are dropped when the board is read.
+    """
+
+    def __init__(self):
+        self._out: dict[UUID, OutEntry] = {}
+        # Deltas received while load() is querying, replayed onto its result
+        self._replay: Optional[list[dict[str, Any]]] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._out)
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild the board from today's open izin keluar records."""
+        start, _ = school_day_range(datetime.now(school_tz()).date())
+        self._replay = []
+        try:
+            result = await db.execute(
+                select(
+                    IzinKeluar.izin_id,
+                    IzinKeluar.user_id,
+                    IzinKeluar.created_at,
+                    IzinKeluar.keterangan,
+                ).where(
+                    IzinKeluar.waktu_kembali.is_(None),
+                    IzinKeluar.created_at >= start,
+                )
+            )
+            out = {
+                row.izin_id: OutEntry(row.user_id, row.created_at, row.keterangan)
+                for row in result.all()
+            }
+            # Deltas are idempotent, so replaying one the query already saw is harmless
+            for payload in self._replay:
+                self._apply(out, payload)
+            self._out = out
+        finally:
+            self._replay = None
+
+    def on_delta(self, payload: dict[str, Any]) -> None:
+        """Event bus callback for AttendanceStream.TOPIC."""
+        if self._replay is not None:
+            self._replay.append(payload)
+        self._apply(self._out, payload)
+
+    @staticmethod
+    def _apply(out: dict[UUID, OutEntry], payload: dict[str, Any]) -> None:
+        for item in payload.get("items", ()):
+            if item["kind"] != "izin_keluar":
+                continue
+            izin_id = UUID(item["izin_id"])
+            if item["waktu_kembali"] is None:
+                out[izin_id] = OutEntry(
+                    UUID(item["user_id"]),
+                    datetime.fromisoformat(item["created_at"]),
+                    item["keterangan"],
+                )
+            else:
+                out.pop(izin_id, None)
+
+    def on_bus_reconnected(self) -> None:
+        """Event bus reconnect hook: deltas may have been missed."""
+        task = asyncio.create_task(self._reload())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _reload(self) -> None:
+        try:
+            async with async_session_maker() as session:
+                await self.load(session)
+        except Exception as e:
+            print(f"Izin board refresh failed: {e}")
+
+    async def run_refresh_loop(self, interval_seconds: int) -> None:
+        """Background task: periodically reload the board."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await self._reload()
+
+    def list_active(self) -> list[ActiveIzinKeluarDTO]:
+        """Students out right now, longest out first."""
+        start, _ = school_day_range(datetime.now(school_tz()).date())
+        for izin_id in [
+            izin_id for izin_id, entry in self._out.items()
+            if self._aware(entry.created_at) < start
+        ]:
+            del self._out[izin_id]
+
+        active = []
+        for izin_id, entry in sorted(self._out.items(), key=lambda item: self._aware(item[1].created_at)):
+            roster_entry = roster_index.get(entry.user_id)
+            active.append(ActiveIzinKeluarDTO(
+                izin_id=izin_id,
+                user_id=entry.user_id,
+                nama_siswa=roster_entry.nama_lengkap if roster_entry and roster_entry.nama_lengkap else "Unknown",
+                kelas=roster_entry.kelas_jurusan if roster_entry else None,
+                created_at=entry.created_at,
+                keterangan=entry.keterangan,
+            ))
+        return active
+
+    @staticmethod
+    def _aware(moment: datetime) -> datetime:
+        """Naive timestamps (device local time) are taken as school-local."""
+        return moment if moment.tzinfo is not None else moment.replace(tzinfo=school_tz())
+
+
+# Singleton instance (one board per worker process)
+izin_board = IzinBoard()
@@ -7,6 +7,8 @@ from app.models.siswa_kelas import SiswaKelas
 from app.models.tahun_ajaran import TahunAjaran
 from app.models.user import User
 from app.enums import UserType
+from app.services.roster_index import roster_index
+from app.services.roster_version import publish_roster_users
 from app.dto.akademik.kelas_dto import (
     CreateKelasDTO,
     UpdateKelasDTO,
@@ -323,8 +325,16 @@ class KelasService:
                     detail=f"Kelas with ID {kelas_id} not found"
                 )
 
+            result = await self.db.execute(
+                select(SiswaKelas.user_id).where(SiswaKelas.kelas_id == kelas_id)
+            )
+            user_ids = list(result.scalars().all())
+
             await self.db.delete(kelas)
+            # Cascade removes every assignment of this kelas
+            await publish_roster_users(self.db, user_ids)
             await self.db.commit()
+            await roster_index.load(self.db)
 
             return MessageResponseDTO(
                 message=f"Kelas '{kelas.nama_kelas}' deleted successfully"
@@ -425,8 +435,10 @@ class KelasService:
             )
 
             self.db.add(siswa_kelas)
+            await publish_roster_users(self.db, [request.user_id])
             await self.db.commit()
             await self.db.refresh(siswa_kelas)
+            await roster_index.refresh_user(self.db, request.user_id)
 
             return self._to_siswa_kelas_dto(siswa_kelas)
 
@@ -470,7 +482,9 @@ class KelasService:
                 )
 
             await self.db.delete(siswa_kelas)
+            await publish_roster_users(self.db, [user_id])
             await self.db.commit()
+            await roster_index.refresh_user(self.db, user_id)
 
             return MessageResponseDTO(
                 message="Siswa removed from kelas successfully"
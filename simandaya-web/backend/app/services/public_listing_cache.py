@@ -0,0 +1,60 @@
+from datetime import date
+from typing import Any, Awaitable, Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.settings import settings
+from app.services.event_bus import event_bus
+from app.utils.ttl_cache import TTLCache
+
+
+class PublicListingCache:
+    """
+    Per-worker response cache for the unauthenticated attendance listings.
+
+    Pages are cached per (kind, tanggal, search, skip, limit) for a few
+    seconds, and concurrent misses for the same page share one query. Every
+    write that changes a listing invalidates all pages of its (kind,
+    tanggal) on every worker: desktop ingest through the attendance stream
+    deltas it already publishes (AttendanceStream.TOPIC), other writers by
+    calling publish_changed() in their transaction. The TTL bounds staleness
+    for changes that are not announced, such as a renamed student.
+
+    kind is "absensi" or "izin_keluar", matching the stream deltas.
+    """
+
+    TOPIC = "absensi.public_changed"
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    async def get_or_load(
+        self,
+        kind: str,
+        tanggal: date,
+        search: Optional[str],
+        skip: int,
+        limit: int,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        if self._cache.ttl_seconds <= 0:
+            return await loader()
+        return await self._cache.get_or_load(
+            (kind, tanggal, search, skip, limit), (kind, tanggal), loader
+        )
+
+    async def publish_changed(self, db: AsyncSession, kind: str, tanggals: set[date]) -> None:
+        """Announce changed listings; every worker invalidates them when `db` commits."""
+        await event_bus.publish(db, self.TOPIC, {
+            "items": [{"kind": kind, "tanggal": tanggal.isoformat()} for tanggal in sorted(tanggals)],
+        })
+
+    def on_changed(self, payload: dict[str, Any]) -> None:
+        """Event bus callback for TOPIC and AttendanceStream.TOPIC payloads."""
+        for item in payload.get("items", ()):
+            self._cache.invalidate((item["kind"], date.fromisoformat(item["tanggal"])))
+
+
+# Singleton instance (one cache per worker process)
+public_listing_cache = PublicListingCache(
+    ttl_seconds=settings.PUBLIC_CACHE_TTL_SECONDS,
+    max_entries=settings.PUBLIC_CACHE_MAX_ENTRIES,
+)
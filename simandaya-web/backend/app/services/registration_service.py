@@ -6,6 +6,8 @@ from sqlalchemy.orm import joinedload
 from app.models.user import User
 from app.models.siswa_profile import SiswaProfile
 from app.models.guru_profile import GuruProfile
+from app.services.roster_index import roster_index
+from app.services.roster_version import bump_roster_version
 from app.enums import (
     UserType, RegistrationStatus, StatusSiswa, StatusGuru,
 )
@@ -142,7 +144,9 @@ class RegistrationService:
         user.registration_status = RegistrationStatus.completed
         user.is_active = True
 
+        await bump_roster_version(self.db, user.user_id)
         await self.db.commit()
+        await roster_index.refresh_user(self.db, user.user_id)
 
         return ClaimResponseDTO(
             message="Registrasi berhasil! Silakan login.",
@@ -195,6 +199,7 @@ class RegistrationService:
         user.is_active = True
 
         await self.db.commit()
+        await roster_index.refresh_user(self.db, user.user_id)
 
         return ClaimResponseDTO(
             message="Registrasi berhasil! Silakan login.",
@@ -247,7 +252,9 @@ class RegistrationService:
                 setattr(profile, field, profile_data[field])
 
         self.db.add(profile)
+        await bump_roster_version(self.db, user.user_id)
         await self.db.commit()
+        await roster_index.refresh_user(self.db, user.user_id)
 
         return PreRegisterResponseDTO(
             message=f"Siswa '{request.nama_lengkap}' berhasil didaftarkan (PENDING)"
@@ -298,6 +305,7 @@ class RegistrationService:
 
         self.db.add(profile)
         await self.db.commit()
+        await roster_index.refresh_user(self.db, user.user_id)
 
         return PreRegisterResponseDTO(
             message=f"Guru '{request.nama_lengkap}' berhasil didaftarkan (PENDING)"
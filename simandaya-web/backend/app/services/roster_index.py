@@ -0,0 +1,219 @@
+import asyncio
+import time
+from typing import Any, NamedTuple, Optional
+from uuid import UUID
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import async_session_maker
+from app.config.settings import settings
+from app.models.user import User
+from app.models.siswa_profile import SiswaProfile
+from app.models.kelas import Kelas
+from app.models.siswa_kelas import SiswaKelas
+from app.models.tahun_ajaran import TahunAjaran
+from app.enums import UserType
+
+
+class RosterEntry(NamedTuple):
+    """Cached tap-validation facts for one user, plus display fields for live feeds."""
+    is_siswa: bool
+    is_active: bool
+    kelas_id: Optional[UUID]
+    nama_lengkap: Optional[str] = None
+    kelas_jurusan: Optional[str] = None
+
+
+class RosterIndex:
+    """
+    Process-local index of user_id -> RosterEntry used to validate desktop taps
+    without a database round trip.
+
+    Loaded once at startup, refreshed per user by the services that change
+    users (UserManagementService, RegistrationService, KelasService,
+    AuthService), and in every other uvicorn worker through the roster
+    topic of the event bus (see on_roster_changed). A full reload when the
+    bus reconnects and on an interval repairs anything missed while it was
+    disconnected. A tap that fails validation re-reads its user before it is
+    rejected, at most once per `negative_ttl` seconds per user, so a card
+    tapped over and over does not cost a query each time.
+    """
+
+    # Cached rejections before expired ones are pruned
+    MAX_REJECTED = 10000
+
+    def __init__(self, negative_ttl: float):
+        self._entries: dict[UUID, RosterEntry] = {}
+        self.negative_ttl = negative_ttl
+        # user_id -> monotonic time its rejection was confirmed from the database
+        self._rejected: dict[UUID, float] = {}
+        # Refreshes scheduled from event bus callbacks (kept referenced until done)
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _users_query():
+        return (
+            select(
+                User.user_id, User.user_type, User.is_active,
+                SiswaProfile.nama_lengkap, SiswaProfile.kelas_jurusan,
+            )
+            .outerjoin(SiswaProfile, User.user_id == SiswaProfile.user_id)
+        )
+
+    @staticmethod
+    def _active_kelas_query():
+        return (
+            select(SiswaKelas.user_id, SiswaKelas.kelas_id)
+            .join(Kelas, SiswaKelas.kelas_id == Kelas.kelas_id)
+            .join(TahunAjaran, Kelas.tahun_ajaran_id == TahunAjaran.tahun_ajaran_id)
+            .where(TahunAjaran.is_active == True)
+        )
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild the whole index (users + current kelas assignment)."""
+        users = await db.execute(self._users_query())
+        kelas = await db.execute(self._active_kelas_query())
+        kelas_by_user = {row.user_id: row.kelas_id for row in kelas.all()}
+
+        self._entries = {
+            row.user_id: RosterEntry(
+                is_siswa=row.user_type == UserType.siswa,
+                is_active=row.is_active,
+                kelas_id=kelas_by_user.get(row.user_id),
+                nama_lengkap=row.nama_lengkap,
+                kelas_jurusan=row.kelas_jurusan,
+            )
+            for row in users.all()
+        }
+
+    async def refresh_user(self, db: AsyncSession, user_id: UUID) -> None:
+        """Reload a single user after a committed change; drops it if deleted."""
+        result = await db.execute(
+            self._users_query().where(User.user_id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            self.discard(user_id)
+            return
+
+        kelas = await db.execute(
+            self._active_kelas_query().where(SiswaKelas.user_id == user_id)
+        )
+        kelas_row = kelas.first()
+
+        self._entries[user_id] = RosterEntry(
+            is_siswa=row.user_type == UserType.siswa,
+            is_active=row.is_active,
+            kelas_id=kelas_row.kelas_id if kelas_row else None,
+            nama_lengkap=row.nama_lengkap,
+            kelas_jurusan=row.kelas_jurusan,
+        )
+
+    def discard(self, user_id: UUID) -> None:
+        self._entries.pop(user_id, None)
+
+    def get(self, user_id: UUID) -> Optional[RosterEntry]:
+        return self._entries.get(user_id)
+
+    def validate_active_siswa(self, user_id: UUID) -> RosterEntry:
+        """
+        Validate that user_id belongs to an active siswa, from memory only.
+
+        Raises:
+            HTTPException: 404 if user not in the roster
+            HTTPException: 400 if user is not an active student
+        """
+        entry = self._entries.get(user_id)
+        if entry is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User {user_id} not found"
+            )
+        if not entry.is_siswa:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"User {user_id} is not a student"
+            )
+        if not entry.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"User {user_id} is not active"
+            )
+        return entry
+
+    async def ensure_active_siswa(self, db: AsyncSession, user_id: UUID) -> RosterEntry:
+        """
+        validate_active_siswa, re-reading the user from the database once if
+        the cached entry rejects it (a change not yet seen by this worker).
+        A confirmed rejection is cached for `negative_ttl` seconds; roster
+        bus messages bring registrations and reactivations in before that.
+
+        Raises:
+            HTTPException: 404 if user not found
+            HTTPException: 400 if user is not an active student
+        """
+        try:
+            return self.validate_active_siswa(user_id)
+        except HTTPException:
+            now = time.monotonic()
+            if now - self._rejected.get(user_id, float("-inf")) < self.negative_ttl:
+                raise
+        await self.refresh_user(db, user_id)
+        try:
+            return self.validate_active_siswa(user_id)
+        except HTTPException:
+            self._remember_rejected(user_id, now)
+            raise
+
+    def _remember_rejected(self, user_id: UUID, now: float) -> None:
+        self._rejected[user_id] = now
+        if len(self._rejected) > self.MAX_REJECTED:
+            self._rejected = {
+                rejected_id: at for rejected_id, at in self._rejected.items()
+                if now - at < self.negative_ttl
+            }
+
+    def on_roster_changed(self, payload: dict[str, Any]) -> None:
+        """Event bus callback for the roster topic (see bump_roster_version)."""
+        user_ids = payload.get("user_ids")
+        if user_ids is None:
+            refresh = self._reload()
+        else:
+            refresh = self._refresh_users([UUID(user_id) for user_id in user_ids])
+        task = asyncio.create_task(refresh)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def on_bus_reconnected(self) -> None:
+        """Event bus reconnect hook: roster messages may have been missed."""
+        task = asyncio.create_task(self._reload())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh_users(self, user_ids: list[UUID]) -> None:
+        try:
+            async with async_session_maker() as session:
+                for user_id in user_ids:
+                    await self.refresh_user(session, user_id)
+        except Exception as e:
+            print(f"Roster user refresh failed: {e}")
+
+    async def _reload(self) -> None:
+        try:
+            async with async_session_maker() as session:
+                await self.load(session)
+        except Exception as e:
+            print(f"Roster refresh failed: {e}")
+
+    async def run_refresh_loop(self, interval_seconds: int) -> None:
+        """Background task: periodically reload the full roster."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await self._reload()
+
+
+# Singleton instance (one per worker process)
+roster_index = RosterIndex(negative_ttl=settings.ROSTER_NEGATIVE_TTL_SECONDS)
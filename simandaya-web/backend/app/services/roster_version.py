@@ -0,0 +1,70 @@
+from typing import Collection, Optional
+from uuid import UUID
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.roster_change import RosterChange, roster_version_seq
+from app.services.event_bus import event_bus
+from app.services.desktop_registry import DesktopConnectionRegistry
+
+
+# First key of pg_advisory_xact_lock(key1, key2) serializing roster version bumps
+ROSTER_LOCK_NAMESPACE = 0x2057
+
+# NOTIFY payloads are capped at 8000 bytes; larger changes are published without ids
+MAX_PUBLISHED_IDS = 100
+
+
+async def bump_roster_version(db: AsyncSession, *user_ids: UUID) -> None:
+    """
+    Stamp students with a new roster version inside the caller's transaction.
+
+    Call right before commit (the bump serializes roster writers until
+    then) from every write that changes what the desktop sync sees
+    (nama_lengkap, nis, kelas_jurusan, is_active, deletion). Connected
+    gates are told the new version once the transaction commits, and every
+    worker's roster index refreshes the changed users.
+    """
+    if not user_ids:
+        return
+    # Sequence values are handed out in call order, not commit order. Holding
+    # this lock until commit makes versions commit in ascending order, so a
+    # client that has seen version N can never later miss a version below N.
+    await db.execute(select(func.pg_advisory_xact_lock(ROSTER_LOCK_NAMESPACE, 0)))
+    stmt = pg_insert(RosterChange).values(
+        [{"user_id": user_id, "version": roster_version_seq.next_value()} for user_id in user_ids]
+    )
+    result = await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"version": stmt.excluded.version},
+        )
+        .returning(RosterChange.version)
+    )
+    await publish_roster_users(db, user_ids, version=max(result.scalars().all()))
+
+
+async def publish_roster_users(
+    db: AsyncSession, user_ids: Collection[UUID], version: Optional[int] = None
+) -> None:
+    """
+    Have every worker's roster index refresh user_ids once `db` commits.
+
+    Without a version, connected gates are not told (for changes the
+    desktop sync does not carry, such as kelas membership).
+    """
+    if not user_ids:
+        return
+    await event_bus.publish(db, DesktopConnectionRegistry.TOPIC_ROSTER, {
+        "version": version,
+        # Lets every worker's roster index refresh just these users (None: reload all)
+        "user_ids": [str(user_id) for user_id in user_ids] if len(user_ids) <= MAX_PUBLISHED_IDS else None,
+    })
+
+
+async def get_roster_version(db: AsyncSession) -> int:
+    """Current roster version (0 before the first change)."""
+    result = await db.execute(
+        select(RosterChange.version).order_by(RosterChange.version.desc()).limit(1)
+    )
+    return result.scalar_one_or_none() or 0
@@ -0,0 +1,34 @@
+from typing import Iterable
+from uuid import UUID
+from sqlalchemy import select, func, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.settings import settings
+
+# First key of pg_advisory_xact_lock(key1, key2) for per-student absensi write locks
+STUDENT_LOCK_NAMESPACE = 0x51A1
+
+
+async def lock_students(db: AsyncSession, user_ids: Iterable[UUID]) -> None:
+    """
+    Serialize absensi writes per student across workers and write paths.
+
+    Takes a transaction-scoped advisory lock on each student's partition
+    (user_id mod INGEST_LOCK_PARTITIONS), in ascending order so that
+    concurrent writers cannot deadlock. The locks are released when the
+    caller commits or rolls back; students in other partitions proceed in
+    parallel.
+
+    Every path that upserts a student's absensi row takes these locks first
+    (desktop ingest, bulk class marking, the Alfa closer), so an upsert
+    never races another writer's uncommitted row for the same student. The
+    rollups rely on that: previous_status() reads the statement's snapshot.
+    """
+    partitions = sorted({user_id.int % settings.INGEST_LOCK_PARTITIONS for user_id in user_ids})
+    if not partitions:
+        return
+    keys = func.unnest(literal(partitions, ARRAY(Integer))).table_valued("bucket").render_derived()
+    await db.execute(
+        select(func.pg_advisory_xact_lock(STUDENT_LOCK_NAMESPACE, keys.c.bucket))
+        .order_by(keys.c.bucket)
+    )
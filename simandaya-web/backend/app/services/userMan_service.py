@@ -7,6 +7,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 from app.models.siswa_profile import SiswaProfile
 from app.models.guru_profile import GuruProfile
+from app.services.roster_index import roster_index
+from app.services.roster_version import bump_roster_version
 from app.dto.userMan.userman_request import (
     UpdateStudentRequestDTO, UpdateGuruRequestDTO,
 )
@@ -175,7 +177,9 @@ class UserManagementService:
         for field, value in update_data.items():
             setattr(profile, field, value)
 
+        await bump_roster_version(self.db, profile.user_id)
         await self.db.commit()
+        await roster_index.refresh_user(self.db, profile.user_id)
         await self.db.refresh(profile)
         return self._to_student_dto(profile)
 
@@ -204,7 +208,9 @@ class UserManagementService:
         if user:
             await self.db.delete(user)
 
+        await bump_roster_version(self.db, profile.user_id)
         await self.db.commit()
+        roster_index.discard(profile.user_id)
         return MessageResponseDTO(message="Student deleted successfully")
 
     # ── Guru CRUD ────────────────────────────────────────────────────────────
@@ -340,4 +346,5 @@ class UserManagementService:
             await self.db.delete(user)
 
         await self.db.commit()
+        roster_index.discard(profile.user_id)
         return MessageResponseDTO(message="Teacher deleted successfully")
@@ -0,0 +1,177 @@
+import json
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
+
+# Event documents are a few KB; anything bigger is a picture or garbage
+MAX_EVENT_PART_BYTES = 64 * 1024
+
+
+@dataclass
+class HikAccessEvent:
+    """An AccessControllerEvent pushed by a Hikvision reader."""
+    user_id: UUID
+    card_no: Optional[str]
+    serial_no: Optional[int]
+    device_time: datetime
+    ip_address: Optional[str] = None
+
+    @property
+    def record_id(self) -> str:
+        """
+        Same `${cardNo}_${serialNo}` id the desktop app uses, so the ledger
+        dedupes both paths. Pushes without a serialNo fall back to
+        `${cardNo}_${ipAddress}@${dateTime}`, which only a resend of the
+        same tap repeats.
+        """
+        card = self.card_no or self.user_id.hex
+        if self.serial_no is None:
+            return f"{card}_{self.ip_address or ''}@{self.device_time.isoformat()}"
+        return f"{card}_{self.serial_no}"
+
+    def to_event_payload(self, event_type: str, device_id: Optional[str] = None) -> dict[str, Any]:
+        """Raw AttendanceEventDTO payload for the ingest writer."""
+        return {
+            "record_id": self.record_id,
+            "user_id": str(self.user_id),
+            "event_type": event_type,
+            "device_time": self.device_time.isoformat(),
+            "device_id": device_id or self.ip_address,
+            "hik_serial_no": self.serial_no,
+        }
+
+
+def _boundary(content_type: str) -> Optional[bytes]:
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    return match.group(1).encode() if match else None
+
+
+async def iter_event_documents(
+    content_type: str, chunks: AsyncIterator[bytes]
+) -> AsyncIterator[bytes]:
+    """
+    Yield the JSON/XML event documents of a Hikvision HTTP push body.
+
+    Handles multipart/form-data (event part + optional picture part) and
+    plain text/xml or JSON bodies. Picture parts, and any part or body over
+    MAX_EVENT_PART_BYTES, are skipped as they stream in and never buffered.
+    """
+    boundary = _boundary(content_type) if "multipart" in content_type else None
+
+    if boundary is None:
+        body = b""
+        async for chunk in chunks:
+            if len(body) <= MAX_EVENT_PART_BYTES:
+                body += chunk
+        if 0 < len(body) <= MAX_EVENT_PART_BYTES:
+            yield body
+        return
+
+    delimiter = b"\r\n--" + boundary
+    # Pretend the body starts with CRLF so the first boundary matches the delimiter
+    buffer = b"\r\n"
+    in_headers = False
+    keep = False
+    part = b""
+
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            if in_headers:
+                end = buffer.find(b"\r\n\r\n")
+                if end < 0:
+                    break
+                headers = buffer[:end].decode("latin-1").lower()
+                buffer = buffer[end + 4:]
+                in_headers = False
+                keep = "image/" not in headers and "filename=" not in headers
+                part = b""
+                continue
+
+            index = buffer.find(delimiter)
+            if index < 0:
+                # Hold back enough bytes to recognise a delimiter split across chunks
+                safe = max(0, len(buffer) - len(delimiter))
+                if keep and len(part) + safe <= MAX_EVENT_PART_BYTES:
+                    part += buffer[:safe]
+                else:
+                    keep = False
+                buffer = buffer[safe:]
+                break
+
+            if keep and len(part) + index <= MAX_EVENT_PART_BYTES:
+                part += buffer[:index]
+                if part.strip():
+                    yield part
+            buffer = buffer[index + len(delimiter):]
+            keep = False
+            part = b""
+            if buffer.startswith(b"--"):
+                return
+            in_headers = True
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_json(document: bytes) -> Optional[dict[str, Any]]:
+    data = json.loads(document)
+    if not isinstance(data, dict):
+        return None
+    ace = data.get("AccessControllerEvent") or {}
+    return {
+        "ipAddress": data.get("ipAddress"),
+        "eventType": data.get("eventType"),
+        "dateTime": data.get("dateTime") or ace.get("time"),
+        "employeeNoString": ace.get("employeeNoString") or data.get("employeeNoString"),
+        "cardNo": ace.get("cardNo") or data.get("cardNo"),
+        "serialNo": ace.get("serialNo") or data.get("serialNo"),
+    }
+
+
+def _parse_xml(document: bytes) -> Optional[dict[str, Any]]:
+    root = ET.fromstring(document)
+    fields: dict[str, Any] = {}
+    for element in root.iter():
+        name = _local(element.tag)
+        if name in ("ipAddress", "eventType", "dateTime", "employeeNoString", "cardNo", "serialNo"):
+            fields.setdefault(name, (element.text or "").strip())
+    return fields
+
+
+def parse_access_event(document: bytes) -> Optional[HikAccessEvent]:
+    """
+    Map one event document to a HikAccessEvent.
+
+    Returns None for heartbeats, non-access events and events without a
+    usable employeeNoString (the student's user_id without hyphens).
+    """
+    try:
+        stripped = document.lstrip()
+        fields = _parse_xml(stripped) if stripped.startswith(b"<") else _parse_json(stripped)
+    except (ValueError, ET.ParseError):
+        return None
+    if not fields or fields.get("eventType") not in (None, "AccessControllerEvent"):
+        return None
+
+    try:
+        user_id = UUID(fields["employeeNoString"])
+        device_time = datetime.fromisoformat(fields["dateTime"])
+        serial_no = int(fields.get("serialNo") or 0)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if serial_no < 1:
+        # Never a constant: it would make every later tap of the card a replay
+        serial_no = None
+
+    return HikAccessEvent(
+        user_id=user_id,
+        card_no=fields.get("cardNo") or None,
+        serial_no=serial_no,
+        device_time=device_time,
+        ip_address=fields.get("ipAddress") or None,
+    )
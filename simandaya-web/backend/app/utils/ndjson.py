@@ -0,0 +1,79 @@
+import json
+import zlib
+from typing import Any, AsyncIterator, Iterator
+
+
+class LineTooLongError(ValueError):
+    """An NDJSON line is longer than the parser's max_line_bytes."""
+
+
+async def iter_ndjson(
+    chunks: AsyncIterator[bytes], max_line_bytes: int, gzipped: bool = False
+) -> AsyncIterator[tuple[int, Any]]:
+    """
+    Incrementally parse an NDJSON byte stream, optionally gzip-compressed.
+
+    Only the current partial line is buffered, and gzip output is inflated
+    at most max_line_bytes at a time, so memory stays within a few lines
+    whatever the body or its compression ratio. Each byte is scanned for a
+    newline once. Blank lines are skipped.
+
+    Yields:
+        (line_number, value) where value is the decoded JSON, or the
+        json.JSONDecodeError / UnicodeDecodeError raised for that line.
+
+    Raises:
+        LineTooLongError: if a line is longer than max_line_bytes
+        ValueError: if the body is not valid gzip
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    buffer = bytearray()
+    line_number = 0
+
+    def inflate(data: bytes) -> Iterator[bytes]:
+        if decompressor is None:
+            yield data
+            return
+        while data:
+            try:
+                yield decompressor.decompress(data, max_line_bytes)
+            except zlib.error as e:
+                raise ValueError(f"Invalid gzip body: {e}") from e
+            data = decompressor.unconsumed_tail
+
+    def split(data: bytes) -> Iterator[bytes]:
+        """Complete lines ending in data; the trailing partial line stays in buffer."""
+        start = 0
+        while (end := data.find(b"\n", start)) != -1:
+            if len(buffer) + end - start > max_line_bytes:
+                raise LineTooLongError(f"Line {line_number + 1} is longer than {max_line_bytes} bytes")
+            buffer.extend(data[start:end])
+            line = bytes(buffer)
+            buffer.clear()
+            start = end + 1
+            yield line
+        buffer.extend(data[start:])
+        if len(buffer) > max_line_bytes:
+            raise LineTooLongError(f"Line {line_number + 1} is longer than {max_line_bytes} bytes")
+
+    def parse(line: bytes) -> Any:
+        try:
+            return json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            return e
+
+    async for chunk in chunks:
+        for data in inflate(chunk):
+            for line in split(data):
+                line_number += 1
+                if line.strip():
+                    yield line_number, parse(line)
+
+    if decompressor is not None:
+        for line in split(decompressor.flush()):
+            line_number += 1
+            if line.strip():
+                yield line_number, parse(line)
+    line_number += 1
+    if buffer.strip():
+        yield line_number, parse(bytes(buffer))
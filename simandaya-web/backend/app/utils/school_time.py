@@ -0,0 +1,59 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+from app.config.settings import settings
+from app.enums import JenisKalender
+
+LIBUR = (JenisKalender.libur_nasional, JenisKalender.libur_sekolah)
+
+
+@lru_cache
+def school_tz() -> ZoneInfo:
+    return ZoneInfo(settings.SCHOOL_TIMEZONE)
+
+
+def school_day_range(tanggal: date) -> tuple[datetime, datetime]:
+    """
+    Half-open [start, end) timestamptz bounds of a school day.
+
+    Filtering `created_at >= start AND created_at < end` is sargable, unlike
+    `date(created_at) = tanggal`, and does not depend on the database
+    session's TimeZone.
+    """
+    start = datetime.combine(tanggal, time.min, tzinfo=school_tz())
+    end = datetime.combine(tanggal + timedelta(days=1), time.min, tzinfo=school_tz())
+    return start, end
+
+
+def school_date(moment: datetime) -> date:
+    """School-day date of a timestamp; naive timestamps are taken as school-local."""
+    if moment.tzinfo is None:
+        return moment.date()
+    return moment.astimezone(school_tz()).date()
+
+
+def school_local(moment: datetime) -> datetime:
+    """Naive school-local wall time of a timestamp, for spreadsheets (which have no time zones)."""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(school_tz()).replace(tzinfo=None)
+
+
+def no_school_reason(
+    tanggal: date, entries: Iterable[tuple[JenisKalender, Optional[str]]]
+) -> Optional[str]:
+    """
+    Why tanggal, inside a tahun ajaran, is not a school day, or None if it is.
+
+    `entries` are the (jenis, keterangan) kalender entries of that date. A
+    libur entry closes the day; weekends are closed unless marked hari
+    efektif. Used by the Alfa closer and the absensi matrix alike.
+    """
+    entries = list(entries)
+    for jenis, keterangan in entries:
+        if jenis in LIBUR:
+            return f"{jenis.value}: {keterangan}"
+    if tanggal.weekday() >= 5 and not any(jenis == JenisKalender.hari_efektif for jenis, _ in entries):
+        return "Weekend"
+    return None
@@ -0,0 +1,83 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, NamedTuple
+
+
+class _Entry(NamedTuple):
+    expires_at: float
+    tag: Hashable
+    value: Any
+
+
+class TTLCache:
+    """
+    In-process TTL cache with request coalescing and tag invalidation.
+
+    get_or_load() returns a fresh cached value, or runs the loader; callers
+    asking for the same key while it runs await that same load instead of
+    starting their own. The load runs as its own task, so a caller going
+    away does not cancel it for the others; for the same reason a loader
+    must not use anything scoped to the first caller's request (such as
+    its database session), only resources it opens itself.
+
+    Every key belongs to a tag; invalidate(tag) drops the tag's entries and
+    its running loads from the in-flight table, and a load stores its result
+    only if it is still in that table, so results that may be stale are not
+    kept. No per-tag state outlives the entries and loads. Entries are
+    evicted least recently used beyond max_entries.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._inflight: dict[Hashable, tuple[Hashable, asyncio.Task]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_load(
+        self, key: Hashable, tag: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry.value
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = (tag, asyncio.ensure_future(self._load(key, tag, loader)))
+            self._inflight[key] = inflight
+        return await asyncio.shield(inflight[1])
+
+    async def _load(
+        self, key: Hashable, tag: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        try:
+            value = await loader()
+        finally:
+            inflight = self._inflight.get(key)
+            # Not ours any more if invalidate() or clear() dropped it meanwhile
+            current = inflight is not None and inflight[1] is asyncio.current_task()
+            if current:
+                del self._inflight[key]
+        if current:
+            self._entries[key] = _Entry(time.monotonic() + self.ttl_seconds, tag, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, tag: Hashable) -> None:
+        """Drop every entry of `tag`; loads already running for it are not stored."""
+        for key in [key for key, entry in self._entries.items() if entry.tag == tag]:
+            del self._entries[key]
+        for key in [key for key, (key_tag, _) in self._inflight.items() if key_tag == tag]:
+            del self._inflight[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
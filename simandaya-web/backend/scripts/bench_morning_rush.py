@@ -0,0 +1,354 @@
+"""
+Morning-rush benchmark for the desktop attendance ingest path.
+
+Usage (inside the backend container, with Postgres up):
+    python scripts/bench_morning_rush.py --students 1000 --gates 4 --speedup 120
+    python scripts/bench_morning_rush.py --group-commit-ms 0     # inline commits
+
+Seeds N benchmark students (NIS prefix BENCH, created once and reused),
+clears their attendance for today, starts the backend in-process under
+uvicorn and opens G desktop sockets on /api/desktop/ws. Taps follow the
+simulator's gaussian rush curve (scripts/hikvision_simulator.py), spread
+round-robin over the gates, with --speedup simulated seconds per second.
+
+Reports ack latency p50/p95/p99, throughput, SQL statements and commits per
+tap, and connection-pool wait, and writes them to a JSON result file so
+DesktopService regressions show up before deployment.
+
+Only BENCH students are touched; --cleanup deletes them afterwards. Their
+absensi rows are removed through the absensi rollups, so absensi_rekap_*
+stays exact. The app drops every table on startup when DEV_MODE is set, so
+the bench refuses to run then.
+"""
+
+import sys
+import asyncio
+import argparse
+import json
+import os
+import socket
+import subprocess
+import time
+import uuid
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+NIS_PREFIX = "BENCH"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values, default=0.0),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ── Instrumentation ──────────────────────────────────────────────────────────
+
+class DbCounters:
+    """SQL statements, commits and pool checkout wait on the app engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements = 0
+        self.commits = 0
+        self.pool_waits: list[float] = []
+
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._on_execute)
+        event.listen(sync_engine, "commit", self._on_commit)
+
+        pool = sync_engine.pool
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                self.pool_waits.append((time.perf_counter() - started) * 1000)
+
+        pool.connect = timed_connect
+
+    def _on_execute(self, *args) -> None:
+        self.statements += 1
+
+    def _on_commit(self, *args) -> None:
+        self.commits += 1
+
+    def reset(self) -> None:
+        self.statements = 0
+        self.commits = 0
+        self.pool_waits.clear()
+
+
+# ── Seeding ──────────────────────────────────────────────────────────────────
+
+async def delete_absensi(session, *criteria) -> int:
+    """Delete absensi rows and take them out of the absensi rollups, in the session's transaction."""
+    from sqlalchemy import delete
+    from app.models.absensi import Absensi
+    from app.services.absensi_rekap import status_change, apply_rekap
+
+    result = await session.execute(
+        delete(Absensi).where(*criteria).returning(Absensi.user_id, Absensi.tanggal, Absensi.status)
+    )
+    rows = result.all()
+    await apply_rekap(session, [
+        change for row in rows
+        for change in status_change(row.user_id, row.tanggal, row.status, None)
+    ])
+    return len(rows)
+
+
+async def seed_students(count: int) -> list:
+    """Create missing BENCH students and clear today's attendance for them."""
+    from app.config.database import async_session_maker
+    from app.models.user import User
+    from app.models.siswa_profile import SiswaProfile
+    from app.models.absensi import Absensi
+    from app.services.roster_version import bump_roster_version
+    from app.enums import UserType, RegistrationStatus, StatusSiswa
+    from seed_absensi import get_student_ids
+
+    async with async_session_maker() as session:
+        existing = await get_student_ids(session, NIS_PREFIX)
+        created = []
+        for index in range(len(existing), count):
+            user = User(
+                user_type=UserType.siswa,
+                registration_status=RegistrationStatus.pending,
+                is_active=True,
+            )
+            session.add(user)
+            await session.flush()
+            session.add(SiswaProfile(
+                user_id=user.user_id,
+                nis=f"{NIS_PREFIX}{index:06d}",
+                nama_lengkap=f"Bench Student {index}",
+                kelas_jurusan="BENCH",
+                status_siswa=StatusSiswa.aktif,
+            ))
+            created.append(user.user_id)
+        if created:
+            await bump_roster_version(session, *created)
+        student_ids = (existing + created)[:count]
+
+        await delete_absensi(
+            session, Absensi.user_id.in_(student_ids), Absensi.tanggal == date.today()
+        )
+        await session.commit()
+
+    print(f"Seeded {len(created)} new benchmark students ({len(student_ids)} in use)")
+    return student_ids
+
+
+async def cleanup_students() -> None:
+    from sqlalchemy import delete
+    from app.config.database import async_session_maker
+    from app.models.user import User
+    from app.models.absensi import Absensi
+    from app.services.roster_version import bump_roster_version
+    from seed_absensi import get_student_ids
+
+    async with async_session_maker() as session:
+        student_ids = await get_student_ids(session, NIS_PREFIX)
+        if student_ids:
+            await delete_absensi(session, Absensi.user_id.in_(student_ids))
+            await session.execute(delete(User).where(User.user_id.in_(student_ids)))
+            await bump_roster_version(session, *student_ids)
+        await session.commit()
+    print(f"Removed {len(student_ids)} benchmark students")
+
+
+# ── Gates ────────────────────────────────────────────────────────────────────
+
+async def run_gate(url: str, taps: list, origin: datetime, speedup: float, run_id: str, gate: int) -> dict:
+    """Replay one gate's taps over a socket; returns per-tap latencies and ack statuses."""
+    import websockets
+
+    sent: dict[str, float] = {}
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+
+    async with websockets.connect(url, max_queue=None) as ws:
+        async def receive() -> None:
+            while len(latencies) < len(taps):
+                message = json.loads(await ws.recv())
+                if "type" in message:
+                    continue  # roster/settings push
+                latencies.append((time.perf_counter() - sent[message["record_id"]]) * 1000)
+                statuses[message["status"]] = statuses.get(message["status"], 0) + 1
+
+        receiver = asyncio.create_task(receive())
+        started = time.perf_counter()
+        for index, (at, student) in enumerate(taps):
+            delay = (at - origin).total_seconds() / speedup - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            record_id = f"bench-{run_id}-{gate}-{index}"
+            sent[record_id] = time.perf_counter()
+            await ws.send(json.dumps({
+                "record_id": record_id,
+                "user_id": student.user_id,
+                "event_type": "absen_masuk",
+                "device_time": at.isoformat(),
+            }))
+        await receiver
+
+    return {"latencies": latencies, "statuses": statuses}
+
+
+# ── Main ─────────────────────────────────────────────────────────────────────
+
+async def main(args: argparse.Namespace) -> dict:
+    import uvicorn
+    from app.config.database import engine, pool_status, init_db
+    from app.config.settings import settings
+    from app.main import app
+    from hikvision_simulator import SimStudent, TapCurve
+
+    if settings.DEV_MODE:
+        raise SystemExit("DEV_MODE is set: the app would drop every table after seeding. Run with DEV_MODE=false.")
+    # The schema must exist before seeding; the app's own init_db then leaves it alone
+    await init_db()
+    student_ids = await seed_students(args.students)
+    students = [SimStudent(user_id=str(uid), card_no=f"{i:010d}") for i, uid in enumerate(student_ids)]
+    curve = TapCurve(sigma_minutes=args.sigma, attendance_rate=args.attendance)
+    schedule = curve.schedule(students, datetime.now(timezone.utc))
+    origin = schedule[0][0]
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    counters = DbCounters(engine)
+    peak_checked_out = 0
+
+    async def sample_pool() -> None:
+        nonlocal peak_checked_out
+        while True:
+            peak_checked_out = max(peak_checked_out, pool_status()["checked_out"])
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.create_task(sample_pool())
+    url = f"ws://127.0.0.1:{port}/api/desktop/ws?api_key={settings.DESKTOP_API_KEY}"
+    run_id = uuid.uuid4().hex[:8]
+
+    started = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(
+            run_gate(url, schedule[gate::args.gates], origin, args.speedup, run_id, gate)
+            for gate in range(args.gates)
+        ))
+    finally:
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+        server.should_exit = True
+        await serving
+
+    latencies = [value for result in results for value in result["latencies"]]
+    statuses: dict[str, int] = {}
+    for result in results:
+        for key, value in result["statuses"].items():
+            statuses[key] = statuses.get(key, 0) + value
+    taps = len(schedule)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "config": {
+            "students": len(students),
+            "gates": args.gates,
+            "speedup": args.speedup,
+            "sigma_minutes": args.sigma,
+            "group_commit_ms": settings.INGEST_GROUP_COMMIT_MS,
+            "group_max_events": settings.INGEST_GROUP_MAX_EVENTS,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+        },
+        "taps": taps,
+        "acks": statuses,
+        "elapsed_seconds": elapsed,
+        "throughput_acks_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "ack_latency_ms": summarize(latencies),
+        "db": {
+            "statements": counters.statements,
+            "commits": counters.commits,
+            "statements_per_tap": counters.statements / taps if taps else 0.0,
+            "commits_per_tap": counters.commits / taps if taps else 0.0,
+            "pool_wait_ms": summarize(counters.pool_waits),
+            "peak_checked_out": peak_checked_out,
+        },
+    }
+
+    if args.cleanup:
+        await cleanup_students()
+    await engine.dispose()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--gates", type=int, default=4)
+    parser.add_argument("--speedup", type=float, default=120.0, help="Simulated seconds per real second")
+    parser.add_argument("--sigma", type=float, default=12.0, help="Rush spread in minutes")
+    parser.add_argument("--attendance", type=float, default=1.0, help="Fraction of students that tap")
+    parser.add_argument("--group-commit-ms", type=float, help="Override INGEST_GROUP_COMMIT_MS")
+    parser.add_argument("--output", help="Result file (default bench_results/morning_rush_<time>.json)")
+    parser.add_argument("--cleanup", action="store_true", help="Delete benchmark students afterwards")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so overrides go in before the app is imported
+    if args.group_commit_ms is not None:
+        os.environ["INGEST_GROUP_COMMIT_MS"] = str(args.group_commit_ms)
+
+    report = asyncio.run(main(args))
+
+    output = Path(args.output or (
+        Path(__file__).parent.parent / "bench_results"
+        / f"morning_rush_{datetime.now():%Y%m%d_%H%M%S}.json"
+    ))
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    latency = report["ack_latency_ms"]
+    print(
+        f"{report['taps']} taps in {report['elapsed_seconds']:.1f}s "
+        f"({report['throughput_acks_per_second']:.0f} acks/s), acks {report['acks']}\n"
+        f"ack latency ms: p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  p99 {latency['p99']:.1f}\n"
+        f"db: {report['db']['statements_per_tap']:.2f} statements/tap, "
+        f"{report['db']['commits_per_tap']:.3f} commits/tap, "
+        f"pool wait p95 {report['db']['pool_wait_ms']['p95']:.2f} ms\n"
+        f"Result written to {output}"
+    )
@@ -0,0 +1,123 @@
+"""
+EXPLAIN check for the izin_keluar date filters.
+
+Usage (inside the backend container, with Postgres up):
+    python scripts/explain_izin_keluar.py
+    python scripts/explain_izin_keluar.py --rows 200000 --days 400
+
+Inside a transaction that is rolled back at the end, inserts --rows izin
+keluar records spread over --days school days (a few of them still out),
+ANALYZEs the table and EXPLAINs:
+
+  - the public day listing (AbsensiService.izin_keluar_public_stmt), which
+    must use ix_izin_keluar_created_at
+  - a "still out today" lookup, which must use the partial index
+    ix_izin_keluar_still_out
+
+Prints the plans and exits with status 1 if either index is not used, so a
+filter that stops being range-indexable fails loudly.
+"""
+
+import sys
+import asyncio
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select, text
+from app.config.database import engine, async_session_maker, init_db
+from app.models.user import User
+from app.models.izin_keluar import IzinKeluar
+from app.services.absensi_service import AbsensiService
+from app.utils.school_time import school_tz, school_day_range
+from app.enums import UserType, RegistrationStatus
+
+
+def index_names(plan: dict) -> set[str]:
+    """Every index referenced anywhere in an EXPLAIN (FORMAT JSON) plan tree."""
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", ()):
+        names |= index_names(child)
+    return names
+
+
+async def explain(conn, stmt) -> dict:
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)
+    document = result.scalar()
+    if isinstance(document, str):
+        document = json.loads(document)
+    return document[0]["Plan"]
+
+
+async def main(args: argparse.Namespace) -> int:
+    await init_db()
+    today = datetime.now(school_tz()).date()
+    start, end = school_day_range(today)
+
+    checks = [
+        (
+            "public day listing",
+            AbsensiService.izin_keluar_public_stmt(today).limit(50),
+            "ix_izin_keluar_created_at",
+        ),
+        (
+            "still out today",
+            select(IzinKeluar.izin_id, IzinKeluar.user_id).where(
+                IzinKeluar.waktu_kembali.is_(None),
+                IzinKeluar.created_at >= start,
+                IzinKeluar.created_at < end,
+            ),
+            "ix_izin_keluar_still_out",
+        ),
+    ]
+
+    failed = 0
+    async with async_session_maker() as session:
+        user = User(
+            user_type=UserType.siswa,
+            registration_status=RegistrationStatus.pending,
+            is_active=True,
+        )
+        session.add(user)
+        await session.flush()
+
+        await session.execute(
+            text("""
+                INSERT INTO izin_keluar (izin_id, user_id, created_at, keterangan, waktu_kembali)
+                SELECT gen_random_uuid(), :user_id,
+                       now() - make_interval(secs => g * :days * 86400.0 / :rows),
+                       'explain check',
+                       CASE WHEN g % 500 = 0 THEN NULL ELSE now() END
+                FROM generate_series(1, :rows) AS g
+            """),
+            {"user_id": user.user_id, "rows": args.rows, "days": args.days},
+        )
+        await session.execute(text("ANALYZE izin_keluar"))
+
+        conn = await session.connection()
+        for name, stmt, expected in checks:
+            plan = await explain(conn, stmt)
+            used = index_names(plan)
+            ok = expected in used
+            failed += not ok
+            print(f"{'PASS' if ok else 'FAIL'} {name}: expected {expected}, used {sorted(used) or 'no index'}")
+            if args.verbose or not ok:
+                print(json.dumps(plan, indent=2))
+
+        await session.rollback()
+
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="Synthetic izin keluar rows")
+    parser.add_argument("--days", type=int, default=200, help="Days the rows are spread over")
+    parser.add_argument("--verbose", action="store_true", help="Print plans of passing checks too")
+    sys.exit(asyncio.run(main(parser.parse_args())))
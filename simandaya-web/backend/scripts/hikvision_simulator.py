@@ -0,0 +1,383 @@
+"""
+Fake Hikvision access-control reader (ISAPI) for load and soak tests.
+
+Usage (standalone, against a running backend; 2385 is the port docker
+compose publishes, BACKEND_EXTERNAL_PORT):
+    python scripts/hikvision_simulator.py \\
+        --backend http://localhost:2385 --api-key <DESKTOP_API_KEY> \\
+        --port 9090 --speedup 60
+
+    # Also push every tap straight to the backend's HTTP listener
+    python scripts/hikvision_simulator.py ... \\
+        --push-url "http://localhost:2385/api/desktop/hikvision/events?api_key=<key>"
+
+Implements what the gate app and the backend talk to:
+    GET    /ISAPI/System/deviceInfo
+    GET    /ISAPI/Event/notification/alertStream     (multipart/mixed, JSON parts)
+    POST   /ISAPI/AccessControl/AcsEvent?format=json (beginSerialNo / MORE paging)
+    GET    /ISAPI/Event/notification/httpHosts
+    PUT    /ISAPI/Event/notification/httpHosts       (push targets, XML)
+    DELETE /ISAPI/Event/notification/httpHosts
+
+Students are taken from GET /api/desktop/students. Taps follow a gaussian
+arrival curve around the morning rush (06:30-07:30 by default); --speedup
+compresses simulated time so an hour-long rush can run in a minute.
+
+In-process use (e.g. from a benchmark):
+    device = SimulatedDevice()
+    app = create_app(device)             # serve with uvicorn or TestClient
+    await device.run_schedule(roster, TapCurve())
+"""
+
+import sys
+import asyncio
+import argparse
+import json
+import os
+import random
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+
+BOUNDARY = "MIME_boundary"
+ISAPI_NS = "http://www.isapi.org/ver20/XMLSchema"
+WIB = timezone(timedelta(hours=7))
+
+
+# ── Roster and tap curve ─────────────────────────────────────────────────────
+
+@dataclass
+class SimStudent:
+    user_id: str
+    card_no: str
+
+    @property
+    def employee_no(self) -> str:
+        """Hikvision employeeNo: the user_id without hyphens."""
+        return self.user_id.replace("-", "")
+
+
+async def fetch_roster(backend: str, api_key: str) -> list[SimStudent]:
+    """Load active students from the backend; card numbers are derived from NIS."""
+    async with httpx.AsyncClient(base_url=backend, timeout=30) as client:
+        response = await client.get("/api/desktop/students", headers={"X-API-Key": api_key})
+        response.raise_for_status()
+    return [
+        SimStudent(user_id=s["user_id"], card_no=f"{s.get('nis') or index:0>10}")
+        for index, s in enumerate(response.json())
+    ]
+
+
+@dataclass
+class TapCurve:
+    """Gaussian arrival curve for one gate rush, in simulated wall-clock time."""
+    start: time = time(6, 30)
+    end: time = time(7, 30)
+    peak: time = time(7, 0)
+    sigma_minutes: float = 12.0
+    attendance_rate: float = 0.95
+    exit_rate: float = 0.0
+
+    def schedule(self, students: list[SimStudent], day: datetime) -> list[tuple[datetime, SimStudent]]:
+        """Sorted (tap time, student) pairs; taps outside [start, end] are clamped."""
+        start = datetime.combine(day.date(), self.start, WIB)
+        end = datetime.combine(day.date(), self.end, WIB)
+        peak = datetime.combine(day.date(), self.peak, WIB)
+
+        taps = []
+        for student in students:
+            if random.random() > self.attendance_rate:
+                continue
+            at = peak + timedelta(minutes=random.gauss(0, self.sigma_minutes))
+            taps.append((min(max(at, start), end), student))
+            if random.random() < self.exit_rate:
+                # Re-tap later in the rush (e.g. a student going back out)
+                taps.append((min(at + timedelta(minutes=random.uniform(1, 20)), end), student))
+        taps.sort(key=lambda tap: tap[0])
+        return taps
+
+
+# ── Device ───────────────────────────────────────────────────────────────────
+
+@dataclass
+class PushHost:
+    id: str
+    url: str
+
+
+class SimulatedDevice:
+    """
+    In-memory event log of one reader.
+
+    Every tap gets the next serialNo and is fanned out to alertStream
+    listeners and to the configured httpHosts.
+    """
+
+    def __init__(self, serial_start: int = 1, picture_bytes: int = 0, major: int = 5, minor: int = 75):
+        self.serial_no = serial_start - 1
+        self.picture_bytes = picture_bytes
+        self.major = major
+        self.minor = minor
+        self.events: list[dict[str, Any]] = []
+        self.hosts: dict[str, PushHost] = {}
+        self.push_errors = 0
+        self._listeners: set[asyncio.Queue] = set()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def tap(self, student: SimStudent, at: Optional[datetime] = None) -> dict[str, Any]:
+        """Record a card tap and notify listeners; returns the ISAPI event."""
+        self.serial_no += 1
+        stamp = (at or datetime.now(WIB)).isoformat(timespec="seconds")
+        event = {
+            "major": self.major,
+            "minor": self.minor,
+            "time": stamp,
+            "cardNo": student.card_no,
+            "employeeNoString": student.employee_no,
+            "serialNo": self.serial_no,
+            "currentVerifyMode": "cardOrFace",
+        }
+        self.events.append(event)
+        for queue in self._listeners:
+            queue.put_nowait(event)
+        if self.hosts:
+            asyncio.get_running_loop().create_task(self._push(event))
+        return event
+
+    @staticmethod
+    def alert(event: dict[str, Any]) -> dict[str, Any]:
+        """EventNotificationAlert JSON document for an event."""
+        return {
+            "ipAddress": "127.0.0.1",
+            "dateTime": event["time"],
+            "activePostCount": 1,
+            "eventType": "AccessControllerEvent",
+            "eventState": "active",
+            "eventDescription": "Access Controller Event",
+            "AccessControllerEvent": {
+                "deviceName": "SIM-DS-K1T341",
+                "majorEventType": event["major"],
+                "subEventType": event["minor"],
+                "cardNo": event["cardNo"],
+                "employeeNoString": event["employeeNoString"],
+                "serialNo": event["serialNo"],
+                "currentVerifyMode": event["currentVerifyMode"],
+            },
+        }
+
+    def search(self, begin_serial: Optional[int], position: int, max_results: int) -> dict[str, Any]:
+        """AcsEvent search result page."""
+        matches = [
+            event for event in self.events
+            if begin_serial is None or event["serialNo"] >= begin_serial
+        ]
+        page = matches[position:position + max_results]
+        more = position + len(page) < len(matches)
+        return {
+            "AcsEvent": {
+                "searchID": "poll",
+                "totalMatches": len(matches),
+                "responseStatusStrg": "MORE" if more else ("OK" if page else "NO MATCH"),
+                "numOfMatches": len(page),
+                "InfoList": page,
+            }
+        }
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue receiving every new event (one per alertStream connection)."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._listeners.discard(queue)
+
+    async def _push(self, event: dict[str, Any]) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10)
+        files = {"event_log": (None, json.dumps(self.alert(event)), "application/json")}
+        if self.picture_bytes:
+            files["Picture"] = ("picture.jpg", os.urandom(self.picture_bytes), "image/jpeg")
+        for host in list(self.hosts.values()):
+            try:
+                response = await self._client.post(host.url, files=files)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                self.push_errors += 1
+
+    async def run_schedule(
+        self, students: list[SimStudent], curve: TapCurve, speedup: float = 60.0
+    ) -> int:
+        """Replay one rush in (compressed) real time; returns the number of taps."""
+        taps = curve.schedule(students, datetime.now(WIB))
+        if not taps:
+            return 0
+        origin = taps[0][0]
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for at, student in taps:
+            delay = (at - origin).total_seconds() / speedup - (loop.time() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.tap(student, at)
+        return len(taps)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# ── ISAPI app ────────────────────────────────────────────────────────────────
+
+def _hosts_xml(device: SimulatedDevice) -> str:
+    root = ET.Element("HttpHostNotificationList", version="2.0", xmlns=ISAPI_NS)
+    for host in device.hosts.values():
+        node = ET.SubElement(root, "HttpHostNotification")
+        ET.SubElement(node, "id").text = host.id
+        ET.SubElement(node, "url").text = host.url
+    return ET.tostring(root, encoding="unicode")
+
+
+def _parse_hosts(body: bytes) -> list[PushHost]:
+    hosts = []
+    for node in ET.fromstring(body).iter(f"{{{ISAPI_NS}}}HttpHostNotification"):
+        field = lambda name: (node.findtext(f"{{{ISAPI_NS}}}{name}") or "").strip()  # noqa: E731
+        scheme = "https" if field("protocolType").upper() == "HTTPS" else "http"
+        address = field("ipAddress") or field("hostName")
+        url = field("url")
+        if address:
+            url = f"{scheme}://{address}:{field('portNo') or 80}{url}"
+        hosts.append(PushHost(id=field("id") or "1", url=url))
+    return hosts
+
+
+def create_app(device: SimulatedDevice, heartbeat_seconds: float = 10.0) -> FastAPI:
+    app = FastAPI(title="Hikvision ISAPI simulator")
+
+    @app.get("/ISAPI/System/deviceInfo")
+    async def device_info() -> Response:
+        xml = (
+            f'<DeviceInfo version="2.0" xmlns="{ISAPI_NS}">'
+            "<deviceName>SIM-DS-K1T341</deviceName><model>DS-K1T341AM</model>"
+            "<serialNumber>SIM0000000001</serialNumber></DeviceInfo>"
+        )
+        return Response(xml, media_type="application/xml")
+
+    @app.get("/ISAPI/Event/notification/alertStream")
+    async def alert_stream() -> StreamingResponse:
+        async def parts() -> AsyncIterator[bytes]:
+            events = device.subscribe()
+            try:
+                while True:
+                    try:
+                        event = await asyncio.wait_for(events.get(), heartbeat_seconds)
+                        document = device.alert(event)
+                    except asyncio.TimeoutError:
+                        document = {
+                            "dateTime": datetime.now(WIB).isoformat(timespec="seconds"),
+                            "eventType": "heartBeat",
+                            "eventState": "active",
+                        }
+                    body = json.dumps(document).encode()
+                    yield (
+                        f"--{BOUNDARY}\r\nContent-Type: application/json; charset=\"UTF-8\"\r\n"
+                        f"Content-Length: {len(body)}\r\n\r\n"
+                    ).encode() + body + b"\r\n"
+            finally:
+                device.unsubscribe(events)
+
+        return StreamingResponse(parts(), media_type=f"multipart/mixed; boundary={BOUNDARY}")
+
+    @app.post("/ISAPI/AccessControl/AcsEvent")
+    async def acs_event(request: Request) -> dict[str, Any]:
+        cond = (await request.json()).get("AcsEventCond", {})
+        begin = cond.get("beginSerialNo")
+        return device.search(
+            begin_serial=int(begin) if begin is not None else None,
+            position=int(cond.get("searchResultPosition", 0)),
+            max_results=int(cond.get("maxResults", 30)),
+        )
+
+    @app.get("/ISAPI/Event/notification/httpHosts")
+    async def get_hosts() -> Response:
+        return Response(_hosts_xml(device), media_type="application/xml")
+
+    @app.put("/ISAPI/Event/notification/httpHosts")
+    async def put_hosts(request: Request) -> Response:
+        device.hosts = {host.id: host for host in _parse_hosts(await request.body())}
+        return Response(
+            f'<ResponseStatus xmlns="{ISAPI_NS}"><statusCode>1</statusCode>'
+            "<statusString>OK</statusString></ResponseStatus>",
+            media_type="application/xml",
+        )
+
+    @app.delete("/ISAPI/Event/notification/httpHosts")
+    async def delete_hosts() -> Response:
+        device.hosts = {}
+        return Response(status_code=200)
+
+    return app
+
+
+# ── Standalone ───────────────────────────────────────────────────────────────
+
+async def main(args: argparse.Namespace) -> None:
+    students = await fetch_roster(args.backend, args.api_key)
+    print(f"Loaded {len(students)} students from {args.backend}")
+
+    device = SimulatedDevice(serial_start=args.serial_start, picture_bytes=args.picture_bytes)
+    if args.push_url:
+        device.hosts["1"] = PushHost(id="1", url=args.push_url)
+
+    curve = TapCurve(
+        peak=time.fromisoformat(args.peak),
+        sigma_minutes=args.sigma,
+        attendance_rate=args.attendance,
+        exit_rate=args.exit_rate,
+    )
+    server = uvicorn.Server(uvicorn.Config(create_app(device), host=args.host, port=args.port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    print(f"ISAPI simulator listening on http://{args.host}:{args.port}")
+
+    try:
+        for rush in range(args.rushes):
+            taps = await device.run_schedule(students, curve, speedup=args.speedup)
+            print(f"Rush {rush + 1}: {taps} taps, last serialNo {device.serial_no}, push errors {device.push_errors}")
+        if args.linger:
+            await serving
+    finally:
+        server.should_exit = True
+        await serving
+        await device.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--backend", default="http://localhost:2385", help="Backend base URL (compose publishes port 2385)"
+    )
+    parser.add_argument("--api-key", default=os.environ.get("DESKTOP_API_KEY", ""))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9090)
+    parser.add_argument("--push-url", help="Extra httpHosts push target (e.g. the backend HTTP listener)")
+    parser.add_argument("--picture-bytes", type=int, default=0, help="Attach a fake JPEG of this size to pushes")
+    parser.add_argument("--serial-start", type=int, default=1)
+    parser.add_argument("--peak", default="07:00")
+    parser.add_argument("--sigma", type=float, default=12.0, help="Rush spread in minutes")
+    parser.add_argument("--attendance", type=float, default=0.95, help="Fraction of students that tap")
+    parser.add_argument("--exit-rate", type=float, default=0.0, help="Fraction of students that tap twice")
+    parser.add_argument("--speedup", type=float, default=60.0, help="Simulated seconds per real second")
+    parser.add_argument("--rushes", type=int, default=1, help="Number of rushes to replay (soak tests)")
+    parser.add_argument("--linger", action="store_true", help="Keep serving after the last rush")
+    asyncio.run(main(parser.parse_args()))
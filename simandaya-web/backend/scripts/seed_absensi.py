@@ -13,6 +13,7 @@ import asyncio
 import random
 from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
+from typing import Optional
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -23,6 +24,7 @@ from app.models.siswa_profile import SiswaProfile
 from app.models.guru_profile import GuruProfile  # noqa: F401 — needed for User relationship resolution
 from app.models.absensi import Absensi
 from app.models.izin_keluar import IzinKeluar
+from app.services.absensi_rekap import rebuild_rekap
 from app.enums import UserType, StatusAbsensi
 
 
@@ -35,15 +37,22 @@ IZIN_REASONS = [
 ]
 
 
+async def get_student_ids(session, nis_prefix: Optional[str] = None) -> list:
+    """Student user_ids that have a profile, optionally only those whose NIS starts with nis_prefix."""
+    query = (
+        select(User.user_id)
+        .join(SiswaProfile, User.user_id == SiswaProfile.user_id)
+        .where(User.user_type == UserType.siswa)
+    )
+    if nis_prefix is not None:
+        query = query.where(SiswaProfile.nis.startswith(nis_prefix))
+    result = await session.execute(query.order_by(SiswaProfile.nis))
+    return [row[0] for row in result.all()]
+
+
 async def seed():
     async with async_session_maker() as session:
-        # Get all student user_ids
-        result = await session.execute(
-            select(User.user_id)
-            .join(SiswaProfile, User.user_id == SiswaProfile.user_id)
-            .where(User.user_type == UserType.siswa)
-        )
-        student_ids = [row[0] for row in result.all()]
+        student_ids = await get_student_ids(session)
 
         if not student_ids:
             print("No students found. Import students first:")
@@ -131,6 +140,8 @@ async def seed():
 
         print(f"Created {izin_created} izin keluar records")
 
+        # Seeded rows bypass the ingest paths, so recount the rollups
+        await rebuild_rekap(session)
         await session.commit()
 
     await engine.dispose()
@@ -22,6 +22,7 @@ from app.config.database import engine, async_session_maker
 from app.models.user import User
 from app.models.siswa_profile import SiswaProfile
 from app.models.guru_profile import GuruProfile
+from app.services.roster_version import bump_roster_version
 from app.enums import (
     UserType, RegistrationStatus,
     StatusSiswa, StatusGuru,
@@ -182,6 +183,7 @@ async def seed():
                 status_siswa=StatusSiswa.aktif,
             )
             session.add(profile)
+            await bump_roster_version(session, user.user_id)
             print(f"  CREATED student: {s['nis']} - {s['nama_lengkap']}")
 
         # ── Teachers (PENDING) ─────────────────────────────────────────────
@@ -0,0 +1,54 @@
+"""
+Check the absensi rollups (absensi_rekap_kelas, absensi_rekap_siswa).
+
+Usage (inside the backend container, with Postgres up):
+    python scripts/verify_rekap.py
+    python scripts/verify_rekap.py --rebuild
+
+Recounts both rollups from the absensi table and prints every key whose
+stored count differs. Exits with status 1 on any difference, so it can run
+as a periodic check.
+
+The write paths keep the rollups current, but some changes are not
+followed incrementally (a student moved to another kelas, semester dates
+edited, absensi removed by a cascade). --rebuild recomputes both tables
+from scratch in one transaction and then verifies again.
+"""
+
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config.database import engine, async_session_maker, init_db
+from app.services.absensi_rekap import rebuild_rekap, verify_rekap
+
+
+async def main(args: argparse.Namespace) -> int:
+    await init_db()
+    async with async_session_maker() as session:
+        if args.rebuild:
+            await rebuild_rekap(session)
+            await session.commit()
+            print("Rebuilt absensi rollups")
+
+        mismatches = await verify_rekap(session)
+
+    await engine.dispose()
+
+    failed = 0
+    for table, rows in mismatches.items():
+        failed += len(rows)
+        print(f"{'PASS' if not rows else 'FAIL'} {table}: {len(rows)} mismatched keys")
+        for *key, stored, expected in rows[:args.show]:
+            print(f"    {', '.join(map(str, key))}: stored {stored}, expected {expected}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="Recompute both rollups before verifying")
+    parser.add_argument("--show", type=int, default=20, help="Mismatched keys to print per table")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -1,5 +1,5 @@
 import { createApi } from "@reduxjs/toolkit/query/react";
-import { createBaseQuery } from "./base";
+import { API_BASE, createBaseQuery } from "./base";
 
 export interface PublicAbsensi {
   absensi_id: string;
@@ -27,6 +27,17 @@ interface ListParams {
   limit?: number;
 }
 
+// Server-sent events with committed changes for one date (see /public/stream)
+function openPublicStream(tanggal: string): EventSource {
+  return new EventSource(
+    `${API_BASE}/api/v1/absensi/public/stream?tanggal=${tanggal}`,
+  );
+}
+
+function matchesSearch(nama: string, search?: string): boolean {
+  return !search || nama.toLowerCase().includes(search.toLowerCase());
+}
+
 export const absensiApi = createApi({
   reducerPath: "absensiApi",
   baseQuery: createBaseQuery("/absensi/public"),
@@ -41,6 +52,36 @@ export const absensiApi = createApi({
       providesTags: (_r, _e, { tanggal }) => [
         { type: "Absensi", id: tanggal },
       ],
+      // Live updates: patch changed rows in place; new rows join the first page
+      async onCacheEntryAdded(
+        { tanggal, search, skip = 0, limit = 50 },
+        { updateCachedData, cacheDataLoaded, cacheEntryRemoved, dispatch },
+      ) {
+        try {
+          await cacheDataLoaded;
+        } catch {
+          return;
+        }
+        const source = openPublicStream(tanggal);
+        source.addEventListener("absensi", (event) => {
+          const row: PublicAbsensi = JSON.parse((event as MessageEvent).data);
+          updateCachedData((draft) => {
+            const index = draft.findIndex((r) => r.absensi_id === row.absensi_id);
+            if (index >= 0) {
+              draft[index] = row;
+            } else if (skip === 0 && matchesSearch(row.nama_siswa, search)) {
+              draft.push(row);
+              draft.sort((a, b) => a.nama_siswa.localeCompare(b.nama_siswa));
+              draft.splice(limit);
+            }
+          });
+        });
+        source.addEventListener("resync", () => {
+          dispatch(absensiApi.util.invalidateTags([{ type: "Absensi", id: tanggal }]));
+        });
+        await cacheEntryRemoved;
+        source.close();
+      },
     }),
     listPublicIzinKeluar: builder.query<PublicIzinKeluar[], ListParams>({
       query: ({ tanggal, search, skip = 0, limit = 50 }) => {
@@ -51,6 +92,35 @@ export const absensiApi = createApi({
       providesTags: (_r, _e, { tanggal }) => [
         { type: "IzinKeluar", id: tanggal },
       ],
+      // Live updates: newest first, so new records go on top of the first page
+      async onCacheEntryAdded(
+        { tanggal, search, skip = 0, limit = 50 },
+        { updateCachedData, cacheDataLoaded, cacheEntryRemoved, dispatch },
+      ) {
+        try {
+          await cacheDataLoaded;
+        } catch {
+          return;
+        }
+        const source = openPublicStream(tanggal);
+        source.addEventListener("izin_keluar", (event) => {
+          const row: PublicIzinKeluar = JSON.parse((event as MessageEvent).data);
+          updateCachedData((draft) => {
+            const index = draft.findIndex((r) => r.izin_id === row.izin_id);
+            if (index >= 0) {
+              draft[index] = row;
+            } else if (skip === 0 && matchesSearch(row.nama_siswa, search)) {
+              draft.unshift(row);
+              draft.splice(limit);
+            }
+          });
+        });
+        source.addEventListener("resync", () => {
+          dispatch(absensiApi.util.invalidateTags([{ type: "IzinKeluar", id: tanggal }]));
+        });
+        await cacheEntryRemoved;
+        source.close();
+      },
     }),
   }),
 });
@@ -1,7 +1,7 @@
 import { fetchBaseQuery } from "@reduxjs/toolkit/query/react";
 import type { RootState } from "@/store";
 
-const API_BASE = process.env.NEXT_PUBLIC_API_URL || "http://localhost:2385";
+export const API_BASE = process.env.NEXT_PUBLIC_API_URL || "http://localhost:2385";
 
 export function createBaseQuery(path: string) {
   return fetchBaseQuery({